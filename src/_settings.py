@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic.v1 import BaseSettings
 from src.constants import ENV_PATH
 
@@ -6,6 +8,71 @@ class Settings(BaseSettings):
     REQUEST_TIMEOUT: int = 60
     API_TOKEN: str
     OPENAI_API_KEY: str
+    # адрес своего Bot API сервера (например, telegram-bot-api или заглушки в src.benchmarks.startup)
+    TELEGRAM_API_URL: Optional[str] = None
+    # фоновый прогрев базы, openai, справочников и пулов после первого getUpdates (см. tg_main.warm_up)
+    WARM_UP_ON_START: bool = True
+
+    # postgresql:// и sqlite:// работают через asyncpg и aiosqlite (см. src.database.engine);
+    # только из окружения или .env, как API_TOKEN
+    DATABASE_URL: str
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 5
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    # отложенная запись карт (src.services.chart_writer): очередь в памяти, строк в одном INSERT,
+    # сколько секунд копить пачку, повторов при временных ошибках базы и ожидание дозаписи при остановке
+    CHART_WRITER_QUEUE_SIZE: int = 10_000
+    CHART_WRITER_BATCH_SIZE: int = 200
+    CHART_WRITER_FLUSH_INTERVAL: float = 1
+    CHART_WRITER_MAX_RETRIES: int = 5
+    CHART_WRITER_SHUTDOWN_TIMEOUT: float = 30
+
+    GEOCODE_CACHE_TTL: int = 30 * 24 * 3600
+    GEOCODE_NEGATIVE_CACHE_TTL: int = 24 * 3600
+    GEOCODE_CACHE_MAX_ENTRIES: int = 100_000
+
+    EPHEMERIS_WORKERS: int = 2
+    EPHEMERIS_QUEUE_DEPTH: int = 16
+    # допустимая ошибка интерполяции таблицы эфемерид (src.services.ephemeris_table), в угловых секундах:
+    # планеты с большей ошибкой и моменты вне таблицы считаются Swiss Ephemeris; 0 — таблица не используется
+    EPHEMERIS_TABLE_TOLERANCE: float = 2
+
+    RENDER_WORKERS: int = 2
+    RENDER_MAX_WAITING: int = 32
+    RENDER_TIMEOUT: float = 30
+    # как часто состояние пулов процессов пишется в лог, в секундах; 0 — только при остановке
+    WORKER_STATS_INTERVAL: float = 600
+    # matplotlib — src.services.chart_render, svg — src.services.chart_svg (растр через Pillow, без matplotlib)
+    CHART_RENDERER: Literal["matplotlib", "svg"] = "matplotlib"
+    # 100 DPI — 700x700 пикселей; Telegram всё равно пережимает фото до 1280 по большей стороне
+    CHART_DPI: int = 100
+    # форматы через запятую (png, webp): отправляется самый компактный вариант
+    CHART_IMAGE_FORMATS: str = "png,webp"
+    # уровней серого в палитре; 0 — без квантования, полноцветный RGB
+    CHART_PALETTE_COLORS: int = 8
+
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    # другой OpenAI-совместимый адрес, например заглушка из src.benchmarks.openai_stub
+    OPENAI_BASE_URL: Optional[str] = None
+    # одновременных запросов к API и соединений в пуле
+    OPENAI_MAX_CONCURRENCY: int = 4
+    OPENAI_TIMEOUT: float = 120
+    OPENAI_CONNECT_TIMEOUT: float = 10
+    OPENAI_MAX_RETRIES: int = 4
+    OPENAI_RETRY_BASE_DELAY: float = 1
+    OPENAI_RETRY_MAX_DELAY: float = 30
+    # как часто сообщение с расшифровкой обновляется по мере генерации, в секундах
+    INTERPRETATION_EDIT_INTERVAL: float = 1
+    # промпт расшифровки (src.services.prompts): full — прежний, compact — компактный, ab — пополам по пользователям;
+    # compact и ab включаются явно, и кэш расшифровок у вариантов раздельный
+    PROMPT_VARIANT: Literal["full", "compact", "ab"] = "full"
+    # срок жизни закэшированной расшифровки, в секундах; None — бессрочно
+    INTERPRETATION_CACHE_TTL: Optional[int] = None
+
+    CHART_FILE_ID_TTL: int = 365 * 24 * 3600
+    CHART_FILE_ID_MAX_ENTRIES: int = 200_000
+    CHART_IMAGE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
 
 
 def settings_factory() -> Settings:
@@ -0,0 +1,74 @@
+"""
+Сравнение способов отрисовки карты: matplotlib-шаблон (chart_render) и отрисовка без matplotlib (chart_svg) —
+время импорта в чистом интерпретаторе, время на карту и размер результата.
+
+    python -m src.benchmarks.chart_backends --charts 200
+"""
+import argparse
+import gzip
+import statistics
+import subprocess
+import sys
+import time
+
+from src.benchmarks.chart_render import random_charts
+from src.utils.chart_layout import layout_chart
+
+IMPORT_SNIPPET = """
+import time
+import src.utils.chart_layout
+started = time.perf_counter()
+import {module}
+{warmup}
+print(time.perf_counter() - started)
+"""
+
+
+def import_time(module, warmup, runs=5):
+    """Медиана времени импорта модуля и подготовки шаблона; общая часть (chart_layout) не учитывается."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module, warmup=warmup)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(float(output.split()[-1]))
+    return statistics.median(samples)
+
+
+def measure(function, labels_list):
+    started = time.perf_counter()
+    sizes = [len(function(labels)) for labels in labels_list]
+    return (time.perf_counter() - started) / len(labels_list), sum(sizes) / len(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--charts", type=int, default=200)
+    args = parser.parse_args()
+
+    from src.services import chart_render, chart_svg
+
+    labels_list = [layout_chart(ascendant_sign, positions)[0] for ascendant_sign, positions in random_charts(args.charts)]
+    chart_render.get_chart_template()
+    chart_svg.get_chart_template()
+
+    backends = [
+        ("matplotlib", lambda labels: chart_render.render_chart_job(labels)[0],
+         "src.services.chart_render", "src.services.chart_render.get_chart_template()"),
+        ("Pillow", lambda labels: chart_svg.render_chart_job(labels)[0],
+         "src.services.chart_svg", "src.services.chart_svg.get_chart_template()"),
+        ("SVG", lambda labels: chart_svg.render_chart_svg(labels).encode(),
+         "src.services.chart_svg", ""),
+        ("SVG + gzip", lambda labels: gzip.compress(chart_svg.render_chart_svg(labels).encode()),
+         "src.services.chart_svg", ""),
+    ]
+    print(f"{'':<16}{'импорт+шаблон':>14}{'на карту':>12}{'размер':>12}")
+    for name, function, module, warmup in backends:
+        elapsed, size = measure(function, labels_list)
+        imported = import_time(module, warmup)
+        print(f"{name:<16}{imported * 1000:11.0f} мс{elapsed * 1000:9.2f} мс{size / 1024:8.1f} КиБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Размер и время кодирования карты при разных форматах, палитре и DPI — для выбора
+CHART_IMAGE_FORMATS, CHART_PALETTE_COLORS и CHART_DPI. Базовая строка — полноцветный RGB PNG, как раньше.
+Отрисовка идёт через chart_svg (быстрее, результат совпадает с chart_render); --renderer matplotlib — через chart_render.
+
+    python -m src.benchmarks.chart_encoding --charts 50 --dpi 100 150
+"""
+import argparse
+import statistics
+
+from src.benchmarks.chart_render import random_charts
+from src.services.chart_encoding import encode_chart
+from src.utils.chart_layout import layout_chart
+
+VARIANTS = [
+    ("RGB PNG", ("png",), 0),
+    ("PNG, 16 цветов", ("png",), 16),
+    ("PNG, 8 цветов", ("png",), 8),
+    ("PNG, 4 цвета", ("png",), 4),
+    ("WebP, 8 цветов", ("webp",), 8),
+    ("PNG/WebP, 8 цветов", ("png", "webp"), 8),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--charts", type=int, default=50)
+    parser.add_argument("--dpi", type=int, nargs="+", default=[100])
+    parser.add_argument("--renderer", choices=["svg", "matplotlib"], default="svg")
+    args = parser.parse_args()
+
+    if args.renderer == "svg":
+        from src.services.chart_svg import render_chart_image
+    else:
+        from src.services.chart_render import render_chart_image
+
+    labels_list = [layout_chart(ascendant_sign, positions)[0] for ascendant_sign, positions in random_charts(args.charts)]
+
+    for dpi in args.dpi:
+        images = [render_chart_image(labels, dpi) for labels in labels_list]
+        width, height = images[0].size
+        print(f"DPI {dpi}, {width}x{height}")
+        baseline = None
+        for name, formats, colors in VARIANTS:
+            reports = [encode_chart(image, formats, colors)[1] for image in images]
+            size = statistics.mean(report["bytes"] for report in reports)
+            encode_time = statistics.mean(report["quantize_time"] + report["encode_time"] for report in reports)
+            baseline = baseline or size
+            print(f"  {name:<20}{size / 1024:8.1f} КиБ  ({size / baseline:4.0%})  {encode_time * 1000:7.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Время отрисовки и пиковая память на одну карту: прежний draw_north_indian_chart (новая фигура 9x9,
+все патчи и bbox_inches='tight' на каждый вызов) против шаблона из src.services.chart_render.
+
+    python -m src.benchmarks.chart_render --charts 200
+
+Память считается через tracemalloc, то есть учитываются только выделения Python-объектов и numpy,
+но не внутренние буферы Agg.
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.path import Path  # noqa: E402
+
+from src.services.chart_render import get_chart_template, render_chart_job  # noqa: E402
+from src.utils.chart_layout import layout_chart  # noqa: E402
+from src.utils.chart_data import planet_positions_by_house, polygons, position_data_with_retrograde, \
+    zodiac_coords, zodiac_signs_list  # noqa: E402
+
+SYMBOLS = ["Su", "Mo", "Ma", "Ve", "Me", "Jp", "Sa", "Ra", "Ke"]
+
+
+def random_charts(count, seed=1):
+    generator = random.Random(seed)
+    charts = []
+    for _ in range(count):
+        positions = []
+        for symbol in SYMBOLS:
+            retrograde = symbol in ("Ra", "Ke") or generator.random() < 0.2
+            position_data_with_retrograde(symbol, generator.uniform(0, 360), positions, {}, retrograde)
+        charts.append((generator.choice(zodiac_signs_list), positions))
+    return charts
+
+
+# копия draw_north_indian_chart до перехода на шаблон, без async
+
+def legacy_draw_north_indian_chart(ascendant_sign, planet_positions):
+    fig, ax = plt.subplots(figsize=(9, 9))
+    outer_size = 410
+
+    square = plt.Rectangle((5, 5), 410, 410, edgecolor='black', facecolor='black', linewidth=3)
+    ax.add_patch(square)
+
+    for points in polygons.values():
+        polygon = plt.Polygon(points, edgecolor='black', facecolor='white')
+        ax.add_patch(polygon)
+
+    ascendant_index = zodiac_signs_list.index(ascendant_sign)
+    house_planet_count = [0] * 12
+    house_aspect_count = [0] * 12
+    vertical_spacing = 20
+    base_x_offset = 10
+    base_y_offset = 10
+
+    for i in range(12):
+        sign_index = (ascendant_index + i) % 12
+        sign = zodiac_signs_list[sign_index]
+        x = zodiac_coords[i]["x"] + 15
+        y = zodiac_coords[i]["y"] - 7
+        ax.text(x, y, sign, fontsize=12, ha='center', va='center', color='black')
+
+    def is_point_in_polygon(x, y, polygon_points):
+        return Path(polygon_points).contains_point((x, y))
+
+    def calculate_aspects(planet, house_index):
+        aspects = []
+        if planet.startswith("Su"):
+            aspects.append((house_index + 6) % 12)
+        elif planet.startswith("Mo"):
+            aspects.append((house_index + 6) % 12)
+        elif planet.startswith("Ve"):
+            aspects.append((house_index + 6) % 12)
+        elif planet.startswith("Me"):
+            aspects.append((house_index + 6) % 12)
+        elif planet.startswith("Jp"):
+            aspects.extend([(house_index + 4) % 12, (house_index + 6) % 12, (house_index + 8) % 12])
+        elif planet.startswith("Sa"):
+            aspects.extend([(house_index + 2) % 12, (house_index + 6) % 12, (house_index + 9) % 12])
+        elif planet.startswith("Ma"):
+            aspects.extend([(house_index + 3) % 12, (house_index + 6) % 12, (house_index + 7) % 12])
+        elif planet.startswith("(Ra)"):
+            aspects.extend([(house_index + 4) % 12, (house_index + 6) % 12, (house_index + 8) % 12])
+        return aspects
+
+    occupied_positions = {i: [] for i in range(12)}
+    planet_house_info = []
+
+    for planet, position in planet_positions:
+        house_index = int(position // 30)
+        house_index = (house_index - ascendant_index) % 12
+        coords = planet_positions_by_house[house_index]
+        planet_index = house_planet_count[house_index]
+        house_planet_count[house_index] += 1
+
+        polygon_points = polygons[list(polygons.keys())[house_index]]
+
+        if planet_index < len(coords):
+            x = coords[planet_index]["x"] + base_x_offset
+            y = outer_size - coords[planet_index]["y"] + base_y_offset
+        else:
+            x = zodiac_coords[house_index]["x"] + base_x_offset
+            y = zodiac_coords[house_index]["y"] - (planet_index - len(coords)) * vertical_spacing + base_y_offset
+
+        max_iterations = 200
+        iteration = 0
+
+        while not is_point_in_polygon(x, outer_size - y, polygon_points) or any(
+                abs(pos[0] - x) < 20 and abs(pos[1] - y) < 20 for pos in occupied_positions[house_index]
+        ):
+            x += 5 if x < 200 else -5
+            y += 5 if y < 200 else -5
+            if x < 10 or x > 400 or y < 10 or y > 400:
+                x = min(max(x, 10), 400)
+                y = min(max(y, 10), 400)
+                break
+            iteration += 1
+            if iteration > max_iterations:
+                print(f"Warning: Max iterations reached for planet {planet} in house {house_index}")
+                break
+
+        occupied_positions[house_index].append((x, y))
+        ax.text(x, y, planet, fontsize=14, ha='center', va='center', color='black', fontweight='bold')
+
+        planet_house_info.append(f"{planet}, Дом: {house_index + 1}")
+
+    for planet, position in planet_positions:
+        house_index = int(position // 30)
+        house_index = (house_index - ascendant_index) % 12
+        aspects = calculate_aspects(planet, house_index)
+
+        for aspect_house_index in aspects:
+            coords = planet_positions_by_house[aspect_house_index]
+            aspect_index = house_aspect_count[aspect_house_index]
+            house_aspect_count[aspect_house_index] += 1
+            polygon_points = polygons[list(polygons.keys())[aspect_house_index]]
+
+            if aspect_index < len(coords):
+                x = coords[aspect_index]["x"] + base_x_offset - 15
+                y = outer_size - coords[aspect_index]["y"] + base_y_offset - 5
+            else:
+                x = zodiac_coords[aspect_house_index]["x"] + base_x_offset - 15
+                y = zodiac_coords[aspect_house_index]["y"] - (
+                        aspect_index - len(coords)) * vertical_spacing + base_y_offset - 5
+
+            max_iterations = 200
+            iteration = 0
+            while not is_point_in_polygon(x, outer_size - y, polygon_points) or any(
+                    abs(pos[0] - x) < 20 and abs(pos[1] - y) < 20 for pos in occupied_positions[aspect_house_index]
+            ):
+                x += 5 if x < 200 else -5
+                y += 5 if y < 200 else -5
+                if x < 10 or x > 400 or y < 10 or y > 400:
+                    x = min(max(x, 10), 400)
+                    y = min(max(y, 10), 400)
+                    break
+                iteration += 1
+                if iteration > max_iterations:
+                    print(f"Warning: Max iterations reached for aspect of {planet} in house {aspect_house_index}")
+                    break
+
+            occupied_positions[aspect_house_index].append((x, y))
+            aspect_planet = planet.replace("↑", "").replace("↓", "").replace("\u035F", "").replace("(", "").replace(")",
+                                                                                                                    "")
+            ax.text(x, y, aspect_planet, fontsize=11, ha='center', va='center', color='gray', alpha=0.5,
+                    fontweight='bold')
+
+    ax.set_xlim(0, outer_size + 10)
+    ax.set_ylim(0, outer_size + 10)
+    ax.set_aspect('equal')
+    ax.axis('off')
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', pad_inches=0.1)
+    plt.close(fig)
+    buf.seek(0)
+    return buf, planet_house_info
+
+
+def render_with_template(ascendant_sign, planet_positions):
+    labels, planet_house_info = layout_chart(ascendant_sign, planet_positions)
+    image, _ = render_chart_job(labels)
+    return image, planet_house_info
+
+
+def measure(function, charts):
+    tracemalloc.start()
+    started = time.perf_counter()
+    sizes = []
+    # предупреждения раскладки подписей печатаются через print и здесь не нужны
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ascendant_sign, positions in charts:
+            image, _ = function(ascendant_sign, positions)
+            sizes.append(len(image.getvalue() if isinstance(image, io.BytesIO) else image))
+    elapsed = (time.perf_counter() - started) / len(charts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, sum(sizes) / len(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--charts", type=int, default=200)
+    args = parser.parse_args()
+
+    charts = random_charts(args.charts)
+
+    started = time.perf_counter()
+    get_chart_template()
+    print(f"Подготовка шаблона (один раз на процесс): {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    for name, function in [("прежний", legacy_draw_north_indian_chart), ("шаблон", render_with_template)]:
+        elapsed, peak, size = measure(function, charts)
+        print(f"{name:<8} {elapsed * 1000:8.2f} мс/карта   пик {peak / 1024:8.1f} КиБ   файл {size / 1024:6.1f} КиБ")
+
+
+if __name__ == "__main__":
+    main()
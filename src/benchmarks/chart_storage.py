@@ -0,0 +1,176 @@
+"""
+Выборки карт пользователя на синтетических данных: «последняя карта» и «последние 10 карт» по индексу
+(telegram_id, created_at) в charts (src.services.chart_storage) против того же запроса к прежней таблице
+user_data без индекса. Печатает задержки запросов, размер данных карты на строку и время восстановления
+карты и шкалы даш из строки.
+
+База — DATABASE_URL; схема создаётся миграцией заранее, таблицы заполняются здесь же (--skip-fill — уже
+заполненная база). Миллион карт и 5000 прежних строк в SQLite занимают около 0,9 ГБ и заполняются
+несколько минут.
+
+    alembic -x url=sqlite:///data/charts_bench.sqlite3 upgrade head
+    DATABASE_URL=sqlite:///data/charts_bench.sqlite3 python -m src.benchmarks.chart_storage --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import String, cast, func, insert, select
+
+from src.database import engine as database
+from src.database.models.models import Chart, UserData
+from src.services.chart_storage import (
+    PLANET_SYMBOLS, chart_record, last_chart, pack_dasha, unpack_dasha, unpack_planets, user_charts, write_charts,
+)
+from src.services.dasha import render_mahadasha_details, render_vimshottari_dasha, to_ordinal_days
+from src.utils.chart_data import calculate_zodiac_position, dasha_order, planet_periods
+
+# id пользователей Telegram уже больше 2^31
+FIRST_TELEGRAM_ID = 5_000_000_000
+CHUNK_SIZE = 5000
+INTERPRETATION = "Расшифровка натальной карты. " * 10
+
+
+def random_record(generator, users, created_at):
+    birth = datetime(1950, 1, 1) + timedelta(days=generator.uniform(0, 70 * 365))
+    starting_planet = generator.choice(dasha_order)
+    positions = [
+        (generator.choice([symbol, f"({symbol})", f"{symbol}↑", f"{symbol}↓"]), generator.uniform(0, 360))
+        for symbol in PLANET_SYMBOLS
+    ]
+    return chart_record(
+        telegram_id=FIRST_TELEGRAM_ID + generator.randrange(users),
+        username=None,
+        location="Москва, Россия",
+        latitude=55.75,
+        longitude=37.62,
+        birth_date=birth.date(),
+        birth_time=birth.time().replace(microsecond=0),
+        ascendant=generator.uniform(0, 360),
+        planet_positions=positions,
+        dasha=pack_dasha(to_ordinal_days(birth.date()), starting_planet,
+                         generator.uniform(0, planet_periods[starting_planet])),
+        interpretation=INTERPRETATION if generator.random() < 0.1 else None,
+        created_at=created_at,
+    )
+
+
+def legacy_texts(records):
+    """Тексты user_data в прежнем формате для нескольких карт: строить их на каждую строку слишком долго."""
+    texts = []
+    for record in records:
+        chart = record["chart"]
+        zodiac_info = "Знаки зодиака с градусами:\n" + "\n".join(
+            f"{symbol:<3} {sign} {degree:>2}˚{minutes:02d}'{seconds:02d}\""
+            for symbol, (longitude, _) in zip(PLANET_SYMBOLS, chart["planets"])
+            for sign, degree, minutes, seconds in [calculate_zodiac_position(longitude)]
+        )
+        timeline = unpack_dasha(chart["dasha"])
+        texts.append((zodiac_info, render_vimshottari_dasha(timeline) + "\n" + render_mahadasha_details(timeline)))
+    return texts
+
+
+async def fill(rows, legacy_rows, users, seed=1):
+    generator = random.Random(seed)
+    started_at = datetime(2024, 1, 1)
+    texts = legacy_texts([random_record(generator, users, started_at) for _ in range(20)])
+    started = time.perf_counter()
+    for chunk_start in range(0, rows, CHUNK_SIZE):
+        records = [
+            random_record(generator, users, started_at + timedelta(seconds=number))
+            for number in range(chunk_start, min(chunk_start + CHUNK_SIZE, rows))
+        ]
+        async with database.open_session() as session:
+            await write_charts(session, records)
+            if chunk_start < legacy_rows:
+                await session.execute(insert(UserData), [
+                    dict(
+                        telegram_id=record["chart"]["telegram_id"], username=None, location="Москва, Россия",
+                        birth_date=record["chart"]["birth_date"], birth_time=record["chart"]["birth_time"],
+                        chart_interpretation=record["interpretation"] and record["interpretation"]["interpretation"],
+                        zodiac_info=zodiac_info, houses_info="Дома в карте: ...", vimshottari_dasha=vimshottari_dasha,
+                    )
+                    for record, (zodiac_info, vimshottari_dasha) in zip(records, texts * (CHUNK_SIZE // len(texts)))
+                ])
+            await session.commit()
+        print(f"\r  записано {chunk_start + len(records)} карт", end="", flush=True)
+    print(f"\r  записано {rows} карт за {time.perf_counter() - started:.0f} с")
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return (f"медиана {statistics.median(ordered) * 1000:7.2f} мс, "
+            f"p95 {ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000:7.2f} мс")
+
+
+async def timed(queries, query):
+    samples = []
+    for argument in queries:
+        started = time.perf_counter()
+        await query(argument)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def legacy_last_chart(telegram_id):
+    async with database.open_session() as session:
+        query = select(UserData).where(UserData.telegram_id == telegram_id).order_by(UserData.id.desc()).limit(1)
+        return (await session.execute(query)).scalar()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    # прежние строки тяжёлые (около 75 КБ текста даш), поэтому их меньше
+    parser.add_argument("--legacy-rows", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--skip-fill", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_fill:
+        await fill(args.rows, args.legacy_rows, args.users)
+
+    async with database.open_session() as session:
+        charts = await session.scalar(select(func.count()).select_from(Chart))
+        legacy = await session.scalar(select(func.count()).select_from(UserData))
+        chart_bytes = await session.scalar(select(func.avg(
+            func.length(cast(Chart.planets, String)) + func.length(Chart.dasha)
+        )))
+        legacy_bytes = await session.scalar(select(func.avg(
+            func.length(UserData.zodiac_info) + func.length(UserData.houses_info) + func.length(UserData.vimshottari_dasha)
+        )))
+    print(f"charts: {charts} строк, планеты и даши в среднем {chart_bytes:.0f} символов на строку; "
+          f"user_data: {legacy} строк, текст карты {legacy_bytes or 0:.0f} символов на строку")
+
+    generator = random.Random(2)
+    users = [FIRST_TELEGRAM_ID + generator.randrange(args.users) for _ in range(args.queries)]
+    await last_chart(users[0])
+    print(f"Последняя карта (charts, индекс):        {percentiles(await timed(users, last_chart))}")
+    print(f"Последние 10 карт (charts, индекс):      {percentiles(await timed(users, user_charts))}")
+    legacy_queries = users[:max(args.queries // 50, 5)]
+    legacy_samples = await timed(legacy_queries, legacy_last_chart)
+    print(f"Последняя карта (user_data, без индекса): {percentiles(legacy_samples)} на {len(legacy_queries)} запросах")
+    if legacy:
+        # без индекса запрос просматривает всю таблицу: время растёт линейно с числом строк
+        print(f"  на {charts} строках user_data было бы около "
+              f"{statistics.median(legacy_samples) * charts / legacy * 1000:.0f} мс")
+
+    found = [chart for chart in [await last_chart(telegram_id) for telegram_id in users[:100]] if chart]
+    started = time.perf_counter()
+    for chart, _ in found:
+        unpack_planets(chart.planets)
+    planets_time = (time.perf_counter() - started) / max(len(found), 1)
+    started = time.perf_counter()
+    for chart, _ in found:
+        unpack_dasha(chart.dasha)
+    dasha_time = (time.perf_counter() - started) / max(len(found), 1)
+    print(f"Восстановление из строки: планеты {planets_time * 1e6:.1f} мкс, шкала даш {dasha_time * 1000:.2f} мс")
+    await database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
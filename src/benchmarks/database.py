@@ -0,0 +1,97 @@
+"""
+Нагрузка на базу: одновременные сохранения карт и чтения кэша расшифровок через пул src.database.engine.
+Печатает время, задержку цикла событий и состояние пула. Способы сохранения (--mode):
+writer — очередь отложенной записи в charts, как save_chart (src.services.chart_writer); время сохранения —
+пока обработчики ставят карты в очередь, дозапись — до окончания записи в базу;
+single — по INSERT и commit на карту через пул; sync — прежний способ: строка user_data синхронной сессией
+прямо в цикле событий.
+
+Схема создаётся миграцией заранее:
+
+    alembic -x url=sqlite:///data/local.sqlite3 upgrade head
+    DATABASE_URL=sqlite:///data/local.sqlite3 python -m src.benchmarks.database --saves 5000 --mode writer
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, time as day_time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.benchmarks.chart_storage import random_record
+from src.benchmarks.render_pool import measure_loop_lag
+from src.database import engine as database
+from src.database.models.models import UserData
+from src.services.chart_storage import write_charts
+from src.services.chart_writer import chart_writer
+from src.services.interpretation_cache import interpretation_cache
+
+
+def user_row(number):
+    return dict(
+        telegram_id=number, username=f"user{number}", location="Москва, Россия",
+        birth_date=date(1990, 1, 1), birth_time=day_time(12, 0),
+        chart_interpretation="Тестовая расшифровка. " * 200, zodiac_info="-", houses_info="-",
+        vimshottari_dasha="Вимшоттари даша: ...",
+    )
+
+
+def chart(number):
+    return random_record(random.Random(number), users=1000, created_at=datetime.utcnow())
+
+
+async def save_writer(number):
+    chart_writer.submit(chart(number))
+
+
+async def save_single(number):
+    async with database.open_session() as session:
+        await write_charts(session, [chart(number)])
+        await session.commit()
+
+
+async def save_sync(engine, number):
+    with Session(engine) as session:
+        session.add(UserData(**user_row(number)))
+        session.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--saves", type=int, default=500)
+    parser.add_argument("--mode", choices=["writer", "single", "sync"], default="writer")
+    args = parser.parse_args()
+
+    await database.connect()
+    url = database.database_url()
+    # для --sync: тот же адрес с синхронным драйвером по умолчанию
+    sync_engine = create_engine(url.set(drivername=url.get_backend_name()))
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    if args.mode == "sync":
+        await asyncio.gather(*(save_sync(sync_engine, number) for number in range(args.saves)))
+    else:
+        save = save_writer if args.mode == "writer" else save_single
+        await asyncio.gather(*(save(number) for number in range(args.saves)))
+    saved = time.perf_counter() - started
+    await chart_writer.close()
+    written = time.perf_counter() - started
+    await asyncio.gather(*(interpretation_cache.get(f"{number:064x}") for number in range(args.saves)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lag = await lag_task
+
+    print(f"{args.saves} сохранений ({args.mode}) за {saved:.2f} с, дозапись за {written - saved:.2f} с "
+          f"({args.saves / written:.0f} строк/с), {args.saves} чтений кэша за {elapsed - written:.2f} с, "
+          f"задержка цикла событий до {lag * 1000:.1f} мс")
+    print(f"Запись карт: {chart_writer.stats()}")
+    print(f"Пул: {database.pool_status()}, кэш расшифровок: {interpretation_cache.stats()}")
+    sync_engine.dispose()
+    await database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+Заглушка OpenAI-совместимого API и нагрузочный тест клиента из src.services.openai без сети и без ключа.
+
+Заглушка отвечает на POST /v1/chat/completions за --latency секунд (с потоком — первый фрагмент
+через --first-token, остальные равномерно до --latency) и с вероятностью --rate-limit возвращает 429
+с Retry-After. Считает одновременные запросы и TCP-соединения: видно, что семафор ограничивает
+параллельность, а соединения переиспользуются.
+
+С --stream расшифровки идут через stream_chat_gpt и stream_long_message в имитацию чата Telegram:
+время до первого текста против полного ответа, число правок и сообщений.
+
+    python -m src.benchmarks.openai_stub --requests 40 --latency 2 --rate-limit 0.2
+    python -m src.benchmarks.openai_stub --requests 10 --latency 8 --stream
+    python -m src.benchmarks.openai_stub --serve --port 8089    # для бота: OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import time
+
+from aiohttp import web
+
+from src.benchmarks.render_pool import measure_loop_lag
+
+# длиннее одного сообщения Telegram, чтобы было видно перенос в следующее
+STUB_TEXT = "\n".join(["Тестовая расшифровка натальной карты. " * 10] * 15)
+
+
+class StubOpenAI:
+    def __init__(self, latency, rate_limit, first_token=0.5, retry_after=1, seed=1):
+        self.latency = latency
+        self.first_token = first_token
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.connections = set()
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if self.random.random() < self.rate_limit:
+            self.rate_limited += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429, headers={"retry-after": str(self.retry_after)},
+            )
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if body.get("stream"):
+                return await self.stream(request, body)
+            await asyncio.sleep(self.latency * self.random.uniform(0.5, 1.5))
+        finally:
+            self.in_flight -= 1
+        prompt_tokens, completion_tokens = self.usage(body)
+        return web.json_response({
+            "id": f"chatcmpl-stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": STUB_TEXT}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    @staticmethod
+    def usage(body):
+        """Грубая оценка токенов — символы / 3, для проверки отчётов по расходу."""
+        prompt_chars = sum(len(message.get("content") or "") for message in body.get("messages", []))
+        return prompt_chars // 3, len(STUB_TEXT) // 3
+
+    async def stream(self, request, body):
+        response = web.StreamResponse(headers={"content-type": "text/event-stream"})
+        await response.prepare(request)
+        words = STUB_TEXT.split(" ")
+        interval = max(self.latency - self.first_token, 0) / len(words)
+        await asyncio.sleep(self.first_token)
+        deltas = [{"content": word if index == 0 else " " + word} for index, word in enumerate(words)]
+        # как у API: последний фрагмент без текста несёт причину остановки
+        for index, delta in enumerate(deltas + [{}]):
+            chunk = {
+                "id": f"chatcmpl-stub-{self.requests}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None if delta else "stop"}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            if delta:
+                await asyncio.sleep(interval)
+        if body.get("stream_options", {}).get("include_usage"):
+            prompt_tokens, completion_tokens = self.usage(body)
+            chunk = {
+                "id": f"chatcmpl-stub-{self.requests}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "stub"), "choices": [],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def application(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        return app
+
+
+class StubChat:
+    """Имитация чата Telegram для stream_long_message: сообщения, правки, длина и время первого текста."""
+
+    def __init__(self):
+        # сообщение-заглушка «Обрабатываем результаты расчета...» уже отправлено
+        self.messages = 1
+        self.edits = 0
+        self.max_length = 0
+        self.first_text_at = None
+
+    def record(self, text):
+        self.max_length = max(self.max_length, len(text))
+        if self.first_text_at is None:
+            self.first_text_at = time.perf_counter()
+
+
+class StubMessage:
+    def __init__(self, chat):
+        self.chat = chat
+
+    async def answer(self, text):
+        self.chat.messages += 1
+        self.chat.record(text)
+        return StubMessage(self.chat)
+
+    async def edit_text(self, text):
+        self.chat.edits += 1
+        self.chat.record(text)
+
+
+async def start_stub(stub, port=0):
+    """Запускает заглушку на 127.0.0.1; возвращает runner и базовый URL для OPENAI_BASE_URL."""
+    runner = web.AppRunner(stub.application())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1"
+
+
+async def load_test(args):
+    from src.services import openai
+    from src.services.prompts import build_prompt
+    from src.utils.message import stream_long_message
+
+    stub = StubOpenAI(args.latency, args.rate_limit, args.first_token)
+    runner, base_url = await start_stub(stub)
+    openai.settings.OPENAI_BASE_URL = base_url
+    openai.settings.OPENAI_RETRY_BASE_DELAY = args.retry_base_delay
+    # импорт openai и создание клиента в боте происходят при прогреве, в замер не входят
+    openai.get_client()
+    for name in ("httpx", "aiohttp.access"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    # повторы и отчёты по каждой расшифровке — только с --verbose
+    if not args.verbose:
+        logging.getLogger("src.services.openai").setLevel(logging.ERROR)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    prompt = build_prompt(args.variant, "Дома в карте: ...", "Вимшоттари даша: ...", "1 Ari: Su Mo")
+    latencies = []
+    first_texts = []
+    chats = []
+    failed = 0
+
+    async def interpretation():
+        nonlocal failed
+        started = time.perf_counter()
+        chat = StubChat()
+        try:
+            if args.stream:
+                placeholder = StubMessage(chat)
+                await stream_long_message(
+                    placeholder, openai.stream_chat_gpt(prompt),
+                    prefix="Расшифровка натальной карты:\n", placeholder=placeholder,
+                    interval=openai.settings.INTERPRETATION_EDIT_INTERVAL,
+                )
+            else:
+                text = await openai.chat_gpt(prompt)
+                chat.record(text)
+        except Exception:
+            failed += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+            first_texts.append(chat.first_text_at - started)
+            chats.append(chat)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(interpretation() for _ in range(args.requests)))
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        lag = await lag_task
+        await openai.close_client()
+        await runner.cleanup()
+
+    print(f"{args.requests} расшифровок за {elapsed:.2f} с, не удалось {failed}, "
+          f"задержка цикла событий до {lag * 1000:.1f} мс")
+    for name, samples in [("Время расшифровки", latencies), ("До первого текста", first_texts)]:
+        if samples:
+            ordered = sorted(samples)
+            print(f"{name}: медиана {statistics.median(ordered):.2f} с, "
+                  f"p95 {ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]:.2f} с, макс {ordered[-1]:.2f} с")
+    if args.stream and chats:
+        print(f"Чат: в среднем {statistics.mean(chat.edits for chat in chats):.1f} правок и "
+              f"{statistics.mean(chat.messages for chat in chats):.1f} сообщений на расшифровку, "
+              f"самое длинное сообщение {max(chat.max_length for chat in chats)} символов")
+    print(f"Заглушка: запросов {stub.requests}, 429 {stub.rate_limited}, одновременно до {stub.max_in_flight} "
+          f"(OPENAI_MAX_CONCURRENCY={openai.settings.OPENAI_MAX_CONCURRENCY}), TCP-соединений {len(stub.connections)}")
+    print(f"Клиент: {openai.stats()}")
+
+
+async def serve(args):
+    stub = StubOpenAI(args.latency, args.rate_limit, args.first_token)
+    runner, base_url = await start_stub(stub, args.port)
+    print(f"Заглушка OpenAI: OPENAI_BASE_URL={base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=2)
+    parser.add_argument("--rate-limit", type=float, default=0.2)
+    parser.add_argument("--first-token", type=float, default=0.5)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--variant", choices=["full", "compact"], default="full")
+    parser.add_argument("--retry-base-delay", type=float, default=0.5)
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    asyncio.run(serve(args) if args.serve else load_test(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Сравнение вариантов промпта расшифровки (src.services.prompts): входные токены и оценка стоимости
+на случайных картах. С --live каждый вариант отправляется в API (OPENAI_BASE_URL, например заглушка
+из src.benchmarks.openai_stub, или настоящий OpenAI — это платно) и печатаются задержка и расход токенов по ответу.
+
+Токены считаются через tiktoken, если он установлен (pip install tiktoken) и его словарь доступен,
+иначе печатаются только символы.
+
+    python -m src.benchmarks.prompts --charts 100 --input-price 0.15
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from src.benchmarks.chart_render import random_charts
+from src.dispatcher.dispatcher import settings
+from src.services.astrology import get_house_info
+from src.services.dasha import build_vimshottari_timeline, render_vimshottari_dasha
+from src.services.prompts import PROMPT_VARIANTS, build_prompt, compact_chart, count_tokens
+from src.utils.chart_data import dasha_order, planet_periods, zodiac_names
+
+
+async def random_prompts(count, seed=1):
+    """{вариант: [InterpretationPrompt, ...]} для одних и тех же случайных карт."""
+    generator = random.Random(seed)
+    prompts = {variant: [] for variant in PROMPT_VARIANTS}
+    for ascendant_number, positions in random_charts(count, seed):
+        ascendant_sign = zodiac_names[int(ascendant_number) - 1]
+        birth = datetime(1950, 1, 1) + timedelta(days=generator.uniform(0, 70 * 365))
+        starting_planet = generator.choice(dasha_order)
+        timeline = build_vimshottari_timeline(
+            birth, starting_planet, generator.uniform(0, planet_periods[starting_planet])
+        )
+        house_info_text = "Дома в карте:\n" + "\n".join(await get_house_info(ascendant_sign, positions))
+        vimshottari_dasha = render_vimshottari_dasha(timeline)
+        chart = compact_chart(ascendant_sign, positions, timeline)
+        for variant in PROMPT_VARIANTS:
+            prompts[variant].append(build_prompt(variant, house_info_text, vimshottari_dasha, chart))
+    return prompts
+
+
+async def live(prompts, requests):
+    from src.services import openai
+
+    for variant, variant_prompts in prompts.items():
+        latencies, prompt_tokens = [], []
+        for prompt in variant_prompts[:requests]:
+            client = openai.get_client()
+            started = time.perf_counter()
+            response = await client.chat.completions.create(model=settings.OPENAI_MODEL, messages=prompt.messages)
+            latencies.append(time.perf_counter() - started)
+            if response.usage:
+                prompt_tokens.append(response.usage.prompt_tokens)
+        tokens = f"{statistics.mean(prompt_tokens):.0f}" if prompt_tokens else "?"
+        print(f"  {variant:<8} задержка медиана {statistics.median(latencies):6.2f} с, входных токенов по API {tokens}")
+    await openai.close_client()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--charts", type=int, default=100)
+    # долларов за миллион входных токенов; по умолчанию — цена gpt-4o-mini
+    parser.add_argument("--input-price", type=float, default=0.15)
+    parser.add_argument("--live", type=int, default=0, help="сколько запросов каждого варианта отправить в API")
+    args = parser.parse_args()
+
+    prompts = await random_prompts(args.charts)
+    print(f"{args.charts} карт, модель {settings.OPENAI_MODEL}")
+    baseline = None
+    for variant, variant_prompts in prompts.items():
+        chars = statistics.mean(sum(len(message["content"]) for message in prompt.messages) for prompt in variant_prompts)
+        tokens = [count_tokens(prompt.messages, settings.OPENAI_MODEL) for prompt in variant_prompts]
+        if None in tokens:
+            print(f"  {variant:<8} {chars:8.0f} символов (токены не посчитаны: нет tiktoken или его словаря)")
+            continue
+        mean_tokens = statistics.mean(tokens)
+        baseline = baseline or mean_tokens
+        print(f"  {variant:<8} {chars:8.0f} символов {mean_tokens:8.0f} токенов ({mean_tokens / baseline:4.0%})  "
+              f"${mean_tokens * args.input_price / 1e6 * 1000:.3f} за 1000 расшифровок (вход)")
+
+    if args.live:
+        await live(prompts, args.live)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Нагрузка на пул отрисовки: burst одновременных карт через draw_north_indian_chart.
+Показывает задержку цикла событий (насколько «замирает» бот для остальных пользователей),
+сколько задач отклонено из-за переполнения и статистику пула для подбора RENDER_WORKERS/RENDER_MAX_WAITING.
+Отрисовка идёт выбранным в CHART_RENDERER способом.
+
+    python -m src.benchmarks.render_pool --charts 60 --workers 2 --max-waiting 16
+"""
+import argparse
+import asyncio
+import time
+
+from src.benchmarks.chart_render import random_charts
+from src.services import astrology
+from src.services.workers import WorkerPool, WorkerPoolFull
+from src.utils.chart_layout import layout_chart
+
+
+async def measure_loop_lag(stop, interval=0.01):
+    """Максимальное опоздание тика цикла событий, в секундах."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run(charts, in_process):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    rejected = timed_out = 0
+    started = time.perf_counter()
+
+    async def draw(labels):
+        nonlocal rejected, timed_out
+        if in_process:
+            return astrology.render_chart_job(labels)
+        try:
+            return await astrology.draw_north_indian_chart(labels)
+        except WorkerPoolFull:
+            rejected += 1
+        except asyncio.TimeoutError:
+            timed_out += 1
+
+    await asyncio.gather(*(draw(labels) for labels in charts))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag_task, rejected, timed_out
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--charts", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-waiting", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    charts = [layout_chart(ascendant_sign, positions)[0] for ascendant_sign, positions in random_charts(args.charts)]
+    astrology.render_pool = WorkerPool(
+        "render", workers=args.workers, queue_depth=args.workers, initializer=astrology.init_render_worker,
+        max_waiting=args.max_waiting,
+    )
+    # прогрев: запуск процессов и подготовка шаблона не входят в замер
+    await asyncio.gather(*(astrology.draw_north_indian_chart(labels) for labels in charts[:args.workers]))
+    astrology.init_render_worker()
+    astrology.render_pool.reset_stats()
+    astrology.render_pool.timeout = args.timeout
+
+    try:
+        for name, in_process in [("в цикле событий", True), ("пул процессов", False)]:
+            elapsed, lag, rejected, timed_out = await run(charts, in_process)
+            print(f"{name:<16} всего {elapsed:6.2f} с   задержка цикла до {lag * 1000:8.1f} мс   "
+                  f"отклонено {rejected}   по таймауту {timed_out}")
+
+        stats = astrology.render_pool.stats()
+        print(f"Пул: {stats['workers']} процессов, выполнено {stats['completed']}, отклонено {stats['rejected']}")
+        for key in ("wait_time", "run_time"):
+            summary = stats[key]
+            print(f"  {key:<9} среднее {summary['avg'] * 1000:7.1f} мс   p95 {summary['p95'] * 1000:7.1f} мс   "
+                  f"макс {summary['max'] * 1000:7.1f} мс")
+    finally:
+        astrology.render_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
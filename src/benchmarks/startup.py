@@ -0,0 +1,145 @@
+"""
+Время старта бота.
+
+1. Стоимость импорта src.tg_main по модулям (python -X importtime в чистом интерпретаторе).
+2. Время до первого апдейта: бот запускается отдельным процессом против заглушки Bot API
+   (через TELEGRAM_API_URL), заглушка отдаёт /start в первом getUpdates и засекает ответ бота.
+   Настоящий Telegram не используется; фоновый прогрев (WARM_UP_ON_START) обращается к базе как обычно,
+   --no-warm-up отключает его.
+
+    python -m src.benchmarks.startup --runs 3 --top 15
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from aiohttp import web
+
+STUB_TOKEN = "42:startup-benchmark"
+STUB_USER = {"id": 42, "is_bot": True, "first_name": "Startup benchmark", "username": "startup_benchmark_bot"}
+STUB_CHAT = {"id": 1, "type": "private"}
+
+
+def bot_environment(**overrides):
+    env = dict(os.environ, API_TOKEN=STUB_TOKEN, **overrides)
+    env.setdefault("OPENAI_API_KEY", "stub")
+    return env
+
+
+def import_times():
+    """[(модуль, собственное время, с учётом вложенных импортов), ...] в секундах, в порядке завершения импорта."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.tg_main"],
+        env=bot_environment(), capture_output=True, text=True, check=True,
+    ).stderr
+    result = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        result.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6))
+    return result
+
+
+class StubBotApi:
+    def __init__(self):
+        self.first_poll = None
+        self.first_reply = None
+        self.replied = asyncio.Event()
+        self.update_sent = False
+
+    def start_update(self):
+        return {
+            "update_id": 1,
+            "message": {
+                "message_id": 1, "date": int(time.time()), "chat": STUB_CHAT,
+                "from": {"id": 1, "is_bot": False, "first_name": "User"},
+                "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        }
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        if method == "getMe":
+            result = STUB_USER
+        elif method == "getUpdates":
+            if self.first_poll is None:
+                self.first_poll = time.perf_counter()
+            if self.update_sent:
+                # long polling без апдейтов
+                await asyncio.sleep(1)
+                result = []
+            else:
+                self.update_sent = True
+                result = [self.start_update()]
+        elif method == "sendMessage":
+            if self.first_reply is None:
+                self.first_reply = time.perf_counter()
+                self.replied.set()
+            result = {"message_id": 2, "date": int(time.time()), "chat": STUB_CHAT, "text": "ok"}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+async def time_to_first_update(warm_up, timeout=120):
+    """Секунды от запуска процесса до первого getUpdates и до ответа на первый апдейт."""
+    stub = StubBotApi()
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    env = bot_environment(TELEGRAM_API_URL=f"http://127.0.0.1:{port}", WARM_UP_ON_START=str(warm_up).lower())
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "src.tg_main", env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await asyncio.wait_for(stub.replied.wait(), timeout)
+    finally:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), 10)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        await runner.cleanup()
+    return stub.first_poll - started, stub.first_reply - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--no-warm-up", action="store_true")
+    args = parser.parse_args()
+
+    modules = import_times()
+    total = next(cumulative for name, _, cumulative in modules if name == "src.tg_main")
+    print(f"Импорт src.tg_main: {total * 1000:.0f} мс; самые дорогие пакеты и модули проекта (с вложенными импортами):")
+    # пакеты верхнего уровня и модули src, без их подмодулей
+    interesting = [(name, cumulative) for name, _, cumulative in modules
+                   if name.startswith("src.") or "." not in name]
+    for name, cumulative in sorted(interesting, key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<36}{cumulative * 1000:9.1f} мс")
+
+    polls, replies = [], []
+    for _ in range(args.runs):
+        first_poll, first_reply = asyncio.run(time_to_first_update(not args.no_warm_up))
+        polls.append(first_poll)
+        replies.append(first_reply)
+    print(f"До первого getUpdates: медиана {statistics.median(polls):.2f} с, "
+          f"до ответа на первый апдейт: медиана {statistics.median(replies):.2f} с ({args.runs} запусков)")
+
+
+if __name__ == "__main__":
+    main()
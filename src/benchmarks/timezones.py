@@ -0,0 +1,61 @@
+"""
+Задержка определения часового пояса: прежний способ (новый TimezoneFinder на каждый вызов)
+против общего TimezoneFinder с кэшем по координатам.
+
+    python -m src.benchmarks.timezones --points 2000
+"""
+import argparse
+import random
+import time
+
+from timezonefinder import TimezoneFinder
+
+from src.services import timezones
+
+
+def random_points(count, seed=1):
+    generator = random.Random(seed)
+    # точки вокруг крупных населённых областей, как у реальных городов
+    centers = [(55.75, 37.62), (59.94, 30.31), (50.45, 30.52), (53.9, 27.57), (43.24, 76.89), (40.71, -74.0),
+               (52.52, 13.4), (41.31, 69.28), (56.84, 60.6), (55.03, 82.92)]
+    points = []
+    for _ in range(count):
+        latitude, longitude = generator.choice(centers)
+        points.append((latitude + generator.uniform(-1.5, 1.5), longitude + generator.uniform(-1.5, 1.5)))
+    return points
+
+
+def measure(function, points):
+    started = time.perf_counter()
+    for latitude, longitude in points:
+        function(latitude, longitude)
+    return (time.perf_counter() - started) / len(points)
+
+
+def legacy_lookup(latitude, longitude):
+    return TimezoneFinder().timezone_at(lat=latitude, lng=longitude)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--legacy-points", type=int, default=50)
+    args = parser.parse_args()
+
+    points = random_points(args.points)
+
+    legacy = measure(legacy_lookup, points[:args.legacy_points])
+    timezones.get_timezone_finder()
+    cold = measure(timezones.timezone_name_at, points)
+    warm = measure(timezones.timezone_name_at, points)
+    exact = measure(timezones._exact_timezone_name, points)
+
+    print(f"новый TimezoneFinder на вызов: {legacy * 1e6:10.1f} мкс/запрос")
+    print(f"общий TimezoneFinder, точно:   {exact * 1e6:10.1f} мкс/запрос")
+    print(f"с кэшем, первый проход:        {cold * 1e6:10.1f} мкс/запрос")
+    print(f"с кэшем, повторный проход:     {warm * 1e6:10.1f} мкс/запрос")
+    print(f"координат в кэше: {timezones.cache_info().currsize}")
+
+
+if __name__ == "__main__":
+    main()
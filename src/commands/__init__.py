@@ -1,4 +1,7 @@
-from src.dispatcher.dispatcher import dp
 from src.handlers.form_handlers import router as form_router
+from src.handlers.dasha_handlers import router as dasha_router
 
-dp.include_router(form_router)
+
+def register_routers(dp):
+    dp.include_router(form_router)
+    dp.include_router(dasha_router)
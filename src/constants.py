@@ -1,3 +1,9 @@
 from pathlib import Path
 
 ENV_PATH = Path(__file__).resolve().parents[1] / "config" / "backend" / ".env"
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+GAZETTEER_PATH = DATA_DIR / "gazetteer.bin"
+CACHE_PATH = DATA_DIR / "cache.sqlite3"
+EPHEMERIS_TABLE_PATH = DATA_DIR / "ephemeris_table.bin"
+CHART_CACHE_DIR = DATA_DIR / "charts"
@@ -0,0 +1,71 @@
+"""
+Асинхронный движок базы данных.
+
+Движок создаётся при первом обращении, а не при импорте, и держит пул из DATABASE_POOL_SIZE соединений
+(при пиках ещё до DATABASE_MAX_OVERFLOW), так что запросы не блокируют цикл событий и не открывают
+соединение каждый раз. connect() проверяет базу при прогреве бота, dispose() закрывает пул при остановке
+(см. tg_main).
+
+Схему база получает миграциями alembic, а не при старте бота:
+
+    alembic upgrade head
+    alembic -x url=sqlite:///data/local.sqlite3 upgrade head    # локальная база для проверок
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.database.urls import async_url
+from src.dispatcher.dispatcher import settings
+
+Session = async_sessionmaker(expire_on_commit=False)
+_engine = None
+
+
+def database_url(url=None):
+    return async_url(url or settings.DATABASE_URL)
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        url = database_url()
+        if url.get_backend_name() == "sqlite":
+            # SQLite не пускает одновременных писателей: одно соединение, запросы ждут его по очереди
+            options = {} if url.database in (None, "", ":memory:") else dict(
+                poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0
+            )
+        else:
+            options = dict(
+                pool_size=settings.DATABASE_POOL_SIZE,
+                max_overflow=settings.DATABASE_MAX_OVERFLOW,
+                pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+                # сервер рвёт долго простаивающие соединения
+                pool_recycle=settings.DATABASE_POOL_RECYCLE,
+            )
+        _engine = create_async_engine(url, **options)
+        Session.configure(bind=_engine)
+    return _engine
+
+
+def open_session():
+    """Новая AsyncSession; используется как async with open_session() as session."""
+    get_engine()
+    return Session()
+
+
+async def connect():
+    """Открывает первое соединение пула: ошибки настройки базы видны при старте, а не на первом пользователе."""
+    async with get_engine().connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def dispose():
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+def pool_status():
+    return _engine.pool.status() if _engine is not None else "не создан"
@@ -0,0 +1,44 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src._settings import settings_factory
+from src.database.models.models import Base
+from src.database.urls import async_url
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _url():
+    # настройки читаются, только если адрес не передан через -x url
+    url = context.get_x_argument(as_dictionary=True).get("url") or settings_factory().DATABASE_URL
+    return async_url(url)
+
+
+def _run_migrations(connection):
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online():
+    engine = create_async_engine(_url())
+    async with engine.connect() as connection:
+        await connection.run_sync(_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    # alembic upgrade head --sql: SQL без подключения к базе
+    context.configure(url=_url().render_as_string(hide_password=False), target_metadata=target_metadata,
+                      literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+else:
+    asyncio.run(run_migrations_online())
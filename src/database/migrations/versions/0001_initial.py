@@ -0,0 +1,47 @@
+"""Начальная схема: user_data и interpretation_cache
+
+В базе, где таблицы уже созданы прежним Base.metadata.create_all при старте бота,
+вместо upgrade выполняется alembic stamp 0001.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_data",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(), nullable=True),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("birth_date", sa.Date(), nullable=False),
+        sa.Column("birth_time", sa.Time(), nullable=False),
+        sa.Column("chart_interpretation", sa.Text(), nullable=True),
+        sa.Column("zodiac_info", sa.Text(), nullable=True),
+        sa.Column("houses_info", sa.Text(), nullable=True),
+        sa.Column("vimshottari_dasha", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "interpretation_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("template_version", sa.String(), nullable=False),
+        sa.Column("interpretation", sa.Text(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_hit_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("interpretation_cache")
+    op.drop_table("user_data")
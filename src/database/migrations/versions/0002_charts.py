@@ -0,0 +1,199 @@
+"""Карты в числовом виде: charts и chart_interpretations, перенос строк user_data
+
+telegram_id в user_data становится BIGINT: id Telegram давно вышли за 2^31. Строки user_data переносятся
+в charts разбором их текста (_parse_legacy_row); строки, которые не разобрать, остаются только в user_data.
+Разбор и форматы charts скопированы сюда из services.chart_storage на момент ревизии: миграция не зависит
+от кода бота и не меняется вместе с ним. Времени сохранения в user_data нет: перенесённые карты получают время
+миграции, а порядок между ними сохраняется по id. Таблица user_data не удаляется.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import logging
+import re
+import struct
+from datetime import datetime, timedelta
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# строк user_data за один проход переноса
+CHUNK_SIZE = 1000
+
+# формат charts версии 0002: порядок планет в planets, биты флагов по отметкам в символе планеты
+# (ретроградность, экзальтация, падение, мулатрикона) и шкала даш — версия, порядковые дни рождения,
+# номер планеты первой махадаши в DASHA_ORDER, прошедшие годы
+PLANET_SYMBOLS = ["Su", "Mo", "Ma", "Ve", "Me", "Jp", "Sa", "Ra", "Ke"]
+FLAG_MARKS = [("(", 1), ("↑", 2), ("↓", 4), ("\u035F", 8)]
+DASHA_FORMAT = struct.Struct("<BdBd")
+DASHA_FORMAT_VERSION = 1
+
+ZODIAC_SIGNS = ["♈", "♉", "♊", "♋", "♌", "♍", "♎", "♏", "♐", "♑", "♒", "♓"]
+DASHA_ORDER = ["Кету", "Венера", "Солнце", "Луна", "Марс", "Раху", "Юпитер", "Сатурн", "Меркурий"]
+DASHA_YEARS = {"Кету": 7, "Венера": 20, "Солнце": 6, "Луна": 10, "Марс": 7, "Раху": 18, "Юпитер": 16,
+               "Сатурн": 19, "Меркурий": 17}
+NAKSHATRA_SPAN = 360 / 27
+
+# «Su  (БK)  ♍ 20˚52'02"   Хаста 4»: символ, чара-карака (не у всех), знак, градусы
+_LEGACY_POSITION = re.compile(r"^(\w+)\s+(?:\(\S+\)\s+)?(\S)\s+(\d+)˚(\d+)'(\d+)\"")
+_LEGACY_HOUSE = re.compile(r"^(.+), Дом: (\d+)$")
+
+
+def upgrade():
+    with op.batch_alter_table("user_data") as batch:
+        batch.alter_column("telegram_id", type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+
+    charts = op.create_table(
+        "charts",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("username", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=True),
+        sa.Column("longitude", sa.Float(), nullable=True),
+        sa.Column("birth_date", sa.Date(), nullable=False),
+        sa.Column("birth_time", sa.Time(), nullable=False),
+        sa.Column("ascendant_sign", sa.SmallInteger(), nullable=False),
+        sa.Column("ascendant", sa.Float(), nullable=True),
+        sa.Column("planets", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=False),
+        sa.Column("dasha", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_charts_telegram_id_created_at", "charts", ["telegram_id", "created_at"])
+    interpretations = op.create_table(
+        "chart_interpretations",
+        sa.Column("chart_id", sa.BigInteger(), sa.ForeignKey("charts.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("prompt_variant", sa.String(), nullable=True),
+        sa.Column("interpretation", sa.Text(), nullable=False),
+    )
+    _copy_user_data(charts, interpretations)
+
+
+def _copy_user_data(charts, interpretations):
+    if context.is_offline_mode():
+        # с --sql печатается только схема: перенос строк требует разбора текста в Python
+        return
+    connection = op.get_bind()
+    user_data = sa.table(
+        "user_data",
+        sa.column("id", sa.BigInteger()),
+        sa.column("telegram_id", sa.BigInteger()),
+        sa.column("username", sa.String()),
+        sa.column("location", sa.String()),
+        sa.column("birth_date", sa.Date()),
+        sa.column("birth_time", sa.Time()),
+        sa.column("chart_interpretation", sa.Text()),
+        sa.column("zodiac_info", sa.Text()),
+    )
+    last_id = connection.scalar(sa.select(sa.func.max(user_data.c.id)))
+    if last_id is None:
+        return
+    migrated_at = datetime.utcnow()
+    copied = skipped = 0
+    after_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(user_data).where(user_data.c.id > after_id).order_by(user_data.c.id).limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        after_id = rows[-1].id
+        records = [
+            record for row in rows
+            for record in [_parse_legacy_row(row, migrated_at - timedelta(microseconds=last_id - row.id))]
+            if record is not None
+        ]
+        skipped += len(rows) - len(records)
+        if not records:
+            continue
+        chart_ids = connection.scalars(
+            charts.insert().returning(charts.c.id, sort_by_parameter_order=True),
+            [record["chart"] for record in records],
+        ).all()
+        rows_with_text = [
+            dict(chart_id=chart_id, **record["interpretation"])
+            for chart_id, record in zip(chart_ids, records)
+            if record["interpretation"]
+        ]
+        if rows_with_text:
+            connection.execute(interpretations.insert(), rows_with_text)
+        copied += len(records)
+    logger.info("Перенесено карт из user_data: %d, не разобрано: %d", copied, skipped)
+
+
+def _clean_symbol(symbol):
+    for mark in ["↑", "↓", "\u035F", "(", ")"]:
+        symbol = symbol.replace(mark, "")
+    return symbol.strip()
+
+
+def _parse_legacy_row(row, created_at):
+    """
+    Строки charts и chart_interpretations из строки user_data или None, если текст карты не разобрать.
+    Долготы берутся из «Знаки зодиака с градусами» (с точностью до угловой секунды), отметки планет и знак
+    асцендента — из «Планеты и их дома», шкала даш пересчитывается по Луне.
+    """
+    if not row.zodiac_info:
+        return None
+    longitudes, symbols, ascendant_signs = {}, {}, set()
+    for line in row.zodiac_info.splitlines():
+        position = _LEGACY_POSITION.match(line)
+        if position and position.group(2) in ZODIAC_SIGNS:
+            symbol, sign, degree, minutes, seconds = position.groups()
+            longitudes[symbol] = ZODIAC_SIGNS.index(sign) * 30 + int(degree) + int(minutes) / 60 + int(seconds) / 3600
+            continue
+        house = _LEGACY_HOUSE.match(line)
+        if house:
+            symbols[_clean_symbol(house.group(1))] = (house.group(1), int(house.group(2)))
+    if set(longitudes) != set(PLANET_SYMBOLS) or set(symbols) != set(PLANET_SYMBOLS):
+        return None
+    for symbol, (_, house_number) in symbols.items():
+        ascendant_signs.add((int(longitudes[symbol] // 30) - house_number + 1) % 12)
+    if len(ascendant_signs) != 1:
+        return None
+
+    # накшатра Луны даёт планету первой махадаши и прошедшую её долю
+    moon = longitudes["Mo"] % 360
+    nakshatra = min(int(moon * 27 // 360), 26)
+    starting_planet = DASHA_ORDER[nakshatra % len(DASHA_ORDER)]
+    percent_passed = (moon - nakshatra * NAKSHATRA_SPAN) / NAKSHATRA_SPAN * 100
+    years_passed = DASHA_YEARS[starting_planet] * (percent_passed / 100)
+    return {
+        "chart": dict(
+            telegram_id=row.telegram_id,
+            username=row.username,
+            created_at=created_at,
+            location=row.location,
+            latitude=None,
+            longitude=None,
+            birth_date=row.birth_date,
+            birth_time=row.birth_time,
+            ascendant_sign=ascendant_signs.pop(),
+            ascendant=None,
+            planets=[
+                [round(longitudes[symbol], 6), sum(bit for mark, bit in FLAG_MARKS if mark in symbols[symbol][0])]
+                for symbol in PLANET_SYMBOLS
+            ],
+            dasha=DASHA_FORMAT.pack(DASHA_FORMAT_VERSION, float(row.birth_date.toordinal()),
+                                    DASHA_ORDER.index(starting_planet), years_passed),
+        ),
+        "interpretation": dict(interpretation=row.chart_interpretation, prompt_variant=None)
+        if row.chart_interpretation else None,
+    }
+
+
+def downgrade():
+    op.drop_table("chart_interpretations")
+    op.drop_index("ix_charts_telegram_id_created_at", table_name="charts")
+    op.drop_table("charts")
+    with op.batch_alter_table("user_data") as batch:
+        batch.alter_column("telegram_id", type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
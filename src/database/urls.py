@@ -0,0 +1,13 @@
+"""
+Адрес базы с асинхронным драйвером. Модуль не читает настройки бота и не создаёт Bot, поэтому им
+пользуются и миграции alembic (src/database/migrations/env.py).
+"""
+from sqlalchemy.engine import make_url
+
+# синхронные драйверы в DATABASE_URL заменяются асинхронными
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
@@ -1,6 +1,8 @@
 import logging
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 from src._settings import settings_factory
 
@@ -11,6 +13,7 @@ logging.basicConfig(level=logging.INFO)
 if not settings.API_TOKEN:
     raise ValueError("API_TOKEN not found")
 
-bot = Bot(token=settings.API_TOKEN, request_timeout=settings.REQUEST_TIMEOUT)
+session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL)) if settings.TELEGRAM_API_URL else None
+bot = Bot(token=settings.API_TOKEN, session=session, request_timeout=settings.REQUEST_TIMEOUT)
 dp = Dispatcher()
 openai_api_key = settings.OPENAI_API_KEY
@@ -0,0 +1,63 @@
+from aiogram import types, Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from src.services.dasha import DASHA_LEVELS, render_dasha_page, format_moment
+from src.utils.chart_data import dasha_order
+
+router = Router()
+
+# в callback_data лежит всё, что нужно для пересчёта страницы: момент рождения, управитель накшатры Луны,
+# прошедшая до рождения часть первой махадаши и путь — номера открытых периодов по уровням
+DASHA_CALLBACK_PREFIX = "dasha_"
+
+
+def dasha_callback_data(birth, starting_planet, years_passed, path):
+    return f"{DASHA_CALLBACK_PREFIX}{birth:.5f}_{dasha_order.index(starting_planet)}_{years_passed:.9f}_{path}"
+
+
+def parse_dasha_callback_data(data):
+    birth, planet_index, years_passed, path = data.removeprefix(DASHA_CALLBACK_PREFIX).split("_")
+    return float(birth), dasha_order[int(planet_index)], float(years_passed), path
+
+
+def dasha_page(birth, starting_planet, years_passed, path=""):
+    text, children = render_dasha_page(birth, starting_planet, years_passed, [int(step) for step in path])
+    level = len(path)
+
+    builder = InlineKeyboardBuilder()
+    if level + 1 < DASHA_LEVELS:
+        for position, (planet, start, end) in enumerate(children):
+            builder.add(types.InlineKeyboardButton(
+                text=f"{planet}: {format_moment(start, level)} – {format_moment(end, level)}",
+                callback_data=dasha_callback_data(birth, starting_planet, years_passed, path + str(position)),
+            ))
+    if path:
+        builder.add(types.InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=dasha_callback_data(birth, starting_planet, years_passed, path[:-1]),
+        ))
+    builder.adjust(1)
+    return text, builder.as_markup()
+
+
+async def send_dasha_navigation(message: types.Message, timeline):
+    text, markup = dasha_page(timeline.birth, timeline.starting_planet, timeline.years_passed)
+    await message.answer(text, reply_markup=markup)
+
+
+@router.callback_query(lambda c: c.data.startswith(DASHA_CALLBACK_PREFIX))
+async def process_dasha_navigation(callback_query: types.CallbackQuery):
+    try:
+        text, markup = dasha_page(*parse_dasha_callback_data(callback_query.data))
+    except (ValueError, IndexError):
+        await callback_query.answer("Период не найден. Рассчитайте карту ещё раз.", show_alert=True)
+        return
+
+    try:
+        await callback_query.message.edit_text(text, reply_markup=markup)
+    except TelegramBadRequest as e:
+        # повторное нажатие той же кнопки: страница уже на экране
+        if "message is not modified" not in e.message:
+            raise
+    finally:
+        await callback_query.answer()
@@ -1,24 +1,35 @@
-from datetime import datetime, timedelta
+import asyncio
+from dataclasses import asdict
+from datetime import datetime
 from aiogram import types, Router
 from aiogram.fsm.context import FSMContext
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.types import BufferedInputFile
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from geopy.exc import GeocoderTimedOut
-from sqlalchemy.exc import SQLAlchemyError
-from geopy import Nominatim
-from src.database.models.models import Session, UserData
+from src.dispatcher.dispatcher import settings
 from src.services.astrology import calculate_planet_positions, draw_north_indian_chart, calculate_asc, get_house_info, \
-    calculate_karakas, get_nakshatra_and_pada, get_moon_degree, get_moon_nakshatra, calculate_antardasha
-from src.services.openai import chat_gpt
-from src.utils.chart_data import zodiac_to_number, to_decimal_degrees, zodiac_symbols_to_names, get_starting_planet, \
-    calculate_remaining_time, dasha_order, planet_periods
-from src.utils.keyboards import start_keyboard, retry_keyboard, replace_yo_with_e
-from src.utils.message import send_long_message
+    calculate_karakas, get_nakshatra_and_pada, calculate_vimshottari_dasha
+from src.handlers.dasha_handlers import send_dasha_navigation
+from src.services.chart_cache import chart_cache, chart_fingerprint
+from src.services.chart_encoding import image_format
+from src.services.chart_storage import chart_record, pack_timeline
+from src.services.chart_writer import chart_writer
+from src.services.dasha import render_vimshottari_dasha
+from src.services.interpretation_cache import interpretation_cache, interpretation_key
+from src.services.geocoding import search_cities, resolve_location, ResolvedLocation
+from src.services.gazetteer import normalize_city_name
+from src.services.openai import InterpretationUnavailable, stream_chat_gpt
+from src.services.prompts import build_prompt, choose_variant, compact_chart
+from src.services.workers import WorkerPoolFull
+from src.utils.chart_data import zodiac_to_number, build_chart_context, clean_planet_symbol
+from src.utils.chart_layout import layout_chart
+from src.utils.keyboards import start_keyboard, retry_keyboard
+from src.utils.message import send_long_message, stream_long_message
 
 router = Router()
-geolocator = Nominatim(user_agent="jyotish_bot", timeout=10)
 CITIES_PER_PAGE = 5
 
 
@@ -84,38 +95,30 @@ async def process_location(message: types.Message, state: FSMContext):
         return
 
     try:
-        locations = geolocator.geocode(user_input, exactly_one=False, limit=52, language="ru")
-        if not locations:
+        cities = await search_cities(user_input)
+        if not cities:
             await message.answer("Город не найден. Пожалуйста, попробуйте еще раз.")
             return
 
-        exact_match_found = False
-        for location in locations:
-            city_name = location.address.split(",")[0].strip()
-            if replace_yo_with_e(user_input.lower()) == replace_yo_with_e(city_name.lower()):
-                exact_match_found = True
-                break
+        normalized_input = normalize_city_name(user_input)
+        exact_match_found = any(normalize_city_name(city.name) == normalized_input for city in cities)
 
         if not exact_match_found:
             await message.answer("Город не найден. Пожалуйста, введите полное название города.")
             return
 
-        unique_locations = []
+        unique_cities = []
         seen_cities = set()
-        for location in locations:
-            city_name = location.address.split(",")[0].strip()
-            region = location.address.split(",")[2].strip() if len(location.address.split(",")) > 2 else ""
-            country = location.address.split(",")[-1].strip()
-
-            city_id = f"{city_name}, {region}, {country}"
+        for city in cities:
+            city_id = f"{city.name}, {city.region}, {city.country}"
 
             if city_id not in seen_cities:
                 seen_cities.add(city_id)
-                unique_locations.append(location)
+                unique_cities.append(city)
 
-        unique_locations.sort(key=lambda loc: loc.address.split(",")[-1].strip())
+        unique_cities.sort(key=lambda city: city.country)
 
-        await state.update_data(all_locations=unique_locations, page=0)
+        await state.update_data(all_locations=unique_cities, page=0)
 
         await show_city_page(message, state)
 
@@ -135,23 +138,9 @@ async def show_city_page(message: types.Message, state: FSMContext):
     current_locations = all_locations[start_index:end_index]
 
     builder = InlineKeyboardBuilder()
-    for location in current_locations:
-
-        address_parts = location.address.split(",")
-        city_name = address_parts[0].strip()
-        country = address_parts[-1].strip()
-
-        if len(address_parts) > 2:
-            region = address_parts[2].strip()
-            if region and region != country:
-                button_text = f"{city_name}, {region}, {country}"
-            else:
-                button_text = f"{city_name}, {country}"
-        else:
-            button_text = f"{city_name}, {country}"
-
-        callback_data = f"city_{location.latitude}_{location.longitude}"
-        builder.add(types.InlineKeyboardButton(text=button_text, callback_data=callback_data))
+    for city_index, city in enumerate(current_locations, start=start_index):
+        callback_data = f"city_{city_index}"
+        builder.add(types.InlineKeyboardButton(text=city.title, callback_data=callback_data))
 
     if page > 0:
         builder.add(types.InlineKeyboardButton(text="⬅️ Назад", callback_data="prev_page"))
@@ -180,17 +169,27 @@ async def process_page_navigation(callback_query: types.CallbackQuery, state: FS
 
 @router.callback_query(lambda c: c.data.startswith('city_'))
 async def process_city_selection(callback_query: types.CallbackQuery, state: FSMContext):
-    _, latitude, longitude = callback_query.data.split('_')
-    city_coords = (float(latitude), float(longitude))
+    user_data = await state.get_data()
+    all_locations = user_data.get("all_locations") or []
+    # в data — номер города в списке из состояния; устаревшие или чужие данные city_ отклоняются
+    try:
+        city_index = int(callback_query.data.removeprefix("city_"))
+    except ValueError:
+        city_index = -1
+
+    if not 0 <= city_index < len(all_locations):
+        await callback_query.answer()
+        await callback_query.message.answer("Список городов устарел. Пожалуйста, введите место рождения ещё раз.")
+        return
 
     try:
-        location = geolocator.reverse(city_coords, exactly_one=True, language="ru")
-        city_address = location.address
-    except Exception as e:
-        await callback_query.message.answer(f"Не удалось получить адрес города: {e}")
+        location = resolve_location(all_locations[city_index])
+    except ValueError as e:
+        await callback_query.answer()
+        await callback_query.message.answer(str(e))
         return
 
-    await state.update_data(location=city_address)
+    await state.update_data(location=asdict(location))
     await confirm_and_proceed(callback_query.message, state)
 
 
@@ -212,46 +211,85 @@ async def confirm_and_proceed(message: types.Message, state: FSMContext):
             f"Локация введена некорректно. Пожалуйста, введите корректные координаты или название города. {e}")
 
 
-async def save_user_data(message: types.Message, user_data: dict, interpretation: str = None,
-                         zodiac_info: str = None, houses_info: str = None, vimshottari_dasha: str = None):
-    session = Session()
+def save_chart(message: types.Message, user_data: dict, ascendant: float, planets_positions, dasha_timeline,
+               interpretation: str = None, prompt_variant: str = None):
+    """Ставит карту в очередь записи в базу (см. services.chart_writer): обработчик базу не ждёт."""
+    location = user_data['location']
+    chart_writer.submit(chart_record(
+        telegram_id=message.chat.id,
+        username=message.chat.username,
+        location=location['display_name'],
+        latitude=location['latitude'],
+        longitude=location['longitude'],
+        birth_date=datetime.strptime(user_data['birth_date'], "%d-%m-%Y").date(),
+        birth_time=datetime.strptime(user_data['birth_time'], "%H:%M:%S").time(),
+        ascendant=ascendant,
+        planet_positions=planets_positions,
+        dasha=pack_timeline(dasha_timeline),
+        interpretation=interpretation,
+        prompt_variant=prompt_variant,
+    ))
+
+
+async def send_chart(message: types.Message, labels):
+    fingerprint = chart_fingerprint(labels)
+    caption = "Ваш North Indian Chart."
+
+    file_id = await chart_cache.file_id(fingerprint)
+    if file_id is not None:
+        try:
+            await message.answer_photo(photo=file_id, caption=caption)
+            return
+        except TelegramBadRequest:
+            await chart_cache.forget_file_id(fingerprint)
+
+    chart_image = await chart_cache.get_or_render(fingerprint, lambda: draw_north_indian_chart(labels))
+    photo = BufferedInputFile(chart_image, filename=f"chart.{image_format(chart_image)}")
+    sent = await message.answer_photo(photo=photo, caption=caption)
+    await chart_cache.remember_file_id(fingerprint, sent.photo[-1].file_id)
+
+
+async def send_interpretation(message: types.Message, prompt):
+    """Расшифровка из кэша или потоком от модели; None, если получить её не удалось."""
+    cache_key = interpretation_key(prompt)
+    interpretation = await interpretation_cache.get(cache_key)
+    if interpretation:
+        await send_long_message(message, f"Расшифровка натальной карты:\n{interpretation}")
+        return interpretation
+
+    # сообщение-заглушка превращается в расшифровку, как только модель начнёт отвечать
+    processing_message = await message.answer("Обрабатываем результаты расчета...")
+    stream = stream_chat_gpt(prompt)
     try:
-        user_data_entry = UserData(
-            telegram_id=message.chat.id,
-            username=message.chat.username,
-            location=user_data['location'],
-            birth_date=datetime.strptime(user_data['birth_date'], "%d-%m-%Y").date(),
-            birth_time=datetime.strptime(user_data['birth_time'], "%H:%M:%S").time(),
-            chart_interpretation=interpretation,
-            zodiac_info=zodiac_info,
-            houses_info=houses_info,
-            vimshottari_dasha=vimshottari_dasha
+        interpretation = await stream_long_message(
+            message,
+            stream,
+            prefix="Расшифровка натальной карты:\n",
+            placeholder=processing_message,
+            interval=settings.INTERPRETATION_EDIT_INTERVAL,
         )
-        session.add(user_data_entry)
-        session.commit()
-    except SQLAlchemyError as e:
-        session.rollback()
-        await message.answer(f"Ошибка сохранения данных: {str(e)}")
-    finally:
-        session.close()
+    except InterpretationUnavailable:
+        interpretation = None
+    if not interpretation:
+        # заглушку stream_long_message уже удалил, если текста не было
+        await message.answer("Не удалось получить расшифровку натальной карты. Пожалуйста, попробуйте позже.")
+        return None
+
+    # обрезанный по лимиту токенов ответ не кэшируется: в следующий раз модель ответит заново
+    if stream.finish_reason == "stop":
+        await interpretation_cache.set(cache_key, interpretation, prompt)
+    return interpretation
 
 
 async def calculate_and_send_chart(message: types.Message, user_data: dict):
     birth_date = user_data['birth_date']
     birth_time = user_data['birth_time']
-    location = user_data['location']
-
-    if "-" in birth_date:
-        birth_date_obj = datetime.strptime(birth_date, "%d-%m-%Y")
-    elif "." in birth_date:
-        birth_date_obj = datetime.strptime(birth_date, "%d.%m.%Y")
-    else:
-        await message.answer("Ошибка: Неверный формат даты рождения.")
-        return
+    location = ResolvedLocation(**user_data['location'])
 
-    planets_positions, zodiac_signs = await calculate_planet_positions(birth_date, birth_time, location)
+    context = build_chart_context(birth_date, birth_time, location)
+    planets_positions, zodiac_signs = await calculate_planet_positions(context)
     karakas = await calculate_karakas(planets_positions)
-    asc_positions, asc_zodiac_signs = await calculate_asc(birth_date, birth_time, location)
+    asc_positions, asc_zodiac_signs = await calculate_asc(context)
 
     ascendant_info = asc_zodiac_signs.get("Asc")
     if not ascendant_info:
@@ -259,9 +297,7 @@ async def calculate_and_send_chart(message: types.Message, user_data: dict):
         return
 
     asc_sign, asc_deg, asc_min, asc_sec = ascendant_info
-    asc_longitude = to_decimal_degrees(asc_deg, asc_min, asc_sec)
-    asc_nakshatra, asc_pada = await get_nakshatra_and_pada(zodiac_symbols_to_names.get(asc_sign, asc_sign),
-                                                           asc_longitude)
+    asc_nakshatra, asc_pada = get_nakshatra_and_pada(asc_positions[0][1])
     ascendant_string = f"Asc {asc_sign} {asc_deg}˚{asc_min:02d}'{asc_sec:02d}\"   {asc_nakshatra} {asc_pada}"
 
     asc_sign_number = zodiac_to_number.get(asc_sign)
@@ -270,96 +306,58 @@ async def calculate_and_send_chart(message: types.Message, user_data: dict):
         return
 
     house_info = await get_house_info(asc_sign, planets_positions)
-    chart_image, planet_house_info = await draw_north_indian_chart(asc_sign_number, planets_positions)
-    input_file = BufferedInputFile(chart_image.read(), filename="chart.png")
-    await message.answer_photo(photo=input_file, caption="Ваш North Indian Chart.")
+    chart_labels, _ = layout_chart(asc_sign_number, planets_positions)
+    try:
+        await send_chart(message, chart_labels)
+    except WorkerPoolFull:
+        await message.answer("Сейчас строится слишком много карт. Пожалуйста, попробуйте через пару минут.",
+                             reply_markup=retry_keyboard)
+        return
+    except asyncio.TimeoutError:
+        await message.answer("Не удалось построить карту вовремя. Пожалуйста, попробуйте ещё раз.",
+                             reply_markup=retry_keyboard)
+        return
 
     karakas_by_planet = {v: k for k, v in karakas.items()}
+    nakshatras = {clean_planet_symbol(symbol): get_nakshatra_and_pada(longitude)
+                  for symbol, longitude in planets_positions}
 
     zodiac_info = "\n".join([
         f"{symbol:<3} {karakas_by_planet.get(symbol, ' '):<5} {zodiac_sign} {degree:>2}˚{minutes:02d}'{seconds:02d}\"   {nakshatra} {pada}"
         if karakas_by_planet.get(symbol) else
         f"{symbol:<3} {zodiac_sign} {degree:>2}˚{minutes:02d}'{seconds:02d}\"   {nakshatra} {pada}"
         for symbol, (zodiac_sign, degree, minutes, seconds) in zodiac_signs.items()
-        if (nakshatra := (await get_nakshatra_and_pada(zodiac_symbols_to_names.get(zodiac_sign, zodiac_sign),
-                                                       to_decimal_degrees(degree, minutes, seconds)))[0]) and
-           (pada := (await get_nakshatra_and_pada(zodiac_symbols_to_names.get(zodiac_sign, zodiac_sign),
-                                                  to_decimal_degrees(degree, minutes, seconds)))[1])
+        for nakshatra, pada in [nakshatras[symbol]]
     ])
 
-    planet_house_text = "\n\nПланеты и их дома:\n" + "\n".join(planet_house_info)
-    zodiac_info_full = f"Знаки зодиака с градусами:\n{zodiac_info}{planet_house_text}"
     house_info_text = "Дома в карте:\n" + "\n".join(house_info)
 
-    moon_nakshatra = await get_moon_nakshatra(planets_positions)
-    starting_planet = get_starting_planet(moon_nakshatra)
-    moon_degree = await get_moon_degree(planets_positions)
-    years_remaining, years_passed = calculate_remaining_time(moon_degree, starting_planet)
-    start_index = dasha_order.index(starting_planet)
-    sequence = dasha_order[start_index:] + dasha_order[:start_index]
-
-    vimshottari_dasha = "Последовательность периодов (Ви́мшоттари-да́ша):\n\n"
-    mahadasha_details = ""
-    end_of_life = birth_date_obj + timedelta(days=120 * 365.25)
-    # тут обновил
-    mahadasha_start = birth_date_obj - timedelta(days=years_passed * 365.25)
-
-    for i, planet in enumerate(sequence):
-        if i == 0:
-            full_period_years = planet_periods[planet]
-            mahadasha_end = mahadasha_start + timedelta(days=full_period_years * 365.25)
-            vimshottari_dasha += (
-                f"▸ {planet}: {years_remaining:.2f} лет\n"
-                f"   Начало: {birth_date_obj.strftime('%d.%m.%Y')}\n"
-                f"   Конец: {mahadasha_end.strftime('%d.%m.%Y')}\n\n"
-            )
-            antardasha_text = await calculate_antardasha(planet, full_period_years, mahadasha_start, is_first=True,
-                                                         birth_date=birth_date_obj)
-            mahadasha_details += antardasha_text
-        else:
-            mahadasha_start = mahadasha_end
-            full_period_years = planet_periods[planet]
-            mahadasha_end = mahadasha_start + timedelta(days=full_period_years * 365.25)
-            vimshottari_dasha += (
-                f"▸ {planet}: {full_period_years:.2f} лет\n"
-                f"   Начало: {mahadasha_start.strftime('%d.%m.%Y')}\n"
-                f"   Конец: {mahadasha_end.strftime('%d.%m.%Y')}\n\n"
-            )
-            antardasha_text = await calculate_antardasha(planet, full_period_years, mahadasha_start)
-            mahadasha_details += antardasha_text
-
-    mahadasha_start = mahadasha_end
-    remaining_years = years_passed
-    mahadasha_end = end_of_life
-    vimshottari_dasha += (
-        f"▸ {starting_planet}: {remaining_years:.2f} лет\n"
-        f"   Начало: {mahadasha_start.strftime('%d.%m.%Y')}\n"
-        f"   Конец: {mahadasha_end.strftime('%d.%m.%Y')}\n"
+    dasha_timeline = await calculate_vimshottari_dasha(context, planets_positions)
+    vimshottari_dasha = render_vimshottari_dasha(dasha_timeline)
+
+    await send_long_message(message, vimshottari_dasha)
+    await send_dasha_navigation(message, dasha_timeline)
+    await message.answer(f"Знаки зодиака с градусами:\n{zodiac_info}\n{ascendant_string}")
+    await message.answer(house_info_text)
+
+    prompt = build_prompt(
+        choose_variant(settings.PROMPT_VARIANT, message.chat.id),
+        house_info_text,
+        vimshottari_dasha,
+        compact_chart(asc_sign, planets_positions, dasha_timeline),
     )
-    vimshottari_dasha += "Общая продолжительность: 120 лет"
-    antardasha_text = await calculate_antardasha(starting_planet, planet_periods[starting_planet], mahadasha_start,
-                                                 is_last=True, end_of_life=end_of_life)
-    mahadasha_details += antardasha_text
+    interpretation = await send_interpretation(message, prompt)
 
-    interpretation = await chat_gpt(house_info_text, vimshottari_dasha)
-    await save_user_data(
+    save_chart(
         message,
         user_data,
+        asc_positions[0][1],
+        planets_positions,
+        dasha_timeline,
         interpretation=interpretation,
-        zodiac_info=zodiac_info_full,
-        houses_info=house_info_text,
-        vimshottari_dasha=vimshottari_dasha + "\n" + mahadasha_details
+        prompt_variant=prompt.variant,
     )
 
-    await send_long_message(message, vimshottari_dasha)
-    await send_long_message(message, mahadasha_details)
-    await message.answer(f"Знаки зодиака с градусами:\n{zodiac_info}\n{ascendant_string}")
-    await message.answer(house_info_text)
-
-    processing_message = await message.answer("Обрабатываем результаты расчета...")
-    await processing_message.delete()
-    await send_long_message(message, f"Расшифровка натальной карты:\n{interpretation}")
-
     await message.answer(
         "Если хотите рассчитать новую карту, нажмите на кнопку ниже.",
         reply_markup=retry_keyboard
@@ -1,17 +1,50 @@
-import matplotlib.pyplot as plt
-import swisseph as swe
-import io
-from matplotlib.path import Path
-from src.utils.chart_data import planet_positions_by_house, zodiac_signs_list, zodiac_coords, polygons, planets, \
-    zodiac_names, get_basic_astro_data, add_position_data, position_data_with_retrograde, clean_planet_symbol, \
-    NAKSHATRAS, planet_periods, dasha_order
-from datetime import timedelta
-from itertools import accumulate
-
-
-async def calculate_planet_positions(birth_date, birth_time, location):
-    astro_data = await get_basic_astro_data(birth_date, birth_time, location)
-    julian_day = astro_data["julian_day"]
+import asyncio
+import logging
+import math
+import numpy as np
+from src.dispatcher.dispatcher import settings
+from src.services.ephemeris import compute_ascendant, compute_batch, compute_planets, init_worker
+from src.services.workers import WorkerPool
+from src.utils.chart_data import ASCENDANT_AYANAMSA, zodiac_names, add_position_data, position_data_with_retrograde, \
+    clean_planet_symbol, calculate_remaining_time, planets
+from src.utils.nakshatra import resolve_nakshatra, resolve_nakshatras
+from src.services.dasha import build_vimshottari_timeline
+from datetime import datetime
+
+if settings.CHART_RENDERER == "svg":
+    from src.services.chart_svg import init_render_worker, render_chart_job
+else:
+    from src.services.chart_render import init_render_worker, render_chart_job
+
+logger = logging.getLogger(__name__)
+
+CHART_IMAGE_FORMATS = tuple(image_format.strip() for image_format in settings.CHART_IMAGE_FORMATS.split(",")
+                            if image_format.strip())
+
+BATCH_CHUNK_SIZE = 2048
+BATCH_GRAHAS = [symbol for _, symbol in planets]
+
+ephemeris_pool = WorkerPool(
+    "ephemeris",
+    workers=settings.EPHEMERIS_WORKERS,
+    queue_depth=settings.EPHEMERIS_QUEUE_DEPTH,
+    initializer=init_worker,
+    initargs=(settings.EPHEMERIS_TABLE_TOLERANCE,),
+)
+
+render_pool = WorkerPool(
+    "render",
+    workers=settings.RENDER_WORKERS,
+    queue_depth=settings.RENDER_WORKERS,
+    initializer=init_render_worker,
+    initargs=(settings.CHART_DPI,),
+    max_waiting=settings.RENDER_MAX_WAITING,
+    timeout=settings.RENDER_TIMEOUT,
+)
+
+
+async def calculate_planet_positions(context):
+    planet_data = await ephemeris_pool.run(compute_planets, context.julian_day, context.latitude, context.longitude)
 
     zodiac_signs = {}
     positions = []
@@ -19,11 +52,7 @@ async def calculate_planet_positions(birth_date, birth_time, location):
     rahu_position = None
     ketu_position = None
 
-    for planet, symbol in planets:
-        position, flags = swe.calc_ut(julian_day, planet, swe.FLG_SIDEREAL | swe.FLG_SWIEPH | swe.FLG_SPEED)
-        longitude = position[0]
-        speed = position[3]
-
+    for symbol, longitude, speed in planet_data:
         is_retrograde = speed < 0
 
         if symbol == "Ra":
@@ -43,17 +72,43 @@ async def calculate_planet_positions(birth_date, birth_time, location):
     return positions, zodiac_signs
 
 
-async def calculate_asc(birth_date, birth_time, location):
-    astro_data = await get_basic_astro_data(birth_date, birth_time, location)
-    julian_day = astro_data["julian_day"]
-    latitude = astro_data["latitude"]
-    longitude = astro_data["longitude"]
-
+async def calculate_planet_positions_batch(julian_days, latitudes, longitudes, chunk_size=None):
+    """
+    Пакетный вариант calculate_planet_positions/calculate_asc для фоновых задач.
+    Возвращает словарь NumPy-массивов: longitudes, speeds, retrograde, nakshatras (индексы в NAKSHATRA_NAMES),
+    padas формы (N, 9) в порядке BATCH_GRAHAS и ascendants формы (N,). Массив делится на части, которые
+    параллельно считаются в пуле эфемерид.
+    """
+    julian_days = np.asarray(julian_days, dtype=float)
+    latitudes = np.broadcast_to(np.asarray(latitudes, dtype=float), julian_days.shape)
+    longitudes = np.broadcast_to(np.asarray(longitudes, dtype=float), julian_days.shape)
+
+    if chunk_size is None:
+        chunk_size = min(BATCH_CHUNK_SIZE, max(1, math.ceil(len(julian_days) / ephemeris_pool.workers)))
+
+    chunks = await asyncio.gather(*(
+        ephemeris_pool.run(
+            compute_batch,
+            julian_days[start:start + chunk_size],
+            latitudes[start:start + chunk_size],
+            longitudes[start:start + chunk_size],
+        )
+        for start in range(0, len(julian_days), chunk_size)
+    ))
+    if not chunks:
+        chunks = [compute_batch(julian_days, latitudes, longitudes)]
+
+    result = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+    result["nakshatras"], result["padas"], _ = resolve_nakshatras(result["longitudes"])
+    return result
+
+
+async def calculate_asc(context):
     zodiac_signs = {}
     positions = []
 
-    house_positions = swe.houses(julian_day, latitude, longitude, b'P')
-    asc_position = house_positions[0][0] - 23.88
+    asc_position = await ephemeris_pool.run(compute_ascendant, context.julian_day, context.latitude, context.longitude)
+    asc_position = asc_position - ASCENDANT_AYANAMSA
     asc_position = asc_position % 360
 
     add_position_data("Asc", asc_position, positions, zodiac_signs)
@@ -93,146 +148,17 @@ async def calculate_karakas(planets_positions):
     return karakas
 
 
-async def draw_north_indian_chart(ascendant_sign, planet_positions):
-    fig, ax = plt.subplots(figsize=(9, 9))
-    outer_size = 410
-
-    square = plt.Rectangle((5, 5), 410, 410, edgecolor='black', facecolor='black', linewidth=3)
-    ax.add_patch(square)
-
-    for points in polygons.values():
-        polygon = plt.Polygon(points, edgecolor='black', facecolor='white')
-        ax.add_patch(polygon)
-
-    ascendant_index = zodiac_signs_list.index(ascendant_sign)
-    house_planet_count = [0] * 12
-    house_aspect_count = [0] * 12
-    vertical_spacing = 20
-    base_x_offset = 10
-    base_y_offset = 10
-
-    for i in range(12):
-        sign_index = (ascendant_index + i) % 12
-        sign = zodiac_signs_list[sign_index]
-        x = zodiac_coords[i]["x"] + 15
-        y = zodiac_coords[i]["y"] - 7
-        ax.text(x, y, sign, fontsize=12, ha='center', va='center', color='black')
-
-    def is_point_in_polygon(x, y, polygon_points):
-        return Path(polygon_points).contains_point((x, y))
-
-    def calculate_aspects(planet, house_index):
-        aspects = []
-        if planet.startswith("Su"):
-            aspects.append((house_index + 6) % 12)
-        elif planet.startswith("Mo"):
-            aspects.append((house_index + 6) % 12)
-        elif planet.startswith("Ve"):
-            aspects.append((house_index + 6) % 12)
-        elif planet.startswith("Me"):
-            aspects.append((house_index + 6) % 12)
-        elif planet.startswith("Jp"):
-            aspects.extend([(house_index + 4) % 12, (house_index + 6) % 12, (house_index + 8) % 12])
-        elif planet.startswith("Sa"):
-            aspects.extend([(house_index + 2) % 12, (house_index + 6) % 12, (house_index + 9) % 12])
-        elif planet.startswith("Ma"):
-            aspects.extend([(house_index + 3) % 12, (house_index + 6) % 12, (house_index + 7) % 12])
-        elif planet.startswith("(Ra)"):
-            aspects.extend([(house_index + 4) % 12, (house_index + 6) % 12, (house_index + 8) % 12])
-        return aspects
-
-    occupied_positions = {i: [] for i in range(12)}
-    planet_house_info = []
-
-    for planet, position in planet_positions:
-        house_index = int(position // 30)
-        house_index = (house_index - ascendant_index) % 12
-        coords = planet_positions_by_house[house_index]
-        planet_index = house_planet_count[house_index]
-        house_planet_count[house_index] += 1
-
-        polygon_points = polygons[list(polygons.keys())[house_index]]
-
-        if planet_index < len(coords):
-            x = coords[planet_index]["x"] + base_x_offset
-            y = outer_size - coords[planet_index]["y"] + base_y_offset
-        else:
-            x = zodiac_coords[house_index]["x"] + base_x_offset
-            y = zodiac_coords[house_index]["y"] - (planet_index - len(coords)) * vertical_spacing + base_y_offset
-
-        max_iterations = 200
-        iteration = 0
-
-        while not is_point_in_polygon(x, outer_size - y, polygon_points) or any(
-                abs(pos[0] - x) < 20 and abs(pos[1] - y) < 20 for pos in occupied_positions[house_index]
-        ):
-            x += 5 if x < 200 else -5
-            y += 5 if y < 200 else -5
-            if x < 10 or x > 400 or y < 10 or y > 400:
-                x = min(max(x, 10), 400)
-                y = min(max(y, 10), 400)
-                break
-            iteration += 1
-            if iteration > max_iterations:
-                print(f"Warning: Max iterations reached for planet {planet} in house {house_index}")
-                break
-
-        occupied_positions[house_index].append((x, y))
-        ax.text(x, y, planet, fontsize=14, ha='center', va='center', color='black', fontweight='bold')
-
-        planet_house_info.append(f"{planet}, Дом: {house_index + 1}")
-
-    for planet, position in planet_positions:
-        house_index = int(position // 30)
-        house_index = (house_index - ascendant_index) % 12
-        aspects = calculate_aspects(planet, house_index)
-
-        for aspect_house_index in aspects:
-            coords = planet_positions_by_house[aspect_house_index]
-            aspect_index = house_aspect_count[aspect_house_index]
-            house_aspect_count[aspect_house_index] += 1
-            polygon_points = polygons[list(polygons.keys())[aspect_house_index]]
-
-            if aspect_index < len(coords):
-                x = coords[aspect_index]["x"] + base_x_offset - 15
-                y = outer_size - coords[aspect_index]["y"] + base_y_offset - 5
-            else:
-                x = zodiac_coords[aspect_house_index]["x"] + base_x_offset - 15
-                y = zodiac_coords[aspect_house_index]["y"] - (
-                        aspect_index - len(coords)) * vertical_spacing + base_y_offset - 5
-
-            max_iterations = 200
-            iteration = 0
-            while not is_point_in_polygon(x, outer_size - y, polygon_points) or any(
-                    abs(pos[0] - x) < 20 and abs(pos[1] - y) < 20 for pos in occupied_positions[aspect_house_index]
-            ):
-                x += 5 if x < 200 else -5
-                y += 5 if y < 200 else -5
-                if x < 10 or x > 400 or y < 10 or y > 400:
-                    x = min(max(x, 10), 400)
-                    y = min(max(y, 10), 400)
-                    break
-                iteration += 1
-                if iteration > max_iterations:
-                    print(f"Warning: Max iterations reached for aspect of {planet} in house {aspect_house_index}")
-                    break
-
-            occupied_positions[aspect_house_index].append((x, y))
-            aspect_planet = planet.replace("↑", "").replace("↓", "").replace("\u035F", "").replace("(", "").replace(")",
-                                                                                                                    "")
-            ax.text(x, y, aspect_planet, fontsize=11, ha='center', va='center', color='gray', alpha=0.5,
-                    fontweight='bold')
-
-    ax.set_xlim(0, outer_size + 10)
-    ax.set_ylim(0, outer_size + 10)
-    ax.set_aspect('equal')
-    ax.axis('off')
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0.1)
-    plt.close(fig)
-    buf.seek(0)
-    return buf, planet_house_info
+async def draw_north_indian_chart(labels):
+    """
+    Закодированная карта (PNG или WebP, см. chart_encoding) по подписям из layout_chart.
+    Может бросить WorkerPoolFull и asyncio.TimeoutError.
+    """
+    image, report = await render_pool.run(
+        render_chart_job, labels, settings.CHART_DPI, CHART_IMAGE_FORMATS, settings.CHART_PALETTE_COLORS
+    )
+    logger.info("Карта %s: %d байт, %dx%d, кодирование %.1f мс (%s)", report["format"], report["bytes"],
+                *report["size"], (report["quantize_time"] + report["encode_time"]) * 1000, report["candidates"])
+    return image
 
 
 async def get_house_info(ascendant_sign, planet_positions):
@@ -259,186 +185,30 @@ async def get_house_info(ascendant_sign, planet_positions):
     return house_info
 
 
-async def get_nakshatra_and_pada(zodiac_sign, longitude):
-    sign_nakshatras = NAKSHATRAS.get(zodiac_sign)
-    if not sign_nakshatras:
-        return None, None
-
-    in_sign_longitude = longitude % 30
-    for nakshatra_name, start, end, pada_ranges in sign_nakshatras:
-        if start <= in_sign_longitude < end:
-            pada_index = 1
-            for pada_start, pada_end in pada_ranges:
-                if pada_start <= in_sign_longitude < pada_end:
-                    if nakshatra_name == "Читра" and zodiac_sign == "Весы":
-                        pada_index += 2
-                    elif nakshatra_name == "Мригашира" and zodiac_sign == "Близнецы":
-                        pada_index += 2
-                    elif nakshatra_name == "Криттика" and zodiac_sign == "Телец":
-                        pada_index += 1
-                    return nakshatra_name, pada_index
-                pada_index += 1
-            return nakshatra_name, pada_index - 1
-    last_nakshatra = sign_nakshatras[-1]
-    return last_nakshatra[0], len(last_nakshatra[3])
-
-
-async def get_zodiac_sign(longitude):
-    zodiac_signs = [
-        "Овен", "Телец", "Близнецы", "Рак", "Лев", "Дева",
-        "Весы", "Скорпион", "Стрелец", "Козерог", "Водолей", "Рыбы"
-    ]
-    index = int(longitude // 30)
-    return zodiac_signs[index]
-
-
-async def get_moon_degree(planets_positions):
-    for planet in planets_positions:
-        planet_symbol, longitude = planet
-        if "Mo" in planet_symbol:
-            nakshatra_number = int(longitude // 13.3333)
-            start_of_nakshatra = nakshatra_number * 13.3333
-            degree_in_nakshatra = longitude - start_of_nakshatra
-            return degree_in_nakshatra
-    raise ValueError("Позиция Луны не найдена в данных.")
+def get_nakshatra_and_pada(longitude):
+    nakshatra = resolve_nakshatra(longitude)
+    return nakshatra.name, nakshatra.pada
 
 
-async def get_moon_nakshatra(planets_positions):
-    for planet in planets_positions:
-        planet_symbol, longitude = planet
+def get_moon_longitude(planets_positions):
+    for planet_symbol, longitude in planets_positions:
         if "Mo" in planet_symbol:
-            zodiac_sign = await get_zodiac_sign(longitude)
-            nakshatra, _ = await get_nakshatra_and_pada(zodiac_sign, longitude)
-            return nakshatra
+            return longitude
     raise ValueError("Позиция Луны не найдена в данных.")
 
 
-# начало второго и третьего подпериода даши
-def years_to_years_months_days(years):
-    total_days = years * 365.25
-    years_int = int(total_days // 365.25)
-    remaining_days = total_days - (years_int * 365.25)
-    months = int(remaining_days // 30.4375)
-    days = int(remaining_days - (months * 30.4375))
-    return years_int, months, days
-
-
-async def calculate_pratyantardasha(antardasha_planet,
-                                    antardasha_actual_start,
-                                    antardasha_actual_duration_years,
-                                    antardasha_theoretical_start,
-                                    antardasha_theoretical_duration_years):
-    pratyantardasha_text = f"   Под-подпериоды (Пратьянтардаша) в Антардаше {antardasha_planet}:\n\n"
-
-    antardasha_actual_end = antardasha_actual_start + timedelta(days=antardasha_actual_duration_years * 365.25)
-
-    D_ant_theoretical = antardasha_theoretical_duration_years
-
-    start_index = dasha_order.index(antardasha_planet)
-    sequence = dasha_order[start_index:] + dasha_order[:start_index]
-
-    cumulative_theoretical_prat_days = 0.0
-
-    for i, planet in enumerate(sequence):
-
-        prat_theoretical_duration_years = (planet_periods[planet] * D_ant_theoretical) / 120
-        prat_theoretical_duration_days = prat_theoretical_duration_years * 365.25
-        prat_theoretical_start = antardasha_theoretical_start + timedelta(days=cumulative_theoretical_prat_days)
-        prat_theoretical_end = prat_theoretical_start + timedelta(days=prat_theoretical_duration_days)
-
-        display_start = max(prat_theoretical_start, antardasha_actual_start)
-        display_end = min(prat_theoretical_end, antardasha_actual_end)
-
-        cumulative_theoretical_prat_days += prat_theoretical_duration_days
-
-        if display_end > display_start:
-            actual_duration = display_end - display_start
-
-            if actual_duration.total_seconds() > 3600:
-                actual_years = actual_duration.total_seconds() / (365.25 * 24 * 60 * 60)
-                years, months, days = years_to_years_months_days(actual_years)
-
-                if years >= 0 and months >= 0 and days >= 0:
-                    pratyantardasha_text += (
-
-                        f"     • {planet}: {years} лет, {months} мес., {days} дн.\n"
-                        f"       Начало: {display_start.strftime('%d.%m.%Y')}\n"
-                        f"       Конец: {display_end.strftime('%d.%m.%Y')}\n"
-                    )
-
-        if prat_theoretical_start >= antardasha_actual_end:
-            break
-
-    if cumulative_theoretical_prat_days == 0.0 and pratyantardasha_text.endswith(":\n\n"):
-        pratyantardasha_text += "       (Нет под-подпериодов в этом отрезке)\n"
-
-    return pratyantardasha_text
-
-
-async def calculate_antardasha(mahadasha_planet, full_period_years, mahadasha_start, is_first=False, is_last=False,
-                               birth_date=None, end_of_life=None):
-    antardasha_text = f"\nПодпериоды (Антардаша) в Махадаше {mahadasha_planet}:\n\n"
-    D = full_period_years
-    start_index = dasha_order.index(mahadasha_planet)
-    sequence = dasha_order[start_index:] + dasha_order[:start_index]
-
-    cumulative_theoretical_days = 0.0
-
-    for i, planet in enumerate(sequence):
-
-        theoretical_duration_years = (planet_periods[planet] * D) / 120
-        theoretical_duration_days = theoretical_duration_years * 365.25
-
-        theoretical_start_date = mahadasha_start + timedelta(days=cumulative_theoretical_days)
-        theoretical_end_date = theoretical_start_date + timedelta(days=theoretical_duration_days)
-
-        start_date = theoretical_start_date
-        end_date = theoretical_end_date
-
-        if is_first and birth_date and end_date < birth_date:
-            cumulative_theoretical_days += theoretical_duration_days
-            continue
-        if is_first and birth_date and start_date < birth_date:
-            start_date = birth_date
-
-        if is_last and end_of_life and start_date > end_of_life:
-            cumulative_theoretical_days += theoretical_duration_days
-            break
-        if is_last and end_of_life and end_date > end_of_life:
-            end_date = end_of_life
-
-        if end_date <= start_date:
-            cumulative_theoretical_days += theoretical_duration_days
-            continue
-
-        actual_duration = end_date - start_date
-
-        if actual_duration.total_seconds() < 1:
-            cumulative_theoretical_days += theoretical_duration_days
-            continue
-
-        actual_years = actual_duration.days / 365.25
+async def get_moon_degree(planets_positions):
+    return resolve_nakshatra(get_moon_longitude(planets_positions)).degree
 
-        if actual_years > 1e-9:
-            years, months, days = years_to_years_months_days(actual_years)
-            antardasha_text += (
-                f"▸ {planet}: {years} лет, {months} мес., {days} дн.\n"
-                f"  Начало: {start_date.strftime('%d.%m.%Y')}\n"
-                f"  Конец: {end_date.strftime('%d.%m.%Y')}\n"
-            )
-            pratyantardasha_text = await calculate_pratyantardasha(
-                antardasha_planet=planet,
-                antardasha_actual_start=start_date,
-                antardasha_actual_duration_years=actual_years,
-                antardasha_theoretical_start=theoretical_start_date,
-                antardasha_theoretical_duration_years=theoretical_duration_years
 
-            )
-            antardasha_text += pratyantardasha_text + "\n"
+async def get_moon_nakshatra(planets_positions):
+    return resolve_nakshatra(get_moon_longitude(planets_positions))
 
-        cumulative_theoretical_days += theoretical_duration_days
 
-        if is_last and end_of_life and end_date >= end_of_life:
-            break
+async def calculate_vimshottari_dasha(context, planets_positions):
+    birth_date_obj = datetime.combine(context.birth_datetime.date(), datetime.min.time())
 
-    return antardasha_text
+    moon_nakshatra = await get_moon_nakshatra(planets_positions)
+    starting_planet = moon_nakshatra.lord
+    _, years_passed = calculate_remaining_time(moon_nakshatra.degree, starting_planet)
+    return build_vimshottari_timeline(birth_date_obj, starting_planet, years_passed)
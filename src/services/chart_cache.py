@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from src.constants import CACHE_PATH, CHART_CACHE_DIR
+from src.dispatcher.dispatcher import settings
+from src.utils.single_flight import SingleFlight
+from src.utils.sqlite_cache import MISSING, SqliteCache
+
+IMAGE_EVICTION_CHECK_INTERVAL = 50
+
+
+def chart_fingerprint(labels, renderer=None):
+    """
+    Отпечаток карты по подписям из chart_layout.layout_chart: номера знаков (то есть асцендент), планеты
+    с отметками ретроградности и достоинства по домам и аспекты, вместе с их позициями и шрифтами.
+    Раскладка детерминирована, поэтому одинаковые карты дают одинаковый отпечаток.
+    Настройки отрисовки и кодирования тоже входят в отпечаток: после их смены карты рисуются заново.
+    """
+    render_settings = [renderer or settings.CHART_RENDERER, settings.CHART_DPI, settings.CHART_IMAGE_FORMATS,
+                       settings.CHART_PALETTE_COLORS]
+    canonical = json.dumps([render_settings, labels], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ChartCache:
+    """
+    Кэш отрисованных карт по отпечатку.
+
+    Первый уровень — file_id Telegram после первой отправки: повторная карта отправляется по id без загрузки.
+    Второй — закодированные изображения (PNG или WebP) на диске в directory, не больше max_image_bytes (проверяется раз в IMAGE_EVICTION_CHECK_INTERVAL
+    записей); при переполнении удаляются файлы, которые дольше всего не читались (время доступа хранится в mtime).
+    Одновременные отрисовки одной и той же карты схлопываются в одну.
+    База и каталог создаются при первом обращении; запросы к ним и работа с файлами идут вне цикла событий.
+    """
+
+    def __init__(self, path, directory, file_id_ttl, max_file_ids, max_image_bytes):
+        self._file_ids = SqliteCache(path, namespace="chart_file_id", ttl=file_id_ttl, max_entries=max_file_ids)
+        self.directory = Path(directory)
+        self.max_image_bytes = max_image_bytes
+        self._writes_since_eviction = 0
+        self._flights = SingleFlight()
+        self.file_id_hits = 0
+        self.image_hits = 0
+
+    async def open(self):
+        await self._file_ids.open()
+        await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+
+    async def file_id(self, fingerprint):
+        file_id = await self._file_ids.get(fingerprint)
+        if file_id is MISSING:
+            return None
+        self.file_id_hits += 1
+        return file_id
+
+    async def remember_file_id(self, fingerprint, file_id):
+        await self._file_ids.set(fingerprint, file_id)
+
+    async def forget_file_id(self, fingerprint):
+        await self._file_ids.delete(fingerprint)
+
+    def _image_path(self, fingerprint):
+        return self.directory / f"{fingerprint}.img"
+
+    def _read_image(self, fingerprint):
+        path = self._image_path(fingerprint)
+        try:
+            image = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return image
+
+    def _write_image(self, fingerprint, image):
+        path = self._image_path(fingerprint)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_bytes(image)
+        os.replace(temporary_path, path)
+
+    async def get_or_render(self, fingerprint, render):
+        """Изображение карты с диска или от render() — корутины, возвращающей закодированные байты."""
+        image = await asyncio.to_thread(self._read_image, fingerprint)
+        if image is not None:
+            self.image_hits += 1
+            return image
+
+        return await self._flights.run(fingerprint, lambda: self._render(fingerprint, render))
+
+    async def _render(self, fingerprint, render):
+        image = await render()
+        await asyncio.to_thread(self._write_image, fingerprint, image)
+
+        self._writes_since_eviction += 1
+        if self._writes_since_eviction >= IMAGE_EVICTION_CHECK_INTERVAL:
+            await asyncio.to_thread(self.evict)
+        return image
+
+    def evict(self):
+        self._writes_since_eviction = 0
+        files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in os.scandir(self.directory)
+                 if entry.name.endswith(".img")]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_image_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    async def stats(self):
+        return {
+            "file_id_hits": self.file_id_hits,
+            "image_hits": self.image_hits,
+            "misses": self._flights.leaders,
+            "joined": self._flights.joined,
+            "file_ids": await self._file_ids.count(),
+        }
+
+
+chart_cache = ChartCache(
+    CACHE_PATH,
+    CHART_CACHE_DIR,
+    file_id_ttl=settings.CHART_FILE_ID_TTL,
+    max_file_ids=settings.CHART_FILE_ID_MAX_ENTRIES,
+    max_image_bytes=settings.CHART_IMAGE_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,64 @@
+"""
+Кодирование отрисованной карты перед отправкой.
+
+Карта чёрно-бело-серая, поэтому полноцветный RGB(A) не нужен: изображение переводится в оттенки серого
+и сводится к палитре из нескольких равномерных уровней (таблица подстановки, без медианного разбиения),
+затем кодируется во все разрешённые форматы (PNG с палитрой, WebP без потерь), и берётся самый маленький.
+Выполняется в процессе пула отрисовки, сразу после render.
+"""
+import io
+import time
+
+from PIL import Image
+
+DEFAULT_FORMATS = ("png", "webp")
+DEFAULT_PALETTE_COLORS = 8
+
+ENCODERS = {
+    "png": dict(format="PNG"),
+    # для WebP без потерь quality — это усилие сжатия; 50 и method=2 — разумный компромисс по времени
+    "webp": dict(format="WEBP", lossless=True, quality=50, method=2),
+}
+
+
+def quantize(image, colors=DEFAULT_PALETTE_COLORS):
+    """Палитровое изображение из colors равномерных уровней серого; colors=0 — без квантования."""
+    if not colors:
+        return image.convert("RGB")
+    levels = image.convert("L").point([round(value * (colors - 1) / 255) for value in range(256)])
+    palette_image = Image.frombytes("P", levels.size, levels.tobytes())
+    palette_image.putpalette([round(index * 255 / (colors - 1)) for index in range(colors) for _ in range(3)])
+    return palette_image
+
+
+def encode_chart(image, formats=DEFAULT_FORMATS, colors=DEFAULT_PALETTE_COLORS):
+    """
+    Самое компактное представление карты среди formats.
+    Возвращает байты и отчёт: выбранный формат, размер, время квантования и кодирования, размеры всех вариантов.
+    """
+    started = time.perf_counter()
+    image = quantize(image, colors)
+    quantize_time = time.perf_counter() - started
+
+    candidates = {}
+    for image_format in formats:
+        buf = io.BytesIO()
+        image.save(buf, **ENCODERS[image_format])
+        candidates[image_format] = buf.getvalue()
+    chosen = min(candidates, key=lambda image_format: len(candidates[image_format]))
+
+    return candidates[chosen], {
+        "format": chosen,
+        "bytes": len(candidates[chosen]),
+        "size": image.size,
+        "quantize_time": quantize_time,
+        "encode_time": time.perf_counter() - started - quantize_time,
+        "candidates": {image_format: len(data) for image_format, data in candidates.items()},
+    }
+
+
+def image_format(data):
+    """Формат закодированной карты по сигнатуре: "png" или "webp"."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "png"
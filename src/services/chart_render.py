@@ -0,0 +1,82 @@
+"""
+Отрисовка North Indian карты поверх заранее подготовленного шаблона.
+
+Неизменная часть карты — чёрный квадрат и 12 домов — рисуется один раз на процесс; растр этого фона
+сохраняется через copy_from_bbox. Для каждой карты фон восстанавливается (restore_region), и поверх него
+рисуются только подписи: номера знаков, планеты и аспекты. Обрезка bbox_inches='tight' не нужна:
+оси занимают всю фигуру, а пределы осей — размер квадрата с небольшим полем.
+
+matplotlib импортируется при создании шаблона, то есть только в процессах пула отрисовки:
+основному процессу бота модуль нужен лишь как ссылка на render_chart_job.
+"""
+from PIL import Image
+
+from src.services.chart_encoding import DEFAULT_FORMATS, DEFAULT_PALETTE_COLORS, encode_chart
+from src.utils.chart_data import polygons
+from src.utils.chart_layout import CHART_MARGIN, CHART_SIZE, DPI, FIGURE_INCHES
+
+LABEL_STYLES = {
+    "sign": dict(color='black'),
+    "planet": dict(color='black', fontweight='bold'),
+    "aspect": dict(color='gray', alpha=0.5, fontweight='bold'),
+}
+
+
+class ChartTemplate:
+    def __init__(self, dpi=DPI):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Polygon, Rectangle
+
+        self.figure = Figure(figsize=(FIGURE_INCHES, FIGURE_INCHES), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_axes((0, 0, 1, 1))
+        self.axes.set_xlim(-CHART_MARGIN, CHART_SIZE + CHART_MARGIN)
+        self.axes.set_ylim(-CHART_MARGIN, CHART_SIZE + CHART_MARGIN)
+        self.axes.set_aspect('equal')
+        self.axes.axis('off')
+
+        self.axes.add_patch(Rectangle((5, 5), 410, 410, edgecolor='black', facecolor='black', linewidth=3))
+        for points in polygons.values():
+            self.axes.add_patch(Polygon(points, edgecolor='black', facecolor='white'))
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def render(self, labels):
+        """
+        labels — [(x, y, текст, стиль из LABEL_STYLES, размер шрифта), ...] в координатах осей,
+        как их возвращает chart_layout.layout_chart. Возвращает изображение Pillow в RGB.
+        """
+        self.canvas.restore_region(self.background)
+        for x, y, text, style, font_size in labels:
+            artist = self.axes.text(x, y, text, ha='center', va='center', fontsize=font_size, **LABEL_STYLES[style])
+            self.axes.draw_artist(artist)
+            artist.remove()
+
+        width, height = self.canvas.get_width_height()
+        image = Image.frombuffer("RGBA", (width, height), self.canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+        return image.convert("RGB")
+
+
+# шаблоны по DPI
+_chart_templates = {}
+
+
+def get_chart_template(dpi=DPI):
+    if dpi not in _chart_templates:
+        _chart_templates[dpi] = ChartTemplate(dpi)
+    return _chart_templates[dpi]
+
+
+def render_chart_image(labels, dpi=DPI):
+    return get_chart_template(dpi).render(labels)
+
+
+def init_render_worker(dpi=DPI):
+    get_chart_template(dpi)
+
+
+def render_chart_job(labels, dpi=DPI, formats=DEFAULT_FORMATS, colors=DEFAULT_PALETTE_COLORS):
+    """Задача для пула отрисовки: закодированная карта по подписям из layout_chart и отчёт encode_chart."""
+    return encode_chart(render_chart_image(labels, dpi), formats, colors)
@@ -0,0 +1,124 @@
+"""
+Хранение рассчитанных карт в таблицах charts и chart_interpretations.
+
+Карта хранится числами, а не текстом: знак и долгота асцендента, долготы планет с флагами
+(ретроградность, экзальтация, падение, мулатрикона) в одном JSON/JSONB-массиве и параметры шкалы
+Вимшоттари в 18 байтах — шкала восстанавливается build_vimshottari_timeline. Тексты для пользователя
+строятся заново из этих данных, а расшифровка LLM лежит отдельной таблицей, чтобы выборки по картам
+не читали большие тексты. Индекс (telegram_id, created_at) отвечает на «последние карты пользователя».
+
+Новые карты пишутся через очередь отложенной записи (services.chart_writer); прежние строки user_data
+переносит миграция 0002 со своей копией этих форматов.
+"""
+import struct
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from src.database.engine import open_session
+from src.database.models.models import Chart, ChartInterpretation
+from src.services.dasha import build_vimshottari_timeline, from_ordinal_days
+from src.services.prompts import DIGNITY_FLAGS
+from src.utils.chart_data import clean_planet_symbol, dasha_order, planets
+
+PLANET_SYMBOLS = [symbol for _, symbol in planets]
+FLAG_BITS = {"R": 1, "E": 2, "D": 4, "MT": 8}
+
+# версия формата, порядковые дни рождения, номер планеты первой махадаши в dasha_order, прошедшие годы
+DASHA_FORMAT = struct.Struct("<BdBd")
+DASHA_FORMAT_VERSION = 1
+
+
+def planet_flags(symbol):
+    """Флаги планеты по отметкам в её символе (см. chart_data.position_data_with_retrograde)."""
+    return sum(FLAG_BITS[flag] for mark, flag in DIGNITY_FLAGS if mark in symbol)
+
+
+def pack_planets(planet_positions):
+    """[[долгота, флаги], ...] в порядке PLANET_SYMBOLS из списка (символ с отметками, долгота)."""
+    by_symbol = {clean_planet_symbol(symbol): [round(longitude, 6), planet_flags(symbol)]
+                 for symbol, longitude in planet_positions}
+    return [by_symbol[symbol] for symbol in PLANET_SYMBOLS]
+
+
+def unpack_planets(packed):
+    """[(символ, долгота, множество флагов), ...]."""
+    return [
+        (symbol, longitude, {flag for flag, bit in FLAG_BITS.items() if flags & bit})
+        for symbol, (longitude, flags) in zip(PLANET_SYMBOLS, packed)
+    ]
+
+
+def pack_dasha(birth, starting_planet, years_passed):
+    """Шкала даш по параметрам build_vimshottari_timeline; birth — порядковые дни (dasha.to_ordinal_days)."""
+    return DASHA_FORMAT.pack(DASHA_FORMAT_VERSION, birth, dasha_order.index(starting_planet), years_passed)
+
+
+def pack_timeline(timeline):
+    return pack_dasha(timeline.birth, timeline.starting_planet, timeline.years_passed)
+
+
+def unpack_dasha(blob):
+    version, birth, planet_index, years_passed = DASHA_FORMAT.unpack(blob)
+    if version != DASHA_FORMAT_VERSION:
+        raise ValueError(f"Неизвестная версия шкалы даш: {version}")
+    return build_vimshottari_timeline(from_ordinal_days(birth), dasha_order[planet_index], years_passed)
+
+
+def chart_record(telegram_id, username, location, birth_date, birth_time, ascendant, planet_positions,
+                 dasha, interpretation=None, prompt_variant=None, latitude=None, longitude=None,
+                 ascendant_sign=None, created_at=None):
+    """
+    Запись для write_charts: строка charts и, если есть расшифровка, строка chart_interpretations.
+    ascendant — долгота асцендента; если она неизвестна, передаётся только ascendant_sign.
+    dasha — результат pack_dasha или pack_timeline.
+    """
+    return {
+        "chart": dict(
+            telegram_id=telegram_id,
+            username=username,
+            created_at=created_at or datetime.utcnow(),
+            location=location,
+            latitude=latitude,
+            longitude=longitude,
+            birth_date=birth_date,
+            birth_time=birth_time,
+            ascendant_sign=int(ascendant // 30) if ascendant_sign is None else ascendant_sign,
+            ascendant=None if ascendant is None else round(ascendant, 6),
+            planets=pack_planets(planet_positions),
+            dasha=dasha,
+        ),
+        "interpretation": dict(interpretation=interpretation, prompt_variant=prompt_variant)
+        if interpretation else None,
+    }
+
+
+async def write_charts(session, records):
+    """Пачка записей chart_record двумя многострочными INSERT: карты, затем расшифровки с их id."""
+    chart_ids = (await session.scalars(
+        insert(Chart).returning(Chart.id, sort_by_parameter_order=True),
+        [record["chart"] for record in records],
+    )).all()
+    interpretations = [
+        dict(chart_id=chart_id, **record["interpretation"])
+        for chart_id, record in zip(chart_ids, records)
+        if record["interpretation"]
+    ]
+    if interpretations:
+        await session.execute(insert(ChartInterpretation), interpretations)
+
+
+async def user_charts(telegram_id, limit=10, with_interpretation=False):
+    """Последние карты пользователя, новые первыми; с with_interpretation — пары (карта, расшифровка или None)."""
+    query = select(Chart).where(Chart.telegram_id == telegram_id).order_by(Chart.created_at.desc()).limit(limit)
+    if with_interpretation:
+        query = query.add_columns(ChartInterpretation.interpretation).outerjoin(ChartInterpretation)
+    async with open_session() as session:
+        result = await session.execute(query)
+        return result.all() if with_interpretation else result.scalars().all()
+
+
+async def last_chart(telegram_id):
+    """Последняя карта пользователя и её расшифровка: (Chart, str или None) или None."""
+    charts = await user_charts(telegram_id, limit=1, with_interpretation=True)
+    return tuple(charts[0]) if charts else None
@@ -0,0 +1,165 @@
+"""
+Отрисовка North Indian карты без matplotlib.
+
+Карта — это квадрат, 12 многоугольников домов из polygons и подписи из chart_layout.layout_chart,
+поэтому она выводится напрямую: SVG-строкой (render_chart_svg) или растром через Pillow (render_chart_image).
+Для растра неизменная рамка рисуется один раз на процесс с повышенным разрешением и уменьшается
+со сглаживанием; на каждую карту копируется готовая рамка и дорисовываются только подписи.
+
+Координаты — те же единицы осей, что и в chart_render: y растёт вверх, поле CHART_MARGIN вокруг квадрата.
+"""
+import os
+from importlib.util import find_spec
+from xml.sax.saxutils import escape
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src.services.chart_encoding import DEFAULT_FORMATS, DEFAULT_PALETTE_COLORS, encode_chart
+from src.utils.chart_data import polygons
+from src.utils.chart_layout import CHART_MARGIN, CHART_SIZE, DPI, FIGURE_INCHES, UNITS_PER_POINT
+
+# чёрный квадрат под домами и толщина линий, в пунктах — как у патчей matplotlib в chart_render
+SQUARE = (5, 5, 410, 410)
+SQUARE_LINE_WIDTH = 3
+HOUSE_LINE_WIDTH = 1
+# во сколько раз крупнее рисуется рамка перед уменьшением, чтобы сгладить диагонали
+SUPERSAMPLE = 3
+
+LABEL_STYLES = {
+    "sign": dict(color=(0, 0, 0), opacity=1.0, bold=False),
+    "planet": dict(color=(0, 0, 0), opacity=1.0, bold=True),
+    "aspect": dict(color=(128, 128, 128), opacity=0.5, bold=True),
+}
+
+# размер SVG и масштаб растра при DPI по умолчанию; для другого DPI масштаб умножается на dpi / DPI
+IMAGE_SIZE = FIGURE_INCHES * DPI
+PIXELS_PER_UNIT = IMAGE_SIZE / (CHART_SIZE + 2 * CHART_MARGIN)
+
+
+def _to_pixels(x, y, scale=1):
+    return (x + CHART_MARGIN) * PIXELS_PER_UNIT * scale, (CHART_SIZE + CHART_MARGIN - y) * PIXELS_PER_UNIT * scale
+
+
+def _svg_point(x, y):
+    return f"{x:g},{CHART_SIZE - y:g}"
+
+
+def _svg_frame():
+    x, y, width, height = SQUARE
+    size = CHART_SIZE + 2 * CHART_MARGIN
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{IMAGE_SIZE}" height="{IMAGE_SIZE}" '
+        f'viewBox="{-CHART_MARGIN} {-CHART_MARGIN} {size} {size}" '
+        f'font-family="DejaVu Sans, sans-serif" text-anchor="middle" dominant-baseline="central">',
+        f'<rect x="{-CHART_MARGIN}" y="{-CHART_MARGIN}" width="{size}" height="{size}" fill="white"/>',
+        f'<rect x="{x}" y="{CHART_SIZE - y - height}" width="{width}" height="{height}" fill="black" '
+        f'stroke="black" stroke-width="{SQUARE_LINE_WIDTH * UNITS_PER_POINT:.3f}"/>',
+    ]
+    for points in polygons.values():
+        parts.append(
+            f'<polygon points="{" ".join(_svg_point(*point) for point in points)}" fill="white" '
+            f'stroke="black" stroke-width="{HOUSE_LINE_WIDTH * UNITS_PER_POINT:.3f}"/>'
+        )
+    return "".join(parts)
+
+
+SVG_FRAME = _svg_frame()
+
+
+def render_chart_svg(labels):
+    """SVG карты по подписям из layout_chart."""
+    parts = [SVG_FRAME]
+    for x, y, text, style, font_size in labels:
+        label_style = LABEL_STYLES[style]
+        attributes = f'x="{x:g}" y="{CHART_SIZE - y:g}" font-size="{font_size * UNITS_PER_POINT:.3f}"'
+        if label_style["bold"]:
+            attributes += ' font-weight="bold"'
+        attributes += ' fill="rgb({}, {}, {})"'.format(*label_style["color"])
+        if label_style["opacity"] < 1:
+            attributes += f' fill-opacity="{label_style["opacity"]:g}"'
+        parts.append(f'<text {attributes}>{escape(text)}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _font_path(bold):
+    """DejaVu Sans из поставки matplotlib — тот же шрифт, что и в chart_render; сам matplotlib не импортируется."""
+    spec = find_spec("matplotlib")
+    if spec is None or spec.origin is None:
+        return None
+    path = os.path.join(os.path.dirname(spec.origin), "mpl-data", "fonts", "ttf",
+                        "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf")
+    return path if os.path.exists(path) else None
+
+
+class PillowChartTemplate:
+    def __init__(self, dpi=DPI):
+        self.dpi = dpi
+        self.scale = dpi / DPI
+        size = FIGURE_INCHES * dpi
+        scale = self.scale * SUPERSAMPLE
+        image = Image.new("RGB", (size * SUPERSAMPLE, size * SUPERSAMPLE), "white")
+        draw = ImageDraw.Draw(image)
+
+        x, y, width, height = SQUARE
+        square_width = round(SQUARE_LINE_WIDTH * dpi / 72 * SUPERSAMPLE)
+        left, top = _to_pixels(x, y + height, scale)
+        right, bottom = _to_pixels(x + width, y, scale)
+        draw.rectangle(
+            (left - square_width / 2, top - square_width / 2, right + square_width / 2, bottom + square_width / 2),
+            fill="black",
+        )
+        for points in polygons.values():
+            draw.polygon([_to_pixels(*point, scale) for point in points], fill="white")
+        line_width = max(round(HOUSE_LINE_WIDTH * dpi / 72 * SUPERSAMPLE), 1)
+        for points in polygons.values():
+            pixels = [_to_pixels(*point, scale) for point in points]
+            draw.line(pixels + pixels[:1], fill="black", width=line_width, joint="curve")
+
+        self.frame = image.resize((size, size), Image.LANCZOS)
+        self._fonts = {}
+
+    def font(self, size, bold):
+        key = (size, bold)
+        if key not in self._fonts:
+            path = _font_path(bold)
+            pixels = size * self.dpi / 72
+            self._fonts[key] = ImageFont.truetype(path, pixels) if path else ImageFont.load_default(pixels)
+        return self._fonts[key]
+
+    def render(self, labels):
+        """Изображение карты (Pillow, RGB) по подписям из layout_chart."""
+        image = self.frame.copy()
+        draw = ImageDraw.Draw(image)
+        for x, y, text, style, font_size in labels:
+            label_style = LABEL_STYLES[style]
+            # подписи всегда лежат на белом, поэтому прозрачность заменяется смешанным с белым цветом
+            fill = tuple(
+                round(channel * label_style["opacity"] + 255 * (1 - label_style["opacity"]))
+                for channel in label_style["color"]
+            )
+            draw.text(_to_pixels(x, y, self.scale), text, fill=fill, font=self.font(font_size, label_style["bold"]), anchor="mm")
+        return image
+
+
+# шаблоны по DPI
+_chart_templates = {}
+
+
+def get_chart_template(dpi=DPI):
+    if dpi not in _chart_templates:
+        _chart_templates[dpi] = PillowChartTemplate(dpi)
+    return _chart_templates[dpi]
+
+
+def render_chart_image(labels, dpi=DPI):
+    return get_chart_template(dpi).render(labels)
+
+
+def init_render_worker(dpi=DPI):
+    get_chart_template(dpi)
+
+
+def render_chart_job(labels, dpi=DPI, formats=DEFAULT_FORMATS, colors=DEFAULT_PALETTE_COLORS):
+    """Задача для пула отрисовки: то же, что chart_render.render_chart_job, но без matplotlib."""
+    return encode_chart(render_chart_image(labels, dpi), formats, colors)
@@ -0,0 +1,172 @@
+"""
+Отложенная запись рассчитанных карт в базу.
+
+Обработчик кладёт запись карты (services.chart_storage.chart_record) в ограниченную очередь в памяти
+и сразу продолжает — пользователь не ждёт базу. Фоновая задача забирает записи пачками
+до CHART_WRITER_BATCH_SIZE (или сколько накопилось за CHART_WRITER_FLUSH_INTERVAL секунд) и пишет каждую
+пачку многострочными INSERT: чем выше нагрузка, тем крупнее пачки. Временные ошибки базы повторяются с экспоненциальной задержкой, пачка после
+CHART_WRITER_MAX_RETRIES неудач пишется в лог и отбрасывается. Если очередь переполнена, новая запись
+отбрасывается с предупреждением.
+
+close() дописывает всё, что осталось в очереди (см. tg_main); записи после close() отбрасываются.
+"""
+import asyncio
+import logging
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from src.database.engine import open_session
+from src.dispatcher.dispatcher import settings
+from src.services.chart_storage import write_charts
+
+logger = logging.getLogger(__name__)
+
+# конец очереди для close()
+_STOP = object()
+
+
+def _is_transient(error):
+    if isinstance(error, (OperationalError, InterfaceError, OSError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class ChartWriter:
+    def __init__(self, name, write, max_queue, batch_size, flush_interval, max_retries, retry_base_delay=0.5):
+        """write(session, batch) — корутина, которая пишет пачку; commit делает ChartWriter."""
+        self.name = name
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.queue = asyncio.Queue(max_queue)
+        self._batch_ready = asyncio.Event()
+        self._task = None
+        self._closing = False
+        # пачка, которую пишет _write: при остановке по таймауту она теряется вместе с очередью
+        self._batch = []
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.retries = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, row):
+        """Ставит запись в очередь; False, если очередь переполнена или запись уже останавливается."""
+        if self._closing:
+            self.dropped += 1
+            logger.warning("Запись в %s остановлена, запись отброшена", self.name)
+            return False
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Очередь записи %s переполнена, запись отброшена", self.name)
+            return False
+        self.submitted += 1
+        if self.queue.qsize() >= self.batch_size - 1:
+            self._batch_ready.set()
+        return True
+
+    async def _next_batch(self):
+        """
+        Пачка записей и признак остановки. Первая запись ждётся без ограничения, затем до flush_interval —
+        пока не наберётся полная пачка.
+        """
+        item = await self.queue.get()
+        if item is _STOP:
+            return [], True
+        if self.queue.qsize() < self.batch_size - 1:
+            self._batch_ready.clear()
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+        batch = [item]
+        while len(batch) < self.batch_size and not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _write(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with open_session() as session:
+                    await self.write(session, batch)
+                    await session.commit()
+            except Exception as e:
+                if not _is_transient(e) or attempt == self.max_retries:
+                    self.failed += len(batch)
+                    logger.error("Не записано в %s: %d: %s", self.name, len(batch), e)
+                    return
+                self.retries += 1
+                delay = self.retry_base_delay * 2 ** attempt
+                logger.warning("Запись в %s: %s, повтор %d через %.1f с",
+                               self.name, type(e).__name__, attempt + 1, delay)
+                await asyncio.sleep(delay)
+            else:
+                self.written += len(batch)
+                self.batches += 1
+                self.max_batch = max(self.max_batch, len(batch))
+                return
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            self._batch, stopping = await self._next_batch()
+            if self._batch:
+                await self._write(self._batch)
+            self._batch = []
+
+    async def close(self, timeout=None):
+        """
+        Дописывает очередь и останавливает фоновую задачу; после этого submit отбрасывает записи.
+        По истечении timeout недописанная пачка и остаток очереди теряются и считаются в failed.
+        """
+        self._closing = True
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        try:
+            await asyncio.wait_for(self._drain(task), timeout)
+        except asyncio.TimeoutError:
+            lost = len(self._batch) + self._discard_queue()
+            self._batch = []
+            self.failed += lost
+            logger.error("Запись в %s не завершена за %s с, потеряно записей: %d", self.name, timeout, lost)
+
+    def _discard_queue(self):
+        discarded = 0
+        while not self.queue.empty():
+            if self.queue.get_nowait() is not _STOP:
+                discarded += 1
+        return discarded
+
+    async def _drain(self, task):
+        await self.queue.put(_STOP)
+        self._batch_ready.set()
+        await task
+
+    def stats(self):
+        return {
+            "submitted": self.submitted, "written": self.written, "batches": self.batches,
+            "max_batch": self.max_batch, "retries": self.retries, "dropped": self.dropped,
+            "failed": self.failed, "queued": self.queue.qsize(),
+        }
+
+
+chart_writer = ChartWriter(
+    "charts",
+    write_charts,
+    max_queue=settings.CHART_WRITER_QUEUE_SIZE,
+    batch_size=settings.CHART_WRITER_BATCH_SIZE,
+    flush_interval=settings.CHART_WRITER_FLUSH_INTERVAL,
+    max_retries=settings.CHART_WRITER_MAX_RETRIES,
+)
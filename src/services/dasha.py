@@ -0,0 +1,302 @@
+"""
+Вимшоттари-даша как структура: компактная временная шкала периодов (махадаша, антардаша, пратьянтардаша)
+и запрос «какие периоды идут на дату X» бинарным поиском. Текст для пользователя строится отдельно,
+функциями render_vimshottari_dasha и render_mahadasha_details, поверх готовой шкалы.
+
+Более глубокие уровни (сукшма и прана) в шкалу не входят: они считаются генераторами только для периода,
+который открыл пользователь (path_periods / child_periods), поэтому работа не растёт с глубиной.
+
+Моменты хранятся как «порядковые дни»: date.toordinal() плюс доля суток.
+"""
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from src.utils.chart_data import dasha_order, planet_periods
+
+YEAR_DAYS = 365.25
+TOTAL_YEARS = 120
+
+MAHADASHA, ANTARDASHA, PRATYANTARDASHA, SOOKSHMA, PRANA = range(5)
+# уровни, которые строятся в DashaTimeline заранее; остальные — только по запросу
+LEVEL_COUNT = 3
+DASHA_LEVELS = 5
+LEVEL_NAMES = ["Махадаша", "Антардаша", "Пратьянтардаша", "Сукшма-даша", "Прана-даша"]
+
+# периоды короче этого (в сутках) после обрезки по дате рождения / концу жизни не показываются
+MIN_DURATION_DAYS = {ANTARDASHA: 1, PRATYANTARDASHA: 1 / 24, SOOKSHMA: 1 / 1440, PRANA: 1 / 1440}
+
+
+@dataclass(frozen=True)
+class DashaPeriod:
+    planet: str
+    level: int
+    start: float
+    end: float
+
+    @property
+    def start_datetime(self):
+        return from_ordinal_days(self.start)
+
+    @property
+    def end_datetime(self):
+        return from_ordinal_days(self.end)
+
+
+def to_ordinal_days(moment):
+    if isinstance(moment, datetime):
+        seconds = moment.hour * 3600 + moment.minute * 60 + moment.second + moment.microsecond / 1e6
+        return moment.toordinal() + seconds / 86400
+    return float(moment.toordinal())
+
+
+def from_ordinal_days(value):
+    day = math.floor(value)
+    return datetime.combine(date.fromordinal(day), datetime.min.time()) + timedelta(days=value - day)
+
+
+def planet_sequence(planet):
+    start_index = dasha_order.index(planet)
+    return dasha_order[start_index:] + dasha_order[:start_index]
+
+
+sequence_cache = {planet: planet_sequence(planet) for planet in dasha_order}
+
+
+def subperiods(planet, theoretical_start, theoretical_years):
+    """Подпериоды периода planet без обрезки: (планета, начало, конец, длительность в годах)."""
+    start = theoretical_start
+    for sub_planet in sequence_cache[planet]:
+        years = planet_periods[sub_planet] * theoretical_years / TOTAL_YEARS
+        end = start + years * YEAR_DAYS
+        yield sub_planet, start, end, years
+        start = end
+
+
+class DashaTimeline:
+    """
+    Периоды каждого уровня лежат в своих массивах в хронологическом порядке;
+    parents хранит индекс родительского периода на предыдущем уровне.
+    """
+
+    def __init__(self, birth, end_of_life, starting_planet, years_passed):
+        self.birth = birth
+        self.end_of_life = end_of_life
+        self.starting_planet = starting_planet
+        self.years_passed = years_passed
+        self.planets = [array('b') for _ in range(LEVEL_COUNT)]
+        self.starts = [array('d') for _ in range(LEVEL_COUNT)]
+        self.ends = [array('d') for _ in range(LEVEL_COUNT)]
+        self.parents = [array('l') for _ in range(LEVEL_COUNT)]
+
+    def _append(self, level, planet, start, end, parent):
+        self.planets[level].append(dasha_order.index(planet))
+        self.starts[level].append(start)
+        self.ends[level].append(end)
+        self.parents[level].append(parent)
+        return len(self.starts[level]) - 1
+
+    def period(self, level, index):
+        return DashaPeriod(
+            planet=dasha_order[self.planets[level][index]],
+            level=level,
+            start=self.starts[level][index],
+            end=self.ends[level][index],
+        )
+
+    def periods(self, level):
+        return [self.period(level, index) for index in range(len(self.starts[level]))]
+
+    def children(self, level, index):
+        """Индексы подпериодов периода index на уровне level + 1."""
+        parents = self.parents[level + 1]
+        return range(bisect_left(parents, index), bisect_right(parents, index))
+
+    def current_periods(self, moment):
+        """Периоды всех уровней, идущие в момент moment (datetime, date или порядковые дни)."""
+        value = moment if isinstance(moment, float) else to_ordinal_days(moment)
+        result = []
+        for level in range(LEVEL_COUNT):
+            index = bisect_right(self.starts[level], value) - 1
+            if index < 0 or value >= self.ends[level][index]:
+                break
+            result.append(self.period(level, index))
+        return result
+
+    def next_period(self, level, moment):
+        value = moment if isinstance(moment, float) else to_ordinal_days(moment)
+        index = bisect_right(self.starts[level], value)
+        if index < len(self.starts[level]):
+            return self.period(level, index)
+        return None
+
+
+def mahadashas(birth, starting_planet, years_passed):
+    """
+    Махадаши на 120 лет от момента birth (порядковые дни). Первая начинается за years_passed лет до рождения
+    и показывается с даты рождения; в конце снова идёт махадаша starting_planet до 120 лет.
+
+    Здесь и в child_periods период — кортеж (планета, начало, конец, теоретическое начало, длительность в годах):
+    начало и конец обрезаны по жизни, а теоретические значения нужны для расчёта подпериодов.
+    """
+    end_of_life = birth + TOTAL_YEARS * YEAR_DAYS
+    theoretical_start = birth - years_passed * YEAR_DAYS
+    sequence = list(subperiods(starting_planet, theoretical_start, TOTAL_YEARS))
+    last_start = sequence[-1][2]
+    sequence.append((
+        starting_planet, last_start, last_start + planet_periods[starting_planet] * YEAR_DAYS,
+        planet_periods[starting_planet],
+    ))
+    for planet, start, end, years in sequence:
+        yield planet, max(start, birth), min(end, end_of_life), start, years
+
+
+def child_periods(level, period):
+    """Подпериоды уровня level внутри period, обрезанные по его границам; считаются по мере обхода."""
+    planet, start, end, theoretical_start, theoretical_years = period
+    for sub_planet, sub_start, sub_end, sub_years in subperiods(planet, theoretical_start, theoretical_years):
+        if sub_start >= end:
+            break
+        actual_start, actual_end = max(sub_start, start), min(sub_end, end)
+        if actual_end - actual_start < MIN_DURATION_DAYS[level]:
+            continue
+        yield sub_planet, actual_start, actual_end, sub_start, sub_years
+
+
+def path_periods(birth, starting_planet, years_passed, path):
+    """
+    Периоды вдоль пути path — номеров периодов на каждом уровне, начиная с махадаши.
+    Считаются только периоды до нужного номера на каждом уровне; если такого периода нет, бросает IndexError.
+    """
+    result = []
+    for level, position in enumerate(path):
+        periods = mahadashas(birth, starting_planet, years_passed) if level == MAHADASHA \
+            else child_periods(level, result[-1])
+        period = next(islice(periods, position, None), None)
+        if period is None:
+            raise IndexError(f"Нет периода {position} на уровне {LEVEL_NAMES[level]}.")
+        result.append(period)
+    return result
+
+
+def _add_subperiods(timeline, level, parent_index, period):
+    for child in child_periods(level, period):
+        index = timeline._append(level, child[0], child[1], child[2], parent_index)
+        if level + 1 < LEVEL_COUNT:
+            _add_subperiods(timeline, level + 1, index, child)
+
+
+def build_vimshottari_timeline(birth_datetime, starting_planet, years_passed):
+    """Шкала махадаш, антардаш и пратьянтардаш на 120 лет от даты рождения."""
+    birth = to_ordinal_days(birth_datetime)
+    timeline = DashaTimeline(birth, birth + TOTAL_YEARS * YEAR_DAYS, starting_planet, years_passed)
+    for period in mahadashas(birth, starting_planet, years_passed):
+        index = timeline._append(MAHADASHA, period[0], period[1], period[2], -1)
+        _add_subperiods(timeline, ANTARDASHA, index, period)
+    return timeline
+
+
+def _format_date(value):
+    return date.fromordinal(math.floor(value)).strftime('%d.%m.%Y')
+
+
+def years_to_years_months_days(years):
+    total_days = years * YEAR_DAYS
+    years_int = int(total_days // YEAR_DAYS)
+    remaining_days = total_days - (years_int * YEAR_DAYS)
+    months = int(remaining_days // 30.4375)
+    days = int(remaining_days - (months * 30.4375))
+    return years_int, months, days
+
+
+def format_moment(value, level):
+    if level >= SOOKSHMA:
+        return from_ordinal_days(value).strftime('%d.%m.%Y %H:%M')
+    return _format_date(value)
+
+
+def _format_duration(duration_days, level):
+    years, months, days = years_to_years_months_days(duration_days / YEAR_DAYS)
+    if level < SOOKSHMA:
+        return f"{years} лет, {months} мес., {days} дн."
+    hours = int((duration_days - years * YEAR_DAYS - months * 30.4375 - days) * 24)
+    return f"{years} лет, {months} мес., {days} дн., {hours} ч."
+
+
+def render_dasha_page(birth, starting_planet, years_passed, path):
+    """
+    Страница навигации по даше: открытые периоды вдоль path и подпериоды последнего из них.
+    Возвращает текст и список подпериодов [(планета, начало, конец), ...] для кнопок.
+    """
+    opened = path_periods(birth, starting_planet, years_passed, path)
+    level = len(path)
+    if level == MAHADASHA:
+        periods = mahadashas(birth, starting_planet, years_passed)
+    else:
+        periods = child_periods(level, opened[-1])
+    children = [(planet, start, end) for planet, start, end, _, _ in periods]
+
+    text = "Вимшоттари-даша\n"
+    for opened_level, (planet, start, end, _, _) in enumerate(opened):
+        text += (
+            f"{'  ' * opened_level}{LEVEL_NAMES[opened_level]} {planet}: "
+            f"{format_moment(start, opened_level)} – {format_moment(end, opened_level)}\n"
+        )
+    text += f"\n{LEVEL_NAMES[level]}:\n\n"
+    for planet, start, end in children:
+        text += (
+            f"▸ {planet}: {_format_duration(end - start, level)}\n"
+            f"   Начало: {format_moment(start, level)}\n"
+            f"   Конец: {format_moment(end, level)}\n"
+        )
+    return text, children
+
+
+def render_vimshottari_dasha(timeline):
+    """Текст последовательности махадаш."""
+    vimshottari_dasha = "Последовательность периодов (Ви́мшоттари-да́ша):\n\n"
+
+    mahadashas = timeline.periods(MAHADASHA)
+    for maha_index, maha in enumerate(mahadashas):
+        vimshottari_dasha += (
+            f"▸ {maha.planet}: {(maha.end - maha.start) / YEAR_DAYS:.2f} лет\n"
+            f"   Начало: {_format_date(maha.start)}\n"
+            f"   Конец: {_format_date(maha.end)}\n"
+        )
+        if maha_index < len(mahadashas) - 1:
+            vimshottari_dasha += "\n"
+
+    vimshottari_dasha += "Общая продолжительность: 120 лет"
+    return vimshottari_dasha
+
+
+def render_mahadasha_details(timeline):
+    """
+    Подробный текст антар- и пратьянтардаш всех махадаш. Бот его не отправляет и не хранит: подпериоды
+    открываются навигацией (dasha_handlers), а шкала в базе (pack_timeline) позволяет построить текст заново.
+    """
+    mahadasha_details = ""
+    for maha_index, maha in enumerate(timeline.periods(MAHADASHA)):
+        mahadasha_details += f"\nПодпериоды (Антардаша) в Махадаше {maha.planet}:\n\n"
+        for antar_index in timeline.children(MAHADASHA, maha_index):
+            antar = timeline.period(ANTARDASHA, antar_index)
+            years, months, days = years_to_years_months_days(math.floor(antar.end - antar.start) / YEAR_DAYS)
+            mahadasha_details += (
+                f"▸ {antar.planet}: {years} лет, {months} мес., {days} дн.\n"
+                f"  Начало: {_format_date(antar.start)}\n"
+                f"  Конец: {_format_date(antar.end)}\n"
+                f"   Под-подпериоды (Пратьянтардаша) в Антардаше {antar.planet}:\n\n"
+            )
+            for prat_index in timeline.children(ANTARDASHA, antar_index):
+                prat = timeline.period(PRATYANTARDASHA, prat_index)
+                years, months, days = years_to_years_months_days((prat.end - prat.start) / YEAR_DAYS)
+                mahadasha_details += (
+                    f"     • {prat.planet}: {years} лет, {months} мес., {days} дн.\n"
+                    f"       Начало: {_format_date(prat.start)}\n"
+                    f"       Конец: {_format_date(prat.end)}\n"
+                )
+            mahadasha_details += "\n"
+    return mahadasha_details
@@ -0,0 +1,107 @@
+"""
+Функции, выполняемые в процессах пула эфемерид.
+
+Swiss Ephemeris хранит путь к эфемеридам, сидерический режим и топоцентрические координаты в глобальном
+состоянии C-библиотеки, поэтому все вызовы swe.calc_ut/swe.houses выполняются здесь, в отдельных процессах:
+каждый процесс один раз настраивает эфемериды при старте, а топоцентр выставляется в начале каждой задачи.
+"""
+import numpy as np
+import swisseph as swe
+
+from src.utils.chart_data import ASCENDANT_AYANAMSA, planets, setup_ephemeris
+
+SIDEREAL_FLAGS = swe.FLG_SIDEREAL | swe.FLG_SWIEPH | swe.FLG_SPEED
+
+_table = None
+_table_tolerance = 0.0
+
+
+def init_worker(table_tolerance=0.0):
+    """table_tolerance — допустимая ошибка таблицы эфемерид в угловых секундах; 0 — таблица не используется."""
+    global _table, _table_tolerance
+    setup_ephemeris()
+    if table_tolerance:
+        # ephemeris_table сама импортирует SIDEREAL_FLAGS отсюда
+        from src.services.ephemeris_table import get_ephemeris_table
+        _table = get_ephemeris_table()
+        _table_tolerance = table_tolerance / 3600
+
+
+def _table_covers(julian_days):
+    if _table is None:
+        return np.zeros(np.shape(julian_days), dtype=bool)
+    return _table.covers(np.asarray(julian_days, dtype=float))
+
+
+def _table_planets(julian_days):
+    """
+    Долготы и скорости из таблицы формы (..., len(planets)) в порядке chart_data.planets. Кету, как и в
+    swe.calc_ut(TRUE_NODE), совпадает с Раху: + 180° прибавляют вызывающие.
+    """
+    result = _table.table_positions(julian_days, _table_tolerance)
+    columns = [_table.symbols.index("Ra" if symbol == "Ke" else symbol) for _, symbol in planets]
+    return result[..., columns, 0], result[..., columns, 1]
+
+
+def compute_planets(julian_day, latitude, longitude):
+    """
+    Сидерические долготы и скорости планет из chart_data.planets: [(символ, долгота, скорость), ...].
+    Внутри диапазона таблицы эфемерид (если она открыта в init_worker) — по таблице, иначе Swiss Ephemeris.
+    """
+    if _table_covers(julian_day):
+        longitudes, speeds = _table_planets(julian_day)
+        return [(symbol, float(longitudes[column]), float(speeds[column]))
+                for column, (_, symbol) in enumerate(planets)]
+
+    swe.set_topo(longitude, latitude, 0)
+    result = []
+    for planet, symbol in planets:
+        position, _ = swe.calc_ut(julian_day, planet, SIDEREAL_FLAGS)
+        result.append((symbol, position[0], position[3]))
+    return result
+
+
+def compute_ascendant(julian_day, latitude, longitude):
+    """Тропическая долгота асцендента (куспид первого дома по Плацидусу)."""
+    swe.set_topo(longitude, latitude, 0)
+    house_positions = swe.houses(julian_day, latitude, longitude, b'P')
+    return house_positions[0][0]
+
+
+def compute_batch(julian_days, latitudes, longitudes):
+    """
+    Пакетный расчёт для массивов моментов рождения. Моменты внутри таблицы эфемерид интерполируются
+    одним вызовом на весь массив, остальные строки считаются тем же compute_planets, асцендент — тем же
+    compute_ascendant, что и для одиночной карты, поэтому результаты совпадают с ней бит в бит.
+    Раху и Кету всегда считаются ретроградными, долгота Кету — Раху + 180°.
+    """
+    count = len(julian_days)
+    symbols = [symbol for _, symbol in planets]
+    rahu, ketu = symbols.index("Ra"), symbols.index("Ke")
+
+    planet_longitudes = np.empty((count, len(symbols)))
+    planet_speeds = np.empty((count, len(symbols)))
+    ascendants = np.empty(count)
+
+    covered = _table_covers(julian_days)
+    if covered.any():
+        planet_longitudes[covered], planet_speeds[covered] = _table_planets(np.asarray(julian_days)[covered])
+
+    for row, (julian_day, latitude, longitude) in enumerate(zip(julian_days, latitudes, longitudes)):
+        if not covered[row]:
+            for column, (_, planet_longitude, speed) in enumerate(compute_planets(julian_day, latitude, longitude)):
+                planet_longitudes[row, column] = planet_longitude
+                planet_speeds[row, column] = speed
+        ascendant = compute_ascendant(julian_day, latitude, longitude)
+        ascendants[row] = (ascendant - ASCENDANT_AYANAMSA) % 360
+
+    planet_longitudes[:, ketu] = (planet_longitudes[:, rahu] + 180) % 360
+    retrograde = planet_speeds < 0
+    retrograde[:, [rahu, ketu]] = True
+
+    return {
+        "longitudes": planet_longitudes,
+        "speeds": planet_speeds,
+        "retrograde": retrograde,
+        "ascendants": ascendants,
+    }
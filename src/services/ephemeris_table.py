@@ -0,0 +1,211 @@
+"""
+Предрассчитанная таблица сидерических (Лахири) долгот и скоростей планет с фиксированным шагом.
+
+Таблица хранится в компактном двоичном файле и открывается через np.memmap, поэтому при старте
+не читается целиком. Положение на любой момент внутри диапазона получается кубической интерполяцией
+Эрмита по долготам и скоростям соседних узлов. При сборке для каждой планеты измеряется максимальная
+ошибка интерполяции; если она выше допустимой или момент вне диапазона, считается по Swiss Ephemeris.
+Таблицей пользуются процессы пула эфемерид (src.services.ephemeris), допуск — EPHEMERIS_TABLE_TOLERANCE.
+
+    python -m src.services.ephemeris_table build --start 1900-01-01 --end 2100-12-31 --step 1
+    python -m src.services.ephemeris_table report --samples 5000
+"""
+import argparse
+import struct
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import swisseph as swe
+
+from src.constants import EPHEMERIS_TABLE_PATH
+from src.services.ephemeris import SIDEREAL_FLAGS
+from src.utils.chart_data import planets, setup_ephemeris
+
+MAGIC = b"EPT1"
+# start_jd, step, количество узлов, количество планет
+HEADER = struct.Struct("<4sddII")
+DEFAULT_TOLERANCE = 2 / 3600
+
+# Кету не хранится: это Раху + 180°
+TABLE_BODIES = [(planet, symbol) for planet, symbol in planets if symbol != "Ke"]
+
+
+def _live_positions(julian_day, bodies=TABLE_BODIES):
+    result = np.empty((len(bodies), 2))
+    for index, (planet, _) in enumerate(bodies):
+        position, _ = swe.calc_ut(float(julian_day), planet, SIDEREAL_FLAGS)
+        result[index] = position[0], position[3]
+    return result
+
+
+def _angle_difference(a, b):
+    return (a - b + 180) % 360 - 180
+
+
+class EphemerisTable:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            magic, self.start_jd, self.step, self.steps, body_count = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Файл '{path}' не является таблицей эфемерид.")
+
+        self.symbols = [symbol for _, symbol in TABLE_BODIES][:body_count]
+        self.error_bounds = np.memmap(path, dtype="<f8", mode="r", offset=HEADER.size, shape=(body_count,))
+        self._data = np.memmap(
+            path, dtype="<f8", mode="r",
+            offset=HEADER.size + body_count * 8,
+            shape=(self.steps, body_count, 2),
+        )
+        self.end_jd = self.start_jd + (self.steps - 1) * self.step
+
+    def covers(self, julian_day):
+        """Попадает ли момент (или каждый момент массива) в диапазон таблицы."""
+        return (self.start_jd <= julian_day) & (julian_day < self.end_jd)
+
+    def interpolate(self, julian_days):
+        """
+        Долготы и скорости (формы (..., планеты)) для скаляра или массива моментов внутри диапазона таблицы.
+        """
+        julian_days = np.asarray(julian_days, dtype=float)
+        position = (julian_days - self.start_jd) / self.step
+        index = np.clip(np.floor(position).astype(np.int64), 0, self.steps - 2)
+        t = (position - index)[..., np.newaxis]
+
+        left = self._data[index]
+        right = self._data[index + 1]
+        delta = _angle_difference(right[..., 0], left[..., 0])
+        left_slope = left[..., 1] * self.step
+        right_slope = right[..., 1] * self.step
+
+        t2, t3 = t * t, t * t * t
+        longitude = (
+            left[..., 0]
+            + (-2 * t3 + 3 * t2) * delta
+            + (t3 - 2 * t2 + t) * left_slope
+            + (t3 - t2) * right_slope
+        )
+        speed = (
+            (-6 * t2 + 6 * t) * delta
+            + (3 * t2 - 4 * t + 1) * left_slope
+            + (3 * t2 - 2 * t) * right_slope
+        ) / self.step
+        return longitude % 360, speed
+
+    def table_positions(self, julian_days, tolerance=DEFAULT_TOLERANCE):
+        """
+        Долготы и скорости формы (..., планеты, 2) для скаляра или массива моментов внутри диапазона таблицы.
+        Планеты, чья ошибка интерполяции выше tolerance, считаются напрямую.
+        """
+        julian_days = np.asarray(julian_days, dtype=float)
+        longitudes, speeds = self.interpolate(julian_days)
+        result = np.stack([longitudes, speeds], axis=-1)
+        inexact = [index for index, bound in enumerate(self.error_bounds) if bound > tolerance]
+        if inexact:
+            setup_ephemeris()
+            bodies = [TABLE_BODIES[index] for index in inexact]
+            for moment in np.ndindex(julian_days.shape):
+                result[moment][inexact] = _live_positions(julian_days[moment], bodies)
+        return result
+
+    def positions(self, julian_day, tolerance=DEFAULT_TOLERANCE):
+        """
+        {символ: (долгота, скорость)} для всех планет из chart_data.planets, включая Кету.
+        Планеты, чья ошибка интерполяции выше tolerance, и моменты вне таблицы считаются напрямую.
+        """
+        if self.covers(julian_day):
+            result = self.table_positions(julian_day, tolerance)
+        else:
+            setup_ephemeris()
+            result = _live_positions(julian_day)
+
+        positions = {symbol: (float(result[i, 0]), float(result[i, 1])) for i, symbol in enumerate(self.symbols)}
+        rahu_longitude, rahu_speed = positions["Ra"]
+        positions["Ke"] = ((rahu_longitude + 180) % 360, rahu_speed)
+        return positions
+
+
+def build_table(path, start_jd, end_jd, step=1.0):
+    setup_ephemeris()
+    steps = int(np.ceil((end_jd - start_jd) / step)) + 1
+    data = np.empty((steps, len(TABLE_BODIES), 2))
+    for index in range(steps):
+        data[index] = _live_positions(start_jd + index * step)
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, start_jd, step, steps, len(TABLE_BODIES)))
+        file.write(np.zeros(len(TABLE_BODIES), dtype="<f8").tobytes())
+        file.write(data.astype("<f8").tobytes())
+
+    # оценка ошибки: середины интервалов — точки, где интерполяция дальше всего от узлов
+    table = EphemerisTable(path)
+    midpoints = start_jd + (np.arange(steps - 1) + 0.5) * step
+    bounds = accuracy_report(table, midpoints)["max"]
+    del table
+
+    with open(path, "r+b") as file:
+        file.seek(HEADER.size)
+        file.write(np.asarray(bounds, dtype="<f8").tobytes())
+    return steps
+
+
+def accuracy_report(table, julian_days):
+    """Максимальная и средняя ошибка долготы интерполяции относительно Swiss Ephemeris, в градусах."""
+    setup_ephemeris()
+    julian_days = np.asarray(julian_days, dtype=float)
+    interpolated, _ = table.interpolate(julian_days)
+    live = np.array([_live_positions(julian_day)[:, 0] for julian_day in julian_days])
+    errors = np.abs(_angle_difference(interpolated, live))
+    return {"max": errors.max(axis=0), "mean": errors.mean(axis=0)}
+
+
+_ephemeris_table = None
+
+
+def get_ephemeris_table():
+    """Открывает таблицу при первом обращении (в процессах пула эфемерид — в init_worker). Нет файла — None."""
+    global _ephemeris_table
+    if _ephemeris_table is None and EPHEMERIS_TABLE_PATH.exists():
+        _ephemeris_table = EphemerisTable(EPHEMERIS_TABLE_PATH)
+    return _ephemeris_table
+
+
+def _julian_day(value):
+    day = date.fromisoformat(value)
+    return swe.julday(day.year, day.month, day.day, 0.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Предрассчитанная таблица сидерических эфемерид.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("--start", default="1900-01-01")
+    build_parser.add_argument("--end", default="2100-12-31")
+    build_parser.add_argument("--step", type=float, default=1.0, help="шаг в сутках")
+    build_parser.add_argument("--output", default=str(EPHEMERIS_TABLE_PATH))
+
+    report_parser = subparsers.add_parser("report")
+    report_parser.add_argument("--samples", type=int, default=5000)
+    report_parser.add_argument("--path", default=str(EPHEMERIS_TABLE_PATH))
+
+    args = parser.parse_args()
+    if args.command == "build":
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        steps = build_table(args.output, _julian_day(args.start), _julian_day(args.end), args.step)
+        print(f"Записано узлов: {steps} -> {args.output}")
+        args.path = args.output
+        args.samples = 0
+
+    table = EphemerisTable(args.path)
+    print("Оценка ошибки при сборке (середины интервалов), угл. сек.:")
+    for symbol, bound in zip(table.symbols, table.error_bounds):
+        print(f"  {symbol:<3} {bound * 3600:10.4f}")
+
+    if args.samples:
+        generator = np.random.default_rng(1)
+        sample = generator.uniform(table.start_jd, table.end_jd, args.samples)
+        report = accuracy_report(table, sample)
+        print(f"Случайная выборка из {args.samples} моментов, угл. сек. (макс. / средн.):")
+        for symbol, maximum, mean in zip(table.symbols, report["max"], report["mean"]):
+            print(f"  {symbol:<3} {maximum * 3600:10.4f} {mean * 3600:10.4f}")
@@ -0,0 +1,290 @@
+"""
+Офлайн-справочник городов.
+
+Файл строится один раз из выгрузки GeoNames (cities15000.txt и т.п.) и затем
+открывается через mmap: записи городов фиксированной длины, отсортированный
+индекс нормализованных названий (поиск по префиксу бинарным поиском) и общий
+блок строк.
+
+Сборка:
+    python -m src.services.gazetteer cities15000.txt \
+        --alternate-names alternateNamesV2.txt \
+        --admin1 admin1CodesASCII.txt --countries countryInfo.txt
+"""
+import argparse
+import bisect
+import mmap
+import re
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.constants import GAZETTEER_PATH
+from src.utils.keyboards import replace_yo_with_e
+
+MAGIC = b"GZT1"
+HEADER = struct.Struct("<4sII")
+# широта, долгота, население, ссылки на строки: название, регион, страна, часовой пояс
+CITY_RECORD = struct.Struct("<ffIIIII")
+KEY_RECORD = struct.Struct("<II")
+STRING_LENGTH = struct.Struct("<H")
+
+SCAN_LIMIT = 2000
+
+
+@dataclass(frozen=True)
+class City:
+    name: str
+    region: str
+    country: str
+    latitude: float
+    longitude: float
+    population: int = 0
+    timezone: str | None = None
+
+    @property
+    def title(self):
+        if self.region and self.region != self.country:
+            return f"{self.name}, {self.region}, {self.country}"
+        return f"{self.name}, {self.country}"
+
+
+def normalize_city_name(text):
+    text = replace_yo_with_e(text.strip().lower())
+    return re.sub(r"\s+", " ", text)
+
+
+class _KeyView:
+    """Последовательность ключей индекса для bisect без их распаковки в память."""
+
+    def __init__(self, gazetteer):
+        self._gazetteer = gazetteer
+
+    def __len__(self):
+        return self._gazetteer.key_count
+
+    def __getitem__(self, index):
+        return self._gazetteer.key_bytes(index)
+
+
+class Gazetteer:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.city_count, self.key_count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Файл '{path}' не является справочником городов.")
+
+        self._cities_offset = HEADER.size
+        self._keys_offset = self._cities_offset + self.city_count * CITY_RECORD.size
+        self._strings_offset = self._keys_offset + self.key_count * KEY_RECORD.size
+        self._keys = _KeyView(self)
+
+    def close(self):
+        self._buffer.close()
+
+    def _string_bytes(self, ref):
+        offset = self._strings_offset + ref
+        (length,) = STRING_LENGTH.unpack_from(self._buffer, offset)
+        start = offset + STRING_LENGTH.size
+        return self._buffer[start:start + length]
+
+    def _string(self, ref):
+        return self._string_bytes(ref).decode("utf-8")
+
+    def key_bytes(self, index):
+        key_ref, _ = KEY_RECORD.unpack_from(self._buffer, self._keys_offset + index * KEY_RECORD.size)
+        return self._string_bytes(key_ref)
+
+    def _key_city(self, index):
+        return KEY_RECORD.unpack_from(self._buffer, self._keys_offset + index * KEY_RECORD.size)[1]
+
+    def city(self, index):
+        latitude, longitude, population, name, region, country, tz_name = CITY_RECORD.unpack_from(
+            self._buffer, self._cities_offset + index * CITY_RECORD.size
+        )
+        return City(
+            name=self._string(name),
+            region=self._string(region),
+            country=self._string(country),
+            latitude=round(latitude, 5),
+            longitude=round(longitude, 5),
+            population=population,
+            timezone=self._string(tz_name) or None,
+        )
+
+    def search(self, query, limit=52, prefix=True):
+        """
+        Возвращает города, чьё название (на любом из проиндексированных языков) совпадает с запросом
+        или начинается с него. Точные совпадения идут первыми, далее по убыванию населения.
+        """
+        key = normalize_city_name(query).encode("utf-8")
+        if not key:
+            return []
+
+        index = bisect.bisect_left(self._keys, key)
+        exact, partial = {}, {}
+        for position in range(index, min(index + SCAN_LIMIT, self.key_count)):
+            candidate = self.key_bytes(position)
+            if candidate == key:
+                exact.setdefault(self._key_city(position), True)
+            elif prefix and candidate.startswith(key):
+                partial.setdefault(self._key_city(position), True)
+            else:
+                break
+
+        exact_cities = [self.city(i) for i in exact]
+        partial_cities = [self.city(i) for i in partial if i not in exact]
+        exact_cities.sort(key=lambda city: -city.population)
+        partial_cities.sort(key=lambda city: -city.population)
+        return (exact_cities + partial_cities)[:limit]
+
+
+_gazetteer = None
+
+
+def get_gazetteer():
+    """Открывает справочник при первом обращении. Если файл не собран, возвращает None."""
+    global _gazetteer
+    if _gazetteer is None and GAZETTEER_PATH.exists():
+        _gazetteer = Gazetteer(GAZETTEER_PATH)
+    return _gazetteer
+
+
+def _read_tsv(path):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip() or line.startswith("#"):
+                continue
+            yield line.rstrip("\n").split("\t")
+
+
+def _load_alternate_names(path, geoname_ids, language):
+    """Предпочтительное название на нужном языке для каждого geonameid из набора."""
+    names = {}
+    preferred = set()
+    for row in _read_tsv(path):
+        if len(row) < 4 or row[2] != language:
+            continue
+        geoname_id = int(row[1])
+        if geoname_id not in geoname_ids:
+            continue
+        is_preferred = len(row) > 4 and row[4] == "1"
+        is_colloquial_or_historic = len(row) > 7 and (row[6] == "1" or row[7] == "1")
+        if is_colloquial_or_historic:
+            continue
+        names.setdefault(geoname_id, []).append(row[3])
+        if is_preferred and geoname_id not in preferred:
+            preferred.add(geoname_id)
+            names[geoname_id].insert(0, names[geoname_id].pop())
+    return names
+
+
+def build_gazetteer(cities_path, output_path, alternate_names_path=None, admin1_path=None, countries_path=None,
+                    language="ru", min_population=0):
+    cities = []
+    for row in _read_tsv(cities_path):
+        population = int(row[14] or 0)
+        if population < min_population:
+            continue
+        cities.append({
+            "id": int(row[0]),
+            "name": row[1],
+            "ascii_name": row[2],
+            "latitude": float(row[4]),
+            "longitude": float(row[5]),
+            "country_code": row[8],
+            "admin1_code": f"{row[8]}.{row[10]}",
+            "population": population,
+            "timezone": row[17],
+        })
+
+    admin1 = {}
+    if admin1_path:
+        for row in _read_tsv(admin1_path):
+            admin1[row[0]] = (row[1], int(row[3]))
+
+    countries = {}
+    if countries_path:
+        for row in _read_tsv(countries_path):
+            countries[row[0]] = (row[4], int(row[16]))
+
+    localized = {}
+    if alternate_names_path:
+        geoname_ids = {city["id"] for city in cities}
+        geoname_ids.update(geoname_id for _, geoname_id in admin1.values())
+        geoname_ids.update(geoname_id for _, geoname_id in countries.values())
+        localized = _load_alternate_names(alternate_names_path, geoname_ids, language)
+
+    def local_name(default, geoname_id):
+        return localized.get(geoname_id, [default])[0]
+
+    strings = bytearray()
+    string_refs = {}
+
+    def add_string(value):
+        if value not in string_refs:
+            encoded = value.encode("utf-8")
+            string_refs[value] = len(strings)
+            strings.extend(STRING_LENGTH.pack(len(encoded)))
+            strings.extend(encoded)
+        return string_refs[value]
+
+    city_records = bytearray()
+    keys = set()
+    for index, city in enumerate(cities):
+        region_name, region_id = admin1.get(city["admin1_code"], ("", 0))
+        country_name, country_id = countries.get(city["country_code"], (city["country_code"], 0))
+
+        city_records.extend(CITY_RECORD.pack(
+            city["latitude"],
+            city["longitude"],
+            city["population"],
+            add_string(local_name(city["name"], city["id"])),
+            add_string(local_name(region_name, region_id) if region_name else ""),
+            add_string(local_name(country_name, country_id)),
+            add_string(city["timezone"]),
+        ))
+
+        for name in (city["name"], city["ascii_name"], *localized.get(city["id"], [])):
+            key = normalize_city_name(name)
+            if key:
+                keys.add((key.encode("utf-8"), index))
+
+    key_records = bytearray()
+    for key, index in sorted(keys):
+        key_records.extend(KEY_RECORD.pack(add_string(key.decode("utf-8")), index))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(cities), len(keys)))
+        file.write(city_records)
+        file.write(key_records)
+        file.write(strings)
+
+    return len(cities), len(keys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сборка офлайн-справочника городов из выгрузки GeoNames.")
+    parser.add_argument("cities", help="cities15000.txt или другой файл в формате таблицы geoname")
+    parser.add_argument("--alternate-names", help="alternateNamesV2.txt для локализованных названий")
+    parser.add_argument("--admin1", help="admin1CodesASCII.txt для названий регионов")
+    parser.add_argument("--countries", help="countryInfo.txt для названий стран")
+    parser.add_argument("--language", default="ru")
+    parser.add_argument("--min-population", type=int, default=0)
+    parser.add_argument("--output", default=str(GAZETTEER_PATH))
+    args = parser.parse_args()
+
+    city_count, key_count = build_gazetteer(
+        args.cities, args.output,
+        alternate_names_path=args.alternate_names,
+        admin1_path=args.admin1,
+        countries_path=args.countries,
+        language=args.language,
+        min_population=args.min_population,
+    )
+    print(f"Записано городов: {city_count}, ключей индекса: {key_count} -> {args.output}")
@@ -0,0 +1,137 @@
+from dataclasses import asdict, dataclass
+
+from geopy.adapters import AioHTTPAdapter
+from geopy.geocoders import Nominatim
+
+from src.constants import CACHE_PATH
+from src.dispatcher.dispatcher import settings
+from src.services.gazetteer import City, get_gazetteer, normalize_city_name
+from src.services.timezones import timezone_name_at
+from src.utils.single_flight import SingleFlight
+from src.utils.sqlite_cache import MISSING, SqliteCache
+
+CITY_SEARCH_LIMIT = 52
+
+
+@dataclass(frozen=True)
+class ResolvedLocation:
+    latitude: float
+    longitude: float
+    tz_name: str
+    display_name: str
+
+
+_geolocator = None
+
+
+def get_geolocator():
+    """Nominatim с сессией aiohttp: создаётся при первом запросе, уже внутри цикла событий бота."""
+    global _geolocator
+    if _geolocator is None:
+        _geolocator = Nominatim(user_agent="jyotish_bot", timeout=10, adapter_factory=AioHTTPAdapter)
+    return _geolocator
+
+
+async def close_geolocator():
+    """Закрывает сессию aiohttp геокодера (см. tg_main)."""
+    global _geolocator
+    if _geolocator is not None:
+        await _geolocator.__aexit__(None, None, None)
+        _geolocator = None
+
+
+class GeocodeCache:
+    """
+    Кэш ответов геокодера.
+    Пустые ответы («не найдено») кэшируются с отдельным, более коротким TTL.
+    Одновременные одинаковые запросы схлопываются в один запрос к геокодеру.
+    """
+
+    def __init__(self, path, ttl, negative_ttl, max_entries):
+        self.negative_ttl = negative_ttl
+        self._storage = SqliteCache(path, namespace="geocode", ttl=ttl, max_entries=max_entries)
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.negative_hits = 0
+
+    async def open(self):
+        await self._storage.open()
+
+    async def get_or_fetch(self, key, fetch):
+        cached = await self._storage.get(key)
+        if cached is not MISSING:
+            self.hits += 1
+            if not cached:
+                self.negative_hits += 1
+            return cached
+        return await self._flights.run(key, lambda: self._fetch(key, fetch))
+
+    async def _fetch(self, key, fetch):
+        value = await fetch()
+        if value:
+            await self._storage.set(key, value)
+        else:
+            await self._storage.set(key, value, ttl=self.negative_ttl)
+        return value
+
+    async def stats(self):
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self._flights.leaders,
+            "joined": self._flights.joined,
+            "entries": await self._storage.count(),
+        }
+
+
+geocode_cache = GeocodeCache(
+    CACHE_PATH,
+    ttl=settings.GEOCODE_CACHE_TTL,
+    negative_ttl=settings.GEOCODE_NEGATIVE_CACHE_TTL,
+    max_entries=settings.GEOCODE_CACHE_MAX_ENTRIES,
+)
+
+
+def city_from_location(location):
+    address_parts = [part.strip() for part in location.address.split(",")]
+    return City(
+        name=address_parts[0],
+        region=address_parts[2] if len(address_parts) > 2 else "",
+        country=address_parts[-1],
+        latitude=location.latitude,
+        longitude=location.longitude,
+    )
+
+
+async def search_cities(query, limit=CITY_SEARCH_LIMIT):
+    """
+    Ищет города сначала в офлайн-справочнике. Если точного совпадения названия в нём нет (или справочник
+    не собран), обращается к Nominatim через кэш: его города идут первыми, за ними совпадения по префиксу.
+    """
+    gazetteer = get_gazetteer()
+    cities = []
+    if gazetteer is not None:
+        cities = gazetteer.search(query, limit=limit)
+        # в справочнике только крупные города: посёлка может не быть, хотя его название — префикс другого
+        if cities and gazetteer.search(query, limit=1, prefix=False):
+            return cities
+
+    async def fetch():
+        locations = await get_geolocator().geocode(query, exactly_one=False, limit=limit, language="ru")
+        return [asdict(city_from_location(location)) for location in locations or []]
+
+    found = await geocode_cache.get_or_fetch(f"search:{limit}:{normalize_city_name(query)}", fetch)
+    return ([City(**city) for city in found] + cities)[:limit]
+
+
+def resolve_location(city):
+    """Координаты, часовой пояс и подпись выбранного города — всё, что нужно для расчёта карты."""
+    tz_name = city.timezone or timezone_name_at(city.latitude, city.longitude)
+    if not tz_name:
+        raise ValueError(f"Не удалось определить часовой пояс для локации '{city.title}'.")
+    return ResolvedLocation(
+        latitude=city.latitude,
+        longitude=city.longitude,
+        tz_name=tz_name,
+        display_name=city.title,
+    )
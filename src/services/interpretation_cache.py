@@ -0,0 +1,109 @@
+"""
+Кэш расшифровок натальных карт по содержимому запроса.
+
+Ключ — sha256 канонического JSON из модели, варианта и версии шаблона промпта (см. services.prompts)
+и входных данных карты с нормализованными пробелами, поэтому одинаковые карты дают один ключ,
+а смена модели, варианта или версии шаблона — новые ключи. Записи лежат в таблице interpretation_cache основной базы
+вместе со счётчиком попаданий; при заданном INTERPRETATION_CACHE_TTL устаревшая запись удаляется при чтении.
+
+Ошибка базы не мешает расшифровке: чтение считается промахом, запись пропускается.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.database.engine import open_session
+from src.database.models.models import CachedInterpretation
+from src.dispatcher.dispatcher import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical_text(text):
+    return "\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip())
+
+
+def template_version(prompt):
+    return f"{prompt.variant}:{prompt.template_version}"
+
+
+def interpretation_key(prompt, model=None):
+    """Ключ кэша для prompts.InterpretationPrompt."""
+    canonical = json.dumps(
+        [model or settings.OPENAI_MODEL, template_version(prompt), _canonical_text(prompt.chart)],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class InterpretationCache:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.errors = 0
+
+    async def _get(self, key):
+        now = datetime.utcnow()
+        async with open_session() as session:
+            entry = await session.get(CachedInterpretation, key)
+            # пустые расшифровки могли попасть в кэш раньше: считаются промахом и перезаписываются
+            if entry is None or not entry.interpretation:
+                return None
+            if self.ttl is not None and entry.created_at + timedelta(seconds=self.ttl) <= now:
+                await session.delete(entry)
+                await session.commit()
+                return None
+            await session.execute(
+                update(CachedInterpretation)
+                .where(CachedInterpretation.key == key)
+                .values(hits=CachedInterpretation.hits + 1, last_hit_at=now)
+            )
+            await session.commit()
+            return entry.interpretation
+
+    async def _set(self, key, interpretation, model, template_version):
+        async with open_session() as session:
+            await session.merge(CachedInterpretation(
+                key=key,
+                model=model,
+                template_version=template_version,
+                interpretation=interpretation,
+                hits=0,
+                created_at=datetime.utcnow(),
+            ))
+            await session.commit()
+
+    async def get(self, key):
+        """Закэшированная расшифровка или None."""
+        try:
+            interpretation = await self._get(key)
+        except (SQLAlchemyError, OSError) as e:
+            self.errors += 1
+            logger.warning("Кэш расшифровок недоступен: %s", e)
+            interpretation = None
+        if interpretation is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return interpretation
+
+    async def set(self, key, interpretation, prompt, model=None):
+        try:
+            await self._set(key, interpretation, model or settings.OPENAI_MODEL, template_version(prompt))
+        except (SQLAlchemyError, OSError) as e:
+            self.errors += 1
+            logger.warning("Расшифровка не сохранена в кэш: %s", e)
+        else:
+            self.stored += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "stored": self.stored, "errors": self.errors}
+
+
+interpretation_cache = InterpretationCache(ttl=settings.INTERPRETATION_CACHE_TTL)
@@ -1,26 +1,220 @@
-from openai import OpenAI
-from src.dispatcher.dispatcher import openai_api_key
-
-
-async def chat_gpt(house_info, vimshottari_dash):
-    client = OpenAI(api_key=openai_api_key)
-
-    prompt = f"""
-    Ты астролог высокого уровня джйотиш, который отвечает на вопросы максимально подробно и максимально корректно.
-    Расшифруй натальную карту на основе следующих данных:
-    {house_info}
-    {vimshottari_dash}
-    **Задача:**
-    - Проанализируй положение планет в домах, их силу и влияние.
-    - Опиши ключевые тенденции в жизни человека.
-    - Укажи, какие периоды (даши) будут наиболее важными.
-    - Будь максимально точным и детализированным.
+"""
+Запросы к OpenAI.
+
+Один AsyncOpenAI на процесс с общим пулом HTTP-соединений, поэтому TLS-рукопожатие не повторяется
+на каждый запрос. Одновременно к API идёт не больше OPENAI_MAX_CONCURRENCY запросов, остальные ждут семафор.
+Ответы 429 и 5xx, таймауты и сетевые ошибки повторяются здесь же с экспоненциальной задержкой
+и случайным разбросом (с учётом Retry-After), во время паузы место в семафоре свободно;
+встроенные повторы клиента отключены. Потоковый ответ повторяется, только пока из него ничего не получено.
+
+Пакет openai тяжёлый, поэтому клиент создаётся при первом запросе (или в фоне при старте бота, см. tg_main).
+"""
+import asyncio
+import logging
+import random
+import time
+
+from src.dispatcher.dispatcher import openai_api_key, settings
+
+logger = logging.getLogger(__name__)
+
+
+class InterpretationUnavailable(Exception):
+    pass
+
+
+_client = None
+_semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+_counters = dict.fromkeys(["requests", "retries", "failed"], 0)
+
+
+def get_client():
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        _client = AsyncOpenAI(
+            api_key=openai_api_key,
+            base_url=settings.OPENAI_BASE_URL,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.OPENAI_MAX_CONCURRENCY,
+                ),
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _retry_delay(attempt, error):
+    delay = random.uniform(0, min(settings.OPENAI_RETRY_MAX_DELAY, settings.OPENAI_RETRY_BASE_DELAY * 2 ** attempt))
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            delay = max(delay, float(response.headers.get("retry-after", 0)))
+        except ValueError:
+            pass
+    return delay
+
+
+def _is_retryable(error):
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+
+    return isinstance(error, (RateLimitError, InternalServerError, APIConnectionError))
+
+
+async def _retry_pause(attempt, error):
+    """Пауза перед повтором attempt + 1; False, если ошибка постоянная или повторы исчерпаны."""
+    if not _is_retryable(error) or attempt == settings.OPENAI_MAX_RETRIES:
+        _counters["failed"] += 1
+        return False
+    delay = _retry_delay(attempt, error)
+    _counters["retries"] += 1
+    logger.warning("OpenAI: %s, повтор %d через %.1f с", type(error).__name__, attempt + 1, delay)
+    await asyncio.sleep(delay)
+    return True
+
+
+async def request_with_retries(request):
+    """
+    Выполняет request() — корутину с запросом к API — под семафором и повторяет при временных ошибках
+    до OPENAI_MAX_RETRIES раз. Последняя ошибка пробрасывается.
     """
+    from openai import APIError
+
+    for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+        try:
+            async with _semaphore:
+                _counters["requests"] += 1
+                return await request()
+        except APIError as e:
+            if not await _retry_pause(attempt, e):
+                raise
+
+
+def stats():
+    return dict(_counters)
 
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "assistant", "content": prompt}],
-        stream=False,
+def _log_interpretation(prompt, usage, started, first_fragment_at=None, finish_reason="stop"):
+    """Отчёт по расшифровке для сравнения вариантов промпта: токены (по ответу API) и задержка."""
+    finished = time.perf_counter()
+    logger.info(
+        "Расшифровка %s: вход %s ток., выход %s ток., первый фрагмент %s, всего %.2f с",
+        prompt.variant,
+        usage.prompt_tokens if usage else "?",
+        usage.completion_tokens if usage else "?",
+        f"{first_fragment_at - started:.2f} с" if first_fragment_at else "-",
+        finished - started,
     )
+    if finish_reason != "stop":
+        logger.warning("Расшифровка %s не завершена моделью: finish_reason=%s", prompt.variant, finish_reason)
+
+
+async def chat_gpt(prompt):
+    """Расшифровка целиком; prompt — prompts.InterpretationPrompt."""
+    from openai import APIError
+
+    client = get_client()
+    started = time.perf_counter()
+    try:
+        response = await request_with_retries(lambda: client.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=prompt.messages,
+            stream=False,
+        ))
+    except APIError as e:
+        logger.error("OpenAI: расшифровка не получена: %s", e)
+        raise InterpretationUnavailable() from e
+    _log_interpretation(prompt, response.usage, started)
     return response.choices[0].message.content
+
+
+class InterpretationStream:
+    """
+    Расшифровка по фрагментам по мере генерации: async for по объекту даёт строки. После окончания потока
+    finish_reason — причина остановки модели: "stop" — ответ полный, "length" — обрезан по лимиту токенов.
+    Если ответ не получен или оборвался, итерация бросает InterpretationUnavailable.
+    """
+
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.finish_reason = None
+
+    def __aiter__(self):
+        return self._fragments()
+
+    async def _fragments(self):
+        # ответ читает отдельная задача: пока потребитель ждёт (например, флуд-контроль Telegram),
+        # место в семафоре не занято его ожиданием. В очереди фрагменты, ошибка чтения и None в конце
+        fragments = asyncio.Queue()
+        reader = asyncio.create_task(self._read(fragments))
+        try:
+            while (fragment := await fragments.get()) is not None:
+                if isinstance(fragment, Exception):
+                    raise fragment
+                yield fragment
+        finally:
+            reader.cancel()
+
+    async def _read(self, fragments):
+        try:
+            await self._request(fragments)
+        except Exception as e:
+            fragments.put_nowait(e)
+        fragments.put_nowait(None)
+
+    async def _request(self, fragments):
+        import httpx
+        from openai import APIError
+
+        client = get_client()
+        started = time.perf_counter()
+        first_fragment_at = None
+        usage = None
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            try:
+                async with _semaphore:
+                    _counters["requests"] += 1
+                    stream = await client.chat.completions.create(
+                        model=settings.OPENAI_MODEL,
+                        messages=self.prompt.messages,
+                        stream=True,
+                        # последний фрагмент потока несёт расход токенов
+                        stream_options={"include_usage": True},
+                    )
+                    async with stream:
+                        async for chunk in stream:
+                            if chunk.usage:
+                                usage = chunk.usage
+                            if not chunk.choices:
+                                continue
+                            self.finish_reason = chunk.choices[0].finish_reason or self.finish_reason
+                            if chunk.choices[0].delta.content:
+                                first_fragment_at = first_fragment_at or time.perf_counter()
+                                fragments.put_nowait(chunk.choices[0].delta.content)
+                _log_interpretation(self.prompt, usage, started, first_fragment_at, self.finish_reason)
+                return
+            except (APIError, httpx.HTTPError) as e:
+                # после первых фрагментов повтор начал бы текст заново
+                received = first_fragment_at is not None
+                if received:
+                    _counters["failed"] += 1
+                if received or not await _retry_pause(attempt, e):
+                    logger.error("OpenAI: расшифровка не получена: %s", e)
+                    raise InterpretationUnavailable() from e
+
+
+def stream_chat_gpt(prompt):
+    """Расшифровка потоком (InterpretationStream); prompt — prompts.InterpretationPrompt."""
+    return InterpretationStream(prompt)
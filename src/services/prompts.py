@@ -0,0 +1,156 @@
+"""
+Промпты для расшифровки натальной карты.
+
+Вариант "full" — прежний промпт: подробный текст домов и вся 120-летняя последовательность махадаш
+с датами начала и конца. Вариант "compact" — те же сведения в короткой детерминированной записи:
+по строке на дом с планетами и флагами достоинства, текущие маха-, антар- и пратьянтардаша и следующие
+махадаша и антардаша. Во втором варианте примерно на треть меньше входного текста.
+
+PROMPT_VARIANT выбирает вариант, по умолчанию "full"; "ab" делит пользователей пополам по telegram id,
+чтобы сравнить задержку и стоимость расшифровок в логах (см. services.openai). Версия шаблона входит в ключ кэша
+расшифровок: при правке текста шаблона её нужно поменять.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+from src.services.dasha import ANTARDASHA, MAHADASHA
+from src.utils.chart_data import clean_planet_symbol, zodiac_names, zodiac_symbol_to_name
+
+PROMPT_VARIANTS = ("full", "compact")
+TEMPLATE_VERSIONS = {"full": "1", "compact": "1"}
+
+DASHA_PLANET_SYMBOLS = {
+    "Кету": "Ke", "Венера": "Ve", "Солнце": "Su", "Луна": "Mo", "Марс": "Ma",
+    "Раху": "Ra", "Юпитер": "Jp", "Сатурн": "Sa", "Меркурий": "Me",
+}
+
+# отметки в символе планеты из chart_data.position_data_with_retrograde
+DIGNITY_FLAGS = [("(", "R"), ("↑", "E"), ("↓", "D"), ("\u035F", "MT")]
+
+COMPACT_SYSTEM_PROMPT = (
+    "Ты астролог высокого уровня джйотиш. Расшифруй натальную карту подробно и корректно: "
+    "положение планет в домах, их силу и влияние, ключевые тенденции в жизни человека и самые важные периоды даш.\n"
+    "Формат карты: строка дома — номер, знак, планеты. Планеты: Su Солнце, Mo Луна, Ma Марс, Me Меркурий, "
+    "Jp Юпитер, Ve Венера, Sa Сатурн, Ra Раху, Ke Кету. Флаги: R ретроградна, E экзальтация, D падение, "
+    "MT мулатрикона. Даши Вимшоттари: MD махадаша, AD антардаша, PD пратьянтардаша, даты в формате ГГГГ-ММ-ДД."
+)
+
+
+@dataclass(frozen=True)
+class InterpretationPrompt:
+    variant: str
+    template_version: str
+    # входные данные карты, от которых зависит ответ: по ним строится ключ кэша
+    chart: str
+    messages: list
+
+
+def choose_variant(setting, user_id):
+    if setting == "ab":
+        return PROMPT_VARIANTS[user_id % len(PROMPT_VARIANTS)]
+    return setting
+
+
+def _planet_entry(symbol):
+    flags = [flag for mark, flag in DIGNITY_FLAGS if mark in symbol]
+    return clean_planet_symbol(symbol) + (f"({','.join(flags)})" if flags else "")
+
+
+def _sign_name(sign):
+    return zodiac_symbol_to_name[sign][:3]
+
+
+def _dasha_entry(prefix, period):
+    return (f"{prefix} {DASHA_PLANET_SYMBOLS.get(period.planet, period.planet)} "
+            f"{period.start_datetime:%Y-%m-%d}..{period.end_datetime:%Y-%m-%d}")
+
+
+def compact_chart(ascendant_sign, planet_positions, dasha_timeline, moment=None):
+    """
+    Карта в компактной записи: дома от асцендента с планетами в порядке chart_data.planets и даши на момент moment.
+    Одинаковые карты на одинаковых периодах дают одинаковый текст.
+    """
+    ascendant_index = zodiac_names.index(ascendant_sign)
+    houses = [[] for _ in range(12)]
+    for symbol, longitude in planet_positions:
+        houses[(int(longitude // 30) - ascendant_index) % 12].append(_planet_entry(symbol))
+
+    lines = [
+        f"{number} {_sign_name(zodiac_names[(ascendant_index + number - 1) % 12])}: {' '.join(planets) or '-'}"
+        for number, planets in enumerate(houses, start=1)
+    ]
+
+    moment = moment or datetime.now()
+    current = dasha_timeline.current_periods(moment)
+    if current:
+        lines.append("Сейчас: " + "; ".join(
+            _dasha_entry(prefix, period) for prefix, period in zip(("MD", "AD", "PD"), current)
+        ))
+    following = [
+        _dasha_entry(prefix, period)
+        for prefix, level in (("MD", MAHADASHA), ("AD", ANTARDASHA))
+        for period in [dasha_timeline.next_period(level, moment)]
+        if period is not None
+    ]
+    if following:
+        lines.append("Далее: " + "; ".join(following))
+    return "\n".join(lines)
+
+
+def _full_messages(house_info, vimshottari_dash):
+    prompt = f"""
+    Ты астролог высокого уровня джйотиш, который отвечает на вопросы максимально подробно и максимально корректно.
+    Расшифруй натальную карту на основе следующих данных:
+    {house_info}
+    {vimshottari_dash}
+    **Задача:**
+    - Проанализируй положение планет в домах, их силу и влияние.
+    - Опиши ключевые тенденции в жизни человека.
+    - Укажи, какие периоды (даши) будут наиболее важными.
+    - Будь максимально точным и детализированным.
+    """
+    return [{"role": "assistant", "content": prompt}]
+
+
+def build_prompt(variant, house_info, vimshottari_dash, chart):
+    """
+    Промпт варианта variant. house_info и vimshottari_dash — тексты для "full",
+    chart — результат compact_chart для "compact".
+    """
+    if variant == "full":
+        chart_data = f"{house_info}\n{vimshottari_dash}"
+        messages = _full_messages(house_info, vimshottari_dash)
+    elif variant == "compact":
+        chart_data = chart
+        messages = [{"role": "system", "content": COMPACT_SYSTEM_PROMPT}, {"role": "user", "content": chart}]
+    else:
+        raise ValueError(f"Неизвестный вариант промпта: {variant}")
+    return InterpretationPrompt(variant, TEMPLATE_VERSIONS[variant], chart_data, messages)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except OSError:
+        # словарь кодировки скачивается при первом использовании
+        return None
+
+
+def count_tokens(messages, model):
+    """
+    Входные токены промпта по tiktoken (необязательная зависимость);
+    None, если tiktoken не установлен или словарь кодировки недоступен.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return None
+    # служебные токены сообщений: около 3 на сообщение и 3 на начало ответа
+    return sum(len(encoding.encode(message["content"])) + 3 for message in messages) + 3
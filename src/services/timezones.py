@@ -0,0 +1,39 @@
+"""
+Определение часового пояса по координатам.
+
+Один TimezoneFinder на процесс; каждый ответ — точная проверка по полигонам поясов. Внутри поясов она
+и так быстрая: TimezoneFinder по своей сетке ячеек знает, какие полигоны могут содержать точку, и при
+единственном кандидате отвечает без проверки. Ответы кэшируются по самим координатам: выбранные города
+повторяются с теми же координатами.
+"""
+from functools import lru_cache
+
+from pytz import timezone as pytz_timezone
+from timezonefinder import TimezoneFinder
+
+_timezone_finder = None
+
+
+def get_timezone_finder():
+    global _timezone_finder
+    if _timezone_finder is None:
+        _timezone_finder = TimezoneFinder(in_memory=True)
+    return _timezone_finder
+
+
+def _exact_timezone_name(latitude, longitude):
+    return get_timezone_finder().timezone_at(lat=latitude, lng=longitude)
+
+
+@lru_cache(maxsize=65536)
+def timezone_name_at(latitude, longitude):
+    return _exact_timezone_name(latitude, longitude)
+
+
+@lru_cache(maxsize=None)
+def get_timezone(tz_name):
+    return pytz_timezone(tz_name)
+
+
+def cache_info():
+    return timezone_name_at.cache_info()
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolFull(Exception):
+    pass
+
+
+def _timed_call(function, *args):
+    """Выполняется в процессе пула: результат, момент начала (time.time()) и длительность работы."""
+    started_at = time.time()
+    started = time.perf_counter()
+    result = function(*args)
+    return result, started_at, time.perf_counter() - started
+
+
+def _noop():
+    pass
+
+
+class WorkerPool:
+    """
+    Пул процессов для тяжёлых синхронных расчётов, чтобы они не блокировали цикл событий бота.
+    Одновременно в пул передаётся не больше queue_depth задач, остальные ждут своей очереди.
+
+    Если задан max_waiting, ждать могут не больше max_waiting задач, следующая сразу получает WorkerPoolFull.
+    Если задан timeout, задача, не завершившаяся за timeout секунд вместе с ожиданием, получает
+    asyncio.TimeoutError; уже начатый расчёт в процессе при этом доработает до конца и до тех пор
+    занимает место в queue_depth.
+    """
+
+    def __init__(self, name, workers, queue_depth, initializer=None, initargs=(), max_waiting=None, timeout=None):
+        self.name = name
+        self.workers = workers
+        self.queue_depth = max(queue_depth, workers)
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor = None
+        self._slots = asyncio.Semaphore(self.queue_depth)
+
+        # waiting — задачи, ждущие места, in_flight — переданные в процессы и ещё не завершённые там
+        self.waiting = 0
+        self.in_flight = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._counters = dict.fromkeys(["completed", "failed", "rejected", "timed_out"], 0)
+        # последние замеры, чтобы перцентили отражали текущую нагрузку
+        self._wait_times = deque(maxlen=1000)
+        self._run_times = deque(maxlen=1000)
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self._initializer,
+                initargs=self._initargs,
+            )
+        return self._executor
+
+    async def warm_up(self):
+        """Запускает процессы пула заранее (вместе с initializer), чтобы первые задачи не ждали их старта."""
+        executor = self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, _noop) for _ in range(self.workers)))
+
+    async def run(self, function, *args):
+        if self.max_waiting is not None and self.waiting + self.in_flight >= self.queue_depth + self.max_waiting:
+            self._counters["rejected"] += 1
+            logger.warning("Пул %s переполнен: %d задач в ожидании", self.name, self.waiting)
+            raise WorkerPoolFull(self.name)
+
+        submitted_at = time.time()
+        # задача считается ждущей сразу, ещё до запуска wait_for, чтобы одновременные вызовы видели друг друга
+        waiting = True
+        self.waiting += 1
+
+        async def run_when_free():
+            nonlocal waiting
+            await self._slots.acquire()
+            waiting = False
+            self.waiting -= 1
+            return await self._run(submitted_at, function, *args)
+
+        try:
+            return await asyncio.wait_for(run_when_free(), self.timeout)
+        except asyncio.TimeoutError:
+            self._counters["timed_out"] += 1
+            logger.warning("Пул %s: задача %s не уложилась в %s с", self.name, function.__name__, self.timeout)
+            raise
+        finally:
+            if waiting:
+                self.waiting -= 1
+
+    async def _run(self, submitted_at, function, *args):
+        """Передаёт задачу в процесс; место в queue_depth уже занято."""
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.start().submit(_timed_call, function, *args)
+        except BaseException:
+            self._release()
+            raise
+        # место освобождается, когда процесс действительно закончил задачу: после таймаута _run отменён,
+        # а расчёт ещё идёт и занимает процесс
+        future.add_done_callback(lambda _: self._release_from(loop))
+        try:
+            result, started_at, run_time = await asyncio.wrap_future(future)
+        except Exception:
+            self._counters["failed"] += 1
+            raise
+
+        self._counters["completed"] += 1
+        self._wait_times.append(max(started_at - submitted_at, 0))
+        self._run_times.append(run_time)
+        return result
+
+    def _release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def _release_from(self, loop):
+        """Вызывается из потока пула процессов."""
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # цикл событий уже закрыт: освобождать некому
+            pass
+
+    def stats(self):
+        """Текущая очередь и время ожидания/работы по последним задачам, в секундах."""
+
+        def summary(samples):
+            if not samples:
+                return {"avg": 0.0, "p95": 0.0, "max": 0.0}
+            ordered = sorted(samples)
+            return {
+                "avg": sum(ordered) / len(ordered),
+                "p95": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+                "max": ordered[-1],
+            }
+
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            **self._counters,
+            "wait_time": summary(self._wait_times),
+            "run_time": summary(self._run_times),
+        }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -1,11 +1,95 @@
 import asyncio
+import logging
+import time
 
-import src.commands  # noqa: F401
-from src.dispatcher.dispatcher import bot, dp
+from aiogram.methods import GetUpdates
+
+from src.commands import register_routers
+from src.database import engine as database
+from src.dispatcher.dispatcher import bot, dp, settings
+from src.services.astrology import ephemeris_pool, render_pool
+from src.services.chart_cache import chart_cache
+from src.services.chart_writer import chart_writer
+from src.services.ephemeris_table import get_ephemeris_table
+from src.services.gazetteer import get_gazetteer
+from src.services.geocoding import close_geolocator, geocode_cache
+from src.services.interpretation_cache import interpretation_cache
+from src.services import openai
+from src.services.timezones import get_timezone_finder
+
+_background_tasks = set()
+
+
+async def _timed_warm_up(name, awaitable):
+    started = time.perf_counter()
+    try:
+        await awaitable
+    except Exception:
+        logging.exception("Прогрев: %s не удался", name)
+    else:
+        logging.info("Прогрев: %s за %.2f с", name, time.perf_counter() - started)
+
+
+async def warm_up():
+    """
+    Подсистемы, которые не нужны для приёма апдейтов, поднимаются в фоне уже после старта поллинга:
+    до завершения прогрева они инициализируются при первом обращении, как обычно.
+    Шаги идут по одному, чтобы на слабом сервере прогрев не отнимал весь процессор у обработки апдейтов.
+    """
+    await _timed_warm_up("база данных", database.connect())
+    await _timed_warm_up("клиент openai", asyncio.to_thread(openai.get_client))
+    await _timed_warm_up("часовые пояса", asyncio.to_thread(get_timezone_finder))
+    await _timed_warm_up("справочник городов", asyncio.to_thread(get_gazetteer))
+    await _timed_warm_up("кэш карт и геокодера", asyncio.gather(chart_cache.open(), geocode_cache.open()))
+    if settings.EPHEMERIS_TABLE_TOLERANCE:
+        # проверка файла в основном процессе; процессы пула отображают его сами, в init_worker
+        await _timed_warm_up("таблица эфемерид", asyncio.to_thread(get_ephemeris_table))
+    await _timed_warm_up("пул эфемерид", ephemeris_pool.warm_up())
+    await _timed_warm_up("пул отрисовки", render_pool.warm_up())
+
+
+async def log_pool_stats(interval):
+    """Состояние пулов процессов в лог раз в interval секунд, пока бот работает."""
+    while True:
+        await asyncio.sleep(interval)
+        for pool in (ephemeris_pool, render_pool):
+            logging.info("Пул %s: %s", pool.name, pool.stats())
+
+
+def _start_background(coroutine):
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _warm_up_when_polling(make_request, bot, method):
+    """Middleware сессии бота: первый getUpdates означает, что поллинг запущен, — тогда начинается прогрев."""
+    if isinstance(method, GetUpdates):
+        bot.session.middleware.unregister(_warm_up_when_polling)
+        _start_background(warm_up())
+    return await make_request(bot, method)
 
 
 async def main():
-    await dp.start_polling(bot, skip_updates=True)
+    register_routers(dp)
+    if settings.WARM_UP_ON_START:
+        bot.session.middleware(_warm_up_when_polling)
+    if settings.WORKER_STATS_INTERVAL:
+        _start_background(log_pool_stats(settings.WORKER_STATS_INTERVAL))
+    try:
+        await dp.start_polling(bot, skip_updates=True)
+    finally:
+        for task in list(_background_tasks):
+            task.cancel()
+        for pool in (ephemeris_pool, render_pool):
+            logging.info("Пул %s: %s", pool.name, pool.stats())
+            pool.shutdown()
+        logging.info("OpenAI: %s, кэш расшифровок: %s", openai.stats(), interpretation_cache.stats())
+        await openai.close_client()
+        await close_geolocator()
+        await chart_writer.close(settings.CHART_WRITER_SHUTDOWN_TIMEOUT)
+        logging.info("Запись карт: %s, пул соединений с базой: %s", chart_writer.stats(), database.pool_status())
+        await database.dispose()
 
 
 def run_bot():
@@ -13,4 +97,4 @@ def run_bot():
 
 
 if __name__ == "__main__":
-    run_bot()
\ No newline at end of file
+    run_bot()
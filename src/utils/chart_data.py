@@ -1,27 +1,39 @@
+from dataclasses import dataclass
 from datetime import datetime
-from timezonefinder import TimezoneFinder
-from pytz import timezone, utc
-from geopy.geocoders import Nominatim
+from pytz import utc
 import swisseph as swe
+from src.services.timezones import get_timezone
 
 
-async def get_basic_astro_data(birth_date, birth_time, location):
-    swe.set_ephe_path('.')
-    swe.set_sid_mode(swe.SIDM_LAHIRI)
+@dataclass(frozen=True)
+class ChartContext:
+    julian_day: float
+    latitude: float
+    longitude: float
+    utc_datetime: datetime
+    birth_datetime: datetime
 
-    geolocator = Nominatim(user_agent="astro_bot")
-    loc = geolocator.geocode(location)
-    if not loc:
-        raise ValueError(f"Локация '{location}' не найдена.")
-    latitude, longitude = loc.latitude, loc.longitude
 
-    print(f"Координаты для '{location}': Широта: {latitude}, Долгота: {longitude}")
+# асцендент из swe.houses (тропический) переводится в сидерический фиксированной аянамшей, как и раньше
+ASCENDANT_AYANAMSA = 23.88
 
-    tf = TimezoneFinder()
-    tz_name = tf.timezone_at(lat=latitude, lng=longitude)
-    if not tz_name:
-        raise ValueError(f"Не удалось определить часовой пояс для локации '{location}'.")
-    local_tz = timezone(tz_name)
+_ephemeris_ready = False
+
+
+def setup_ephemeris():
+    global _ephemeris_ready
+    if not _ephemeris_ready:
+        swe.set_ephe_path('.')
+        swe.set_sid_mode(swe.SIDM_LAHIRI)
+        _ephemeris_ready = True
+
+
+def build_chart_context(birth_date, birth_time, location):
+    """Всё, что нужно для расчёта карты, считается здесь один раз и дальше передаётся во все расчёты."""
+    setup_ephemeris()
+
+    latitude, longitude = location.latitude, location.longitude
+    local_tz = get_timezone(location.tz_name)
 
     birth_datetime = datetime.strptime(f"{birth_date} {birth_time}", "%d-%m-%Y %H:%M:%S")
     local_datetime = local_tz.localize(birth_datetime)
@@ -32,15 +44,13 @@ async def get_basic_astro_data(birth_date, birth_time, location):
         utc_datetime.hour + utc_datetime.minute / 60 + utc_datetime.second / 3600
     )
 
-    elevation = 0
-    swe.set_topo(longitude, latitude, elevation)
-
-    return {
-        "latitude": latitude,
-        "longitude": longitude,
-        "julian_day": julian_day,
-        "utc_datetime": utc_datetime
-    }
+    return ChartContext(
+        julian_day=julian_day,
+        latitude=latitude,
+        longitude=longitude,
+        utc_datetime=utc_datetime,
+        birth_datetime=birth_datetime,
+    )
 
 
 def calculate_zodiac_position(longitude):
@@ -350,41 +360,6 @@ zodiac_symbols_to_names = {
     "♐": "Стрелец", "♑": "Козерог", "♒": "Водолей", "♓": "Рыбы"
 }
 
-nakshatra_planets = {
-    "Ашвини": "Кету",
-    "Бхарани": "Венера",
-    "Криттика": "Солнце",
-    "Рохини": "Луна",
-    "Мригашира": "Марс",
-    "Ардра": "Раху",
-    "Пунарвасу": "Юпитер",
-    "Пушья": "Сатурн",
-    "Ашлеша": "Меркурий",
-    "Магха": "Кету",
-    "Пурва-пхалгуни": "Венера",
-    "Уттара-пхалгуни": "Солнце",
-    "Хаста": "Луна",
-    "Читра": "Марс",
-    "Свати": "Раху",
-    "Вишакха": "Юпитер",
-    "Анурадха": "Сатурн",
-    "Джиештха": "Меркурий",
-    "Мула": "Кету",
-    "Пурва-ашадха": "Венера",
-    "Уттара-ашадха": "Солнце",
-    "Шравана": "Луна",
-    "Дхаништха": "Марс",
-    "Шатабхиша": "Раху",
-    "Пурва-бхадрапада": "Юпитер",
-    "Уттара-бхадрапада": "Сатурн",
-    "Ревати": "Меркурий"
-}
-
-
-def get_starting_planet(moon_nakshatra):
-    return nakshatra_planets.get(moon_nakshatra, "Неизвестно")
-
-
 planet_periods = {
     "Кету": 7,
     "Венера": 20,
@@ -400,7 +375,7 @@ planet_periods = {
 dasha_order = ["Кету", "Венера", "Солнце", "Луна", "Марс", "Раху", "Юпитер", "Сатурн", "Меркурий"]
 
 
-def calculate_remaining_time(moon_degree, starting_planet, nakshatra_length=13.3333):
+def calculate_remaining_time(moon_degree, starting_planet, nakshatra_length=360 / 27):
     period_length = planet_periods[starting_planet]
     percent_passed = (moon_degree / nakshatra_length) * 100
     years_passed = period_length * (percent_passed / 100)
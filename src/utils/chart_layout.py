@@ -0,0 +1,151 @@
+"""
+Раскладка подписей North Indian карты по заранее рассчитанным слотам.
+
+При импорте для каждого дома из polygons строятся слоты — непересекающиеся прямоугольники под подпись,
+целиком лежащие внутри дома и не задевающие номер знака. Слоты упорядочены от центра дома к краям,
+отдельный набор строится для каждой ступени размера шрифта. Размещение карты — это выбор ступени шрифта
+по числу подписей в доме и раздача слотов по порядку, без перебора и проверок на пересечение.
+Координаты округлены, поэтому для одних и тех же входных данных раскладка совпадает байт в байт.
+
+Дома в polygons заданы в координатах «сверху вниз» (y растёт вниз); в оси matplotlib они переводятся
+как y = CHART_SIZE - y.
+"""
+from src.utils.chart_data import clean_planet_symbol, polygons, zodiac_coords, zodiac_signs_list
+
+CHART_SIZE = 420
+# поле вокруг квадрата в единицах осей
+CHART_MARGIN = 6
+FIGURE_INCHES = 7
+DPI = 100
+# единиц осей на один пункт шрифта
+UNITS_PER_POINT = (CHART_SIZE + 2 * CHART_MARGIN) / (FIGURE_INCHES * 72)
+
+# ступени (шрифт планет, шрифт аспектов): следующая берётся, если подписи дома не помещаются в слоты
+FONT_STEPS = [(14, 11), (12, 10), (10, 8)]
+SIGN_FONT_SIZE = 12
+# ширина слота в символах самой длинной подписи, например "(Ra)↓", и средняя ширина символа в кеглях
+SLOT_CHARS = 5
+CHAR_WIDTH = 0.6
+LINE_HEIGHT = 1.2
+# отступ подписи от линий дома
+EDGE_PADDING = 2
+
+# аспекты: смещения домов относительно дома планеты
+ASPECTS = {
+    "Su": [6], "Mo": [6], "Ve": [6], "Me": [6],
+    "Jp": [4, 6, 8], "Sa": [2, 6, 9], "Ma": [3, 6, 7], "Ra": [4, 6, 8],
+}
+
+HOUSE_POLYGONS = list(polygons.values())
+
+
+def _label_box(x, y, font_size, chars):
+    half_width = chars * CHAR_WIDTH * font_size * UNITS_PER_POINT / 2
+    half_height = LINE_HEIGHT * font_size * UNITS_PER_POINT / 2
+    return x - half_width, y - half_height, x + half_width, y + half_height
+
+
+def _boxes_overlap(first, second):
+    return first[0] < second[2] and second[0] < first[2] and first[1] < second[3] and second[1] < first[3]
+
+
+def _row_extent(polygon, y):
+    """Отрезок [левый x, правый x] пересечения выпуклого многоугольника с горизонталью y."""
+    xs = []
+    for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]):
+        if min(y1, y2) <= y <= max(y1, y2):
+            if y1 == y2:
+                xs.extend((x1, x2))
+            else:
+                xs.append(x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+    return (min(xs), max(xs)) if xs else None
+
+
+def _sign_position(house_index):
+    """Центр номера знака в доме, в координатах «сверху вниз»."""
+    return zodiac_coords[house_index]["x"] + 15, CHART_SIZE - (zodiac_coords[house_index]["y"] - 7)
+
+
+def _house_slots(house_index, font_size):
+    polygon = HOUSE_POLYGONS[house_index]
+    _, _, slot_width, slot_height = _label_box(0, 0, font_size, SLOT_CHARS)
+    slot_width, slot_height = 2 * slot_width, 2 * slot_height
+    sign_box = _label_box(*_sign_position(house_index), SIGN_FONT_SIZE, 2)
+
+    top = min(y for _, y in polygon) + EDGE_PADDING
+    bottom = max(y for _, y in polygon) - EDGE_PADDING
+    rows = int((bottom - top) // slot_height)
+    row_offset = top + (bottom - top - rows * slot_height) / 2
+
+    slots = []
+    for row in range(rows):
+        row_top = row_offset + row * slot_height
+        row_bottom = row_top + slot_height
+        extents = [_row_extent(polygon, row_top), _row_extent(polygon, row_bottom)]
+        if None in extents:
+            continue
+        # у выпуклого многоугольника прямоугольник внутри, если внутри все его углы
+        left = max(extents[0][0], extents[1][0]) + EDGE_PADDING
+        right = min(extents[0][1], extents[1][1]) - EDGE_PADDING
+        columns = int((right - left) // slot_width) if right > left else 0
+        column_offset = left + (right - left - columns * slot_width) / 2
+        for column in range(columns):
+            x = column_offset + (column + 0.5) * slot_width
+            y = row_top + slot_height / 2
+            box = (x - slot_width / 2, row_top, x + slot_width / 2, row_bottom)
+            if not _boxes_overlap(box, sign_box):
+                slots.append((round(x, 2), round(y, 2)))
+
+    center_x = sum(x for x, _ in polygon) / len(polygon)
+    center_y = sum(y for _, y in polygon) / len(polygon)
+    slots.sort(key=lambda slot: ((slot[0] - center_x) ** 2 + (slot[1] - center_y) ** 2, slot[1], slot[0]))
+    return slots
+
+
+# HOUSE_SLOTS[дом][ступень шрифта] — слоты в координатах «сверху вниз»
+HOUSE_SLOTS = [
+    [_house_slots(house_index, planet_font) for planet_font, _ in FONT_STEPS]
+    for house_index in range(len(HOUSE_POLYGONS))
+]
+
+
+def _house_of(longitude, ascendant_index):
+    return (int(longitude // 30) - ascendant_index) % 12
+
+
+def layout_chart(ascendant_sign, planet_positions):
+    """
+    Подписи карты для chart_render: [(x, y, текст, стиль, размер шрифта), ...] в координатах осей
+    и список «планета, дом». В каждом доме сначала размещаются планеты, затем аспекты, в порядке planet_positions.
+    """
+    ascendant_index = zodiac_signs_list.index(ascendant_sign)
+    house_labels = [[] for _ in range(12)]
+    planet_house_info = []
+
+    for planet, longitude in planet_positions:
+        house_index = _house_of(longitude, ascendant_index)
+        house_labels[house_index].append((planet, "planet"))
+        planet_house_info.append(f"{planet}, Дом: {house_index + 1}")
+
+    for planet, longitude in planet_positions:
+        house_index = _house_of(longitude, ascendant_index)
+        cleaned_planet = clean_planet_symbol(planet)
+        for offset in ASPECTS.get(cleaned_planet, []):
+            house_labels[(house_index + offset) % 12].append((cleaned_planet, "aspect"))
+
+    labels = []
+    for house_index in range(12):
+        sign_x, sign_y = _sign_position(house_index)
+        sign = zodiac_signs_list[(ascendant_index + house_index) % 12]
+        labels.append((sign_x, CHART_SIZE - sign_y, sign, "sign", SIGN_FONT_SIZE))
+
+        step = next(
+            (step for step, slots in enumerate(HOUSE_SLOTS[house_index]) if len(slots) >= len(house_labels[house_index])),
+            len(FONT_STEPS) - 1,
+        )
+        slots = HOUSE_SLOTS[house_index][step]
+        planet_font, aspect_font = FONT_STEPS[step]
+        for (text, style), (x, y) in zip(house_labels[house_index], slots):
+            labels.append((x, CHART_SIZE - y, text, style, planet_font if style == "planet" else aspect_font))
+
+    return labels, planet_house_info
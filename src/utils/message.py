@@ -1,4 +1,8 @@
+import asyncio
+import time
+
 from aiogram import types
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 
 
 async def send_long_message(message: types.Message, text: str, max_length: int = 4096):
@@ -22,3 +26,81 @@ async def send_long_message(message: types.Message, text: str, max_length: int =
 
     for part in parts:
         await message.answer(part)
+
+
+def _split_point(text: str, max_length: int) -> int:
+    """
+    Где разрезать text длиннее max_length: по последнему переводу строки, иначе по пробелу, иначе ровно по границе.
+    Разделитель в первой половине не подходит — сообщение вышло бы слишком коротким.
+    """
+    for separator in ("\n", " "):
+        position = text.rfind(separator, max_length // 2, max_length + 1)
+        if position > 0:
+            return position
+    return max_length
+
+
+async def stream_long_message(message: types.Message, chunks, prefix: str = "", placeholder: types.Message = None,
+                              max_length: int = 4096, interval: float = 1.0) -> str:
+    """
+    Показывает текст из асинхронного итератора chunks по мере поступления.
+
+    Первый фрагмент заменяет текст placeholder (или уходит новым сообщением), дальше сообщение
+    редактируется не чаще раза в interval секунд. Когда текст не помещается в max_length, сообщение
+    закрывается на границе строки и продолжается новым. Возвращает весь полученный текст без prefix;
+    если chunks оборвался исключением, показанное остаётся, а исключение пробрасывается.
+    Если текста не пришло совсем (пустой поток или ошибка до первого фрагмента), placeholder удаляется:
+    о неудаче сообщает вызывающий.
+    """
+    received = []
+    current = prefix
+    sent, shown = placeholder, None
+    last_update = 0.0
+
+    async def update(text, wait):
+        """
+        Новое сообщение или правка текущего; при флуд-контроле ждёт, если wait, иначе правку догонит следующая.
+        Если править нечего (текст не изменился) — ничего не делает; если сообщение удалено или его уже нельзя
+        править — продолжает новым сообщением.
+        """
+        nonlocal sent, shown, last_update
+        last_update = time.monotonic()
+        while text.strip() and text != shown:
+            try:
+                if sent is None:
+                    sent = await message.answer(text)
+                else:
+                    await sent.edit_text(text)
+                shown = text
+            except TelegramRetryAfter as e:
+                if not wait:
+                    return
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                if sent is None:
+                    raise
+                if "message is not modified" in e.message:
+                    shown = text
+                else:
+                    sent = None
+
+    try:
+        async for chunk in chunks:
+            received.append(chunk)
+            current += chunk
+            while len(current) > max_length:
+                split = _split_point(current, max_length)
+                await update(current[:split].rstrip(), wait=True)
+                sent, shown = None, None
+                current = current[split:].lstrip()
+            if time.monotonic() - last_update >= interval:
+                await update(current, wait=False)
+    finally:
+        if received:
+            await update(current, wait=True)
+        elif placeholder is not None:
+            try:
+                await placeholder.delete()
+            except TelegramBadRequest:
+                pass
+    return "".join(received)
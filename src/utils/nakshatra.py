@@ -0,0 +1,54 @@
+"""
+Накшатра, пада, управитель и градус внутри накшатры по абсолютной сидерической долготе.
+
+Накшатры делят эклиптику на 27 равных частей по 13°20', пады — на 108 частей по 3°20',
+поэтому всё вычисляется арифметически, без перебора таблиц. Сверка с таблицей
+chart_data.NAKSHATRAS — tests/test_nakshatra.py.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.utils.chart_data import dasha_order
+
+NAKSHATRA_SPAN = 360 / 27
+PADA_SPAN = 360 / 108
+
+NAKSHATRA_NAMES = [
+    "Ашвини", "Бхарани", "Криттика", "Рохини", "Мригашира", "Ардра", "Пунарвасу", "Пушья", "Ашлеша",
+    "Магха", "Пурва-Пхалгуни", "Уттара-Пхалгуни", "Хаста", "Читра", "Свати", "Вишакха", "Анурадха", "Джиештха",
+    "Мула", "Пурва-Ашадха", "Уттара-Ашадха", "Шравана", "Дхаништха", "Шатабхиша", "Пурва-Бхадрапада",
+    "Уттара-Бхадрапада", "Ревати",
+]
+# управители идут в порядке Вимшоттари-даши, начиная с Кету для Ашвини
+NAKSHATRA_LORDS = [dasha_order[index % len(dasha_order)] for index in range(27)]
+
+
+@dataclass(frozen=True)
+class NakshatraPosition:
+    index: int
+    name: str
+    pada: int
+    lord: str
+    degree: float
+
+
+def resolve_nakshatra(longitude):
+    longitude = longitude % 360
+    index = min(int(longitude * 27 // 360), 26)
+    pada = min(int(longitude * 108 // 360), 107) % 4 + 1
+    return NakshatraPosition(
+        index=index,
+        name=NAKSHATRA_NAMES[index],
+        pada=pada,
+        lord=NAKSHATRA_LORDS[index],
+        degree=longitude - index * NAKSHATRA_SPAN,
+    )
+
+
+def resolve_nakshatras(longitudes):
+    """Векторный вариант resolve_nakshatra: массивы индексов накшатр, пад и градусов внутри накшатры."""
+    longitudes = np.asarray(longitudes, dtype=float) % 360
+    indices = np.minimum((longitudes * 27 // 360).astype(np.int64), 26)
+    padas = np.minimum((longitudes * 108 // 360).astype(np.int64), 107) % 4 + 1
+    return indices, padas, longitudes - indices * NAKSHATRA_SPAN
@@ -0,0 +1,47 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Схлопывание одновременных одинаковых запросов: первый вызов по ключу выполняет корутину, остальные ждут
+    его результата или ошибки. Если первый вызов отменён, ожидающие не зависают: один из них выполняет
+    корутину заново.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.leaders = 0
+        self.joined = 0
+
+    async def run(self, key, call):
+        """Результат call() — корутины без аргументов; одновременные вызовы с тем же key получают его же."""
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.joined += 1
+        while flight is not None:
+            outcome = await asyncio.shield(flight)
+            if outcome is not None:
+                value, error = outcome
+                if error is not None:
+                    raise error
+                return value
+            flight = self._in_flight.get(key)
+        return await self._lead(key, call)
+
+    async def _lead(self, key, call):
+        self.leaders += 1
+        flight = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = flight
+        # ожидающим передаётся (значение, ошибка), а не исключение в future: его некому забрать, если
+        # никто не ждал. None — вызов прерван отменой (BaseException), ожидающие повторяют его сами
+        outcome = None
+        try:
+            value = await call()
+            outcome = (value, None)
+            return value
+        except Exception as e:
+            outcome = (None, e)
+            raise
+        finally:
+            del self._in_flight[key]
+            flight.set_result(outcome)
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+MISSING = object()
+
+EVICTION_CHECK_INTERVAL = 100
+
+# запросы всех кэшей идут в одном отдельном потоке: цикл событий не ждёт диска,
+# а соединение никогда не используется из двух потоков сразу
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+
+
+class SqliteCache:
+    """
+    Персистентный кэш «ключ -> JSON» в локальном SQLite с TTL и вытеснением давно не читанных записей (LRU).
+    Несколько кэшей могут жить в одном файле, разделяясь по namespace.
+    Методы — корутины: файл открывается при первом обращении, все запросы выполняются вне цикла событий.
+    """
+
+    def __init__(self, path, namespace, ttl=None, max_entries=None):
+        self.path = Path(path)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes_since_eviction = 0
+        self._connection = None
+
+    async def _call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(_executor, function, *args)
+
+    async def open(self):
+        await self._call(self._connect)
+
+    async def get(self, key):
+        return await self._call(self._get, key)
+
+    async def set(self, key, value, ttl=MISSING):
+        await self._call(self._set, key, value, ttl)
+
+    async def delete(self, key):
+        await self._call(self._delete, key)
+
+    async def evict(self):
+        await self._call(self._evict)
+
+    async def count(self):
+        return await self._call(self._count)
+
+    def _connect(self):
+        if self._connection is not None:
+            return self._connection
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+        return self._connection
+
+    def _get(self, key):
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return MISSING
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self._connection.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+            return MISSING
+
+        self._connection.execute(
+            "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key)
+        )
+        return json.loads(value)
+
+    def _set(self, key, value, ttl=MISSING):
+        now = time.time()
+        ttl = self.ttl if ttl is MISSING else ttl
+        expires_at = now + ttl if ttl is not None else None
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at, now),
+        )
+
+        self._writes_since_eviction += 1
+        if self._writes_since_eviction >= EVICTION_CHECK_INTERVAL:
+            self._evict()
+
+    def _delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def _evict(self):
+        self._writes_since_eviction = 0
+        self._connect().execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.namespace, time.time()),
+        )
+        if self.max_entries is None:
+            return
+
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if count > self.max_entries:
+            self._connection.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, self.namespace, count - self.max_entries),
+            )
+
+    def _count(self):
+        (count,) = self._connect().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        return count
@@ -0,0 +1,6 @@
+import os
+
+# модули сервисов читают настройки бота при импорте; для тестов достаточно заглушек и базы в памяти
+os.environ.setdefault("API_TOKEN", "1:test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
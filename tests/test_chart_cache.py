@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+from src.services.chart_cache import ChartCache
+from src.utils import sqlite_cache
+
+
+def chart_cache(tmp_path):
+    return ChartCache(tmp_path / "cache" / "cache.sqlite3", tmp_path / "charts", file_id_ttl=60, max_file_ids=100,
+                      max_image_bytes=1024)
+
+
+def test_nothing_is_created_before_first_use(tmp_path):
+    chart_cache(tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_file_ids_and_images_round_trip(tmp_path):
+    async def scenario():
+        cache = chart_cache(tmp_path)
+        assert await cache.file_id("chart") is None
+        await cache.remember_file_id("chart", "file-1")
+        file_id = await cache.file_id("chart")
+        await cache.forget_file_id("chart")
+
+        async def render():
+            return b"image"
+
+        images = [await cache.get_or_render("chart", render) for _ in range(2)]
+        return file_id, await cache.file_id("chart"), images, await cache.stats()
+
+    file_id, forgotten, images, stats = asyncio.run(scenario())
+    assert (file_id, forgotten) == ("file-1", None)
+    assert images == [b"image", b"image"]
+    assert (stats["file_id_hits"], stats["image_hits"], stats["misses"], stats["file_ids"]) == (1, 1, 1, 0)
+
+
+def test_sqlite_runs_off_the_event_loop_thread(tmp_path, monkeypatch):
+    threads = set()
+    connect = sqlite_cache.sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        threads.add(threading.get_ident())
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(sqlite_cache.sqlite3, "connect", tracking_connect)
+    asyncio.run(chart_cache(tmp_path).remember_file_id("chart", "file-1"))
+    assert threads and threading.get_ident() not in threads
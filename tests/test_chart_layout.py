@@ -0,0 +1,76 @@
+"""
+Снимок раскладки layout_chart для нескольких известных карт: раскладка детерминирована, и от неё зависит
+отпечаток карты в кэше изображений (chart_cache.chart_fingerprint), поэтому любое изменение должно быть
+осознанным. После намеренного изменения раскладки снимок обновляется так:
+
+    UPDATE_SNAPSHOTS=1 python -m pytest tests/test_chart_layout.py
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from src.utils.chart_layout import FONT_STEPS, HOUSE_SLOTS, layout_chart
+
+SNAPSHOT_PATH = Path(__file__).parent / "snapshots" / "layout_chart.json"
+
+CHARTS = {
+    # планеты по разным домам, с отметками ретроградности и достоинства
+    "spread": ("1", [("Su", 12.5), ("Mo↑", 40.2), ("(Ma)", 95.0), ("Ve", 130.7), ("Me↓", 160.1),
+                     ("(Jp)", 200.3), ("Sa͟", 250.9), ("(Ra)", 300.4), ("(Ke)", 120.4)]),
+    # семь планет и аспект Раху в одном доме
+    "stellium": ("5", [("Su", 121.0), ("Mo", 123.0), ("Ma", 125.0), ("Ve", 127.0), ("Me↑", 129.0),
+                       ("(Jp)", 131.0), ("Sa", 133.0), ("(Ra)", 10.0), ("(Ke)", 190.0)]),
+    # девять грах помещаются в дом при крупнейшем шрифте; мелкие ступени нужны, только если подписей
+    # больше — здесь к ним добавлены дополнительные точки без аспектов
+    "crowded": ("1", [(symbol, 65.0 + number) for number, symbol in enumerate(
+        ["Su", "Mo", "Ma", "Ve", "Me", "Jp", "Sa", "(Ra)", "(Ke)", "Ur", "Ne", "Pl", "Ch", "Li", "Ju"]
+    )]),
+}
+
+
+def current_layouts():
+    # через JSON, чтобы кортежи и списки сравнивались одинаково
+    return json.loads(json.dumps({name: layout_chart(*chart) for name, chart in CHARTS.items()}, ensure_ascii=False))
+
+
+def snapshot_text(layouts):
+    """JSON по подписи в строке, чтобы изменения снимка было удобно смотреть в диффе."""
+    charts = []
+    for name, (labels, house_info) in layouts.items():
+        rows = ",\n".join(f"   {json.dumps(label, ensure_ascii=False)}" for label in labels)
+        charts.append(f' {json.dumps(name)}: [\n  [\n{rows}\n  ],\n  {json.dumps(house_info, ensure_ascii=False)}\n ]')
+    return "{\n" + ",\n".join(charts) + "\n}\n"
+
+
+def test_layouts_match_snapshot():
+    layouts = current_layouts()
+    if os.environ.get("UPDATE_SNAPSHOTS"):
+        SNAPSHOT_PATH.write_text(snapshot_text(layouts))
+    assert layouts == json.loads(SNAPSHOT_PATH.read_text())
+
+
+@pytest.mark.parametrize("name", list(CHARTS))
+def test_layout_is_deterministic(name):
+    assert layout_chart(*CHARTS[name]) == layout_chart(*CHARTS[name])
+
+
+def test_crowded_house_uses_the_smallest_font_step():
+    labels, house_info = layout_chart(*CHARTS["crowded"])
+    # 65°-79° при асценденте в первом знаке — третий дом, самый маленький
+    assert all(line.endswith("Дом: 3") for line in house_info)
+    assert len(HOUSE_SLOTS[2][1]) < len(house_info) <= len(HOUSE_SLOTS[2][-1])
+
+    smallest_planet_font, _ = FONT_STEPS[-1]
+    planets = [label for label in labels if label[3] == "planet"]
+    assert len(planets) == len(house_info)
+    assert {label[4] for label in planets} == {smallest_planet_font}
+    assert len({(x, y) for x, y, *_ in planets}) == len(planets)
+
+
+def test_stellium_fits_the_largest_font_step():
+    labels, _ = layout_chart(*CHARTS["stellium"])
+    planet_font, aspect_font = FONT_STEPS[0]
+    assert {label[4] for label in labels if label[3] == "planet"} == {planet_font}
+    assert {label[4] for label in labels if label[3] == "aspect"} == {aspect_font}
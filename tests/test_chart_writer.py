@@ -0,0 +1,59 @@
+import asyncio
+
+from src.services.chart_writer import ChartWriter
+
+
+def writer(write, batch_size=2):
+    return ChartWriter("test", write, max_queue=100, batch_size=batch_size, flush_interval=0.01, max_retries=0)
+
+
+def test_close_writes_everything_queued():
+    async def scenario():
+        written = []
+
+        async def write(session, batch):
+            written.extend(batch)
+
+        chart_writer = writer(write)
+        for row in range(5):
+            chart_writer.submit(row)
+        await chart_writer.close(timeout=5)
+        return written, chart_writer.stats()
+
+    written, stats = asyncio.run(scenario())
+    assert written == [0, 1, 2, 3, 4]
+    assert (stats["written"], stats["failed"], stats["queued"]) == (5, 0, 0)
+
+
+def test_rows_pending_at_timeout_are_counted_as_failed():
+    async def scenario():
+        async def write(session, batch):
+            await asyncio.sleep(10)
+
+        chart_writer = writer(write)
+        for row in range(5):
+            chart_writer.submit(row)
+        await asyncio.sleep(0.05)
+        await chart_writer.close(timeout=0.2)
+        return chart_writer.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["written"], stats["failed"], stats["queued"]) == (0, 5, 0)
+
+
+def test_submit_after_close_is_rejected():
+    async def scenario():
+        async def write(session, batch):
+            pass
+
+        chart_writer = writer(write)
+        chart_writer.submit(1)
+        await chart_writer.close(timeout=5)
+        accepted = chart_writer.submit(2)
+        await asyncio.sleep(0.05)
+        return accepted, chart_writer
+
+    accepted, chart_writer = asyncio.run(scenario())
+    assert accepted is False
+    assert chart_writer._task is None
+    assert (chart_writer.stats()["written"], chart_writer.stats()["dropped"]) == (1, 1)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import swisseph as swe
+
+from src.services import ephemeris, ephemeris_table
+from src.services.ephemeris_table import EphemerisTable, build_table
+
+START_JD = swe.julday(1990, 1, 1, 0.0)
+LATITUDE, LONGITUDE = 55.75, 37.62
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    path = tmp_path / "ephemeris_table.bin"
+    build_table(path, START_JD, START_JD + 40)
+    table = EphemerisTable(path)
+    monkeypatch.setattr(ephemeris_table, "get_ephemeris_table", lambda: table)
+    monkeypatch.setattr(ephemeris, "_table", None)
+    monkeypatch.setattr(ephemeris, "_table_tolerance", 0.0)
+    return table
+
+
+def live_planets(julian_day):
+    ephemeris.init_worker()
+    return ephemeris.compute_planets(julian_day, LATITUDE, LONGITUDE)
+
+
+def test_worker_interpolates_inside_the_table(table):
+    julian_day = START_JD + 17.3
+    live = live_planets(julian_day)
+    ephemeris.init_worker(table_tolerance=2)
+    interpolated = ephemeris.compute_planets(julian_day, LATITUDE, LONGITUDE)
+
+    assert [symbol for symbol, _, _ in interpolated] == [symbol for symbol, _, _ in live]
+    assert interpolated != live
+    for (symbol, longitude, _), (_, live_longitude, _) in zip(interpolated, live):
+        assert abs((longitude - live_longitude + 180) % 360 - 180) < 2 / 3600, symbol
+
+
+def test_worker_falls_back_outside_the_table(table):
+    julian_day = START_JD - 100.5
+    live = live_planets(julian_day)
+    ephemeris.init_worker(table_tolerance=2)
+    assert ephemeris.compute_planets(julian_day, LATITUDE, LONGITUDE) == live
+
+
+def test_batch_matches_single_chart_with_the_table(table):
+    ephemeris.init_worker(table_tolerance=2)
+    julian_days = np.array([START_JD - 3.25, START_JD + 0.5, START_JD + 21.7, START_JD + 45])
+    latitudes = np.full(len(julian_days), LATITUDE)
+    longitudes = np.full(len(julian_days), LONGITUDE)
+
+    batch = ephemeris.compute_batch(julian_days, latitudes, longitudes)
+    for row, julian_day in enumerate(julian_days):
+        single = ephemeris.compute_planets(julian_day, LATITUDE, LONGITUDE)
+        for column, (symbol, longitude, speed) in enumerate(single):
+            if symbol != "Ke":
+                assert batch["longitudes"][row, column] == longitude, (row, symbol)
+            assert batch["speeds"][row, column] == speed, (row, symbol)
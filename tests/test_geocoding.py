@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import geocoding
+from src.services.gazetteer import Gazetteer, build_gazetteer
+
+# строки выгрузки GeoNames: id, название, ascii, альтернативные, широта, долгота, ..., страна (8), регион (10),
+# население (14), часовой пояс (17)
+CITIES = [
+    (1, "Novosibirsk", 55.0415, 82.9346, 1_612_833, "Asia/Novosibirsk"),
+    (2, "Novokuznetsk", 53.7557, 87.1099, 547_904, "Asia/Novokuznetsk"),
+]
+
+
+def geonames_row(geoname_id, name, latitude, longitude, population, timezone):
+    row = [""] * 19
+    row[:6] = [str(geoname_id), name, name, "", str(latitude), str(longitude)]
+    row[8], row[10], row[14], row[17] = "RU", "00", str(population), timezone
+    return "\t".join(row)
+
+
+class FakeNominatim:
+    def __init__(self, *locations):
+        self.locations = [SimpleNamespace(address=address, latitude=latitude, longitude=longitude)
+                          for address, latitude, longitude in locations]
+        self.queries = []
+
+    async def geocode(self, query, **kwargs):
+        self.queries.append(query)
+        return self.locations
+
+
+@pytest.fixture
+def gazetteer(tmp_path, monkeypatch):
+    cities_path = tmp_path / "cities.txt"
+    cities_path.write_text("\n".join(geonames_row(*city) for city in CITIES) + "\n", encoding="utf-8")
+    build_gazetteer(cities_path, tmp_path / "gazetteer.bin")
+    gazetteer = Gazetteer(tmp_path / "gazetteer.bin")
+    monkeypatch.setattr(geocoding, "get_gazetteer", lambda: gazetteer)
+    monkeypatch.setattr(geocoding, "geocode_cache", geocoding.GeocodeCache(
+        tmp_path / "cache.sqlite3", ttl=60, negative_ttl=60, max_entries=100))
+    yield gazetteer
+    gazetteer.close()
+
+
+def use_nominatim(monkeypatch, *locations):
+    nominatim = FakeNominatim(*locations)
+    monkeypatch.setattr(geocoding, "get_geolocator", lambda: nominatim)
+    return nominatim
+
+
+def test_exact_match_stays_offline(gazetteer, monkeypatch):
+    nominatim = use_nominatim(monkeypatch)
+    cities = asyncio.run(geocoding.search_cities("Novokuznetsk"))
+    assert [city.name for city in cities] == ["Novokuznetsk"]
+    assert nominatim.queries == []
+
+
+def test_prefix_only_hit_asks_nominatim(gazetteer, monkeypatch):
+    # посёлка Novo нет в справочнике, но его название — префикс двух городов оттуда
+    nominatim = use_nominatim(monkeypatch, ("Novo, Kuvshinovsky District, Tver Oblast, Russia", 57.03, 34.17))
+    cities = asyncio.run(geocoding.search_cities("Novo"))
+    assert nominatim.queries == ["Novo"]
+    assert [city.name for city in cities] == ["Novo", "Novosibirsk", "Novokuznetsk"]
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+
+from src.utils.message import stream_long_message
+
+
+class StreamFailed(Exception):
+    pass
+
+
+class FakeMessage:
+    """Сообщение чата: правки, которые Telegram отклоняет с error, не применяются."""
+
+    def __init__(self, chat, text, error=None):
+        self.chat, self.text, self.error = chat, text, error
+
+    async def edit_text(self, text):
+        if self.error:
+            raise TelegramBadRequest(EditMessageText(text=text), self.error)
+        self.text = text
+
+
+class FakeChat:
+    def __init__(self):
+        self.messages = []
+
+    async def answer(self, text):
+        sent = FakeMessage(self, text)
+        self.messages.append(sent)
+        return sent
+
+
+async def failing_stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+    raise StreamFailed
+
+
+@pytest.mark.parametrize("error", [
+    "Bad Request: message is not modified: specified new message content and reply markup are exactly the same",
+    "Bad Request: message to edit not found",
+])
+def test_stream_error_is_not_replaced_by_telegram_error(error):
+    async def scenario():
+        chat = FakeChat()
+        placeholder = await chat.answer("...")
+        placeholder.error = error
+        with pytest.raises(StreamFailed):
+            await stream_long_message(chat, failing_stream("начало"), placeholder=placeholder, interval=0)
+        return chat
+
+    chat = asyncio.run(scenario())
+    if "not found" in error:
+        # удалённое сообщение продолжается новым
+        assert [sent.text for sent in chat.messages[1:]] == ["начало"]
+    else:
+        assert len(chat.messages) == 1
+
+
+def test_deleted_message_is_continued_in_a_new_one():
+    async def scenario():
+        chat = FakeChat()
+        placeholder = await chat.answer("...")
+
+        async def chunks():
+            yield "первая часть"
+            placeholder.error = "Bad Request: message to edit not found"
+            yield ", вторая часть"
+
+        text = await stream_long_message(chat, chunks(), placeholder=placeholder, interval=0)
+        return text, chat
+
+    text, chat = asyncio.run(scenario())
+    assert text == "первая часть, вторая часть"
+    assert chat.messages[-1].text == "первая часть, вторая часть"
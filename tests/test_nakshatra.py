@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from src.utils.chart_data import NAKSHATRAS
+from src.utils.nakshatra import NAKSHATRA_LORDS, NAKSHATRA_NAMES, NAKSHATRA_SPAN, PADA_SPAN, resolve_nakshatra, \
+    resolve_nakshatras
+
+SIGNS = list(NAKSHATRAS)
+
+# прежний словарь управителей: Пурва- и Уттара- в нём написаны со строчной, поэтому поиск по названию
+# из NAKSHATRA_NAMES возвращал «Неизвестно»
+LEGACY_LORDS = {
+    "Ашвини": "Кету", "Бхарани": "Венера", "Криттика": "Солнце", "Рохини": "Луна", "Мригашира": "Марс",
+    "Ардра": "Раху", "Пунарвасу": "Юпитер", "Пушья": "Сатурн", "Ашлеша": "Меркурий", "Магха": "Кету",
+    "Пурва-пхалгуни": "Венера", "Уттара-пхалгуни": "Солнце", "Хаста": "Луна", "Читра": "Марс", "Свати": "Раху",
+    "Вишакха": "Юпитер", "Анурадха": "Сатурн", "Джиештха": "Меркурий", "Мула": "Кету", "Пурва-ашадха": "Венера",
+    "Уттара-ашадха": "Солнце", "Шравана": "Луна", "Дхаништха": "Марс", "Шатабхиша": "Раху",
+    "Пурва-бхадрапада": "Юпитер", "Уттара-бхадрапада": "Сатурн", "Ревати": "Меркурий",
+}
+
+
+def table_nakshatra_and_pada(zodiac_sign, in_sign_longitude):
+    """Прежний поиск по таблице NAKSHATRAS с его поправками пад."""
+    for nakshatra_name, start, end, pada_ranges in NAKSHATRAS[zodiac_sign]:
+        if start <= in_sign_longitude < end:
+            pada_index = 1
+            for pada_start, pada_end in pada_ranges:
+                if pada_start <= in_sign_longitude < pada_end:
+                    if nakshatra_name == "Читра" and zodiac_sign == "Весы":
+                        pada_index += 2
+                    elif nakshatra_name == "Мригашира" and zodiac_sign == "Близнецы":
+                        pada_index += 2
+                    elif nakshatra_name == "Криттика" and zodiac_sign == "Телец":
+                        pada_index += 1
+                    return nakshatra_name, pada_index
+                pada_index += 1
+            return nakshatra_name, pada_index - 1
+    last_nakshatra = NAKSHATRAS[zodiac_sign][-1]
+    return last_nakshatra[0], len(last_nakshatra[3])
+
+
+def padas_before_sign(longitude, index):
+    """Сколько пад накшатры index пришлось на предыдущий знак (0, если она началась в знаке долготы)."""
+    return max(round((int(longitude // 30) * 30 - index * NAKSHATRA_SPAN) / PADA_SPAN), 0)
+
+
+def test_dense_sweep_matches_table():
+    # в таблице границы округлены до 4 знаков: точки у самой границы пады не сравниваются
+    step, boundary_margin = 0.001, 0.001
+    longitudes = np.arange(int(360 / step)) * step
+    distance_to_boundary = np.abs((longitudes + PADA_SPAN / 2) % PADA_SPAN - PADA_SPAN / 2)
+    longitudes = longitudes[distance_to_boundary > boundary_margin]
+    indices, padas, degrees = resolve_nakshatras(longitudes)
+
+    checked = renumbered = 0
+    for longitude, index, pada, degree in zip(longitudes.tolist(), indices.tolist(), padas.tolist(),
+                                              degrees.tolist()):
+        nakshatra = resolve_nakshatra(longitude)
+        assert (index, pada, degree) == (nakshatra.index, nakshatra.pada, nakshatra.degree), longitude
+        name, table_pada = table_nakshatra_and_pada(SIGNS[int(longitude // 30)], longitude % 30)
+        assert name == nakshatra.name, longitude
+        if table_pada != nakshatra.pada:
+            # таблица без поправки снова нумерует с 1 пады накшатры, начавшейся в предыдущем знаке
+            shift = padas_before_sign(longitude, nakshatra.index)
+            assert shift and table_pada == nakshatra.pada - shift, (longitude, name, table_pada, nakshatra.pada)
+            renumbered += 1
+        checked += 1
+    assert checked > 350_000
+    assert renumbered > 0
+
+
+@pytest.mark.parametrize("longitude, name, pada", [
+    # поправки прежней таблицы: здесь она уже совпадала с непрерывной нумерацией
+    (30.5, "Криттика", 2),
+    (60.5, "Мригашира", 3),
+    (180.5, "Читра", 3),
+    # без поправки: Пунарвасу в Раке — в таблице пада 1, на самом деле 4
+    (90.5, "Пунарвасу", 4),
+])
+def test_padas_of_nakshatras_crossing_signs(longitude, name, pada):
+    nakshatra = resolve_nakshatra(longitude)
+    assert (nakshatra.name, nakshatra.pada) == (name, pada)
+
+
+def test_pada_renumbered_by_table_across_sign():
+    assert table_nakshatra_and_pada("Рак", 0.5) == ("Пунарвасу", 1)
+    assert resolve_nakshatra(90.5).pada == 4
+
+
+def test_lords_follow_vimshottari_order():
+    legacy_lords = {name.lower(): lord for name, lord in LEGACY_LORDS.items()}
+    assert NAKSHATRA_LORDS == [legacy_lords[name.lower()] for name in NAKSHATRA_NAMES]
+
+
+@pytest.mark.parametrize("name, lord", [
+    ("Пурва-Пхалгуни", "Венера"),
+    ("Уттара-Пхалгуни", "Солнце"),
+    ("Пурва-Ашадха", "Венера"),
+    ("Уттара-Ашадха", "Солнце"),
+    ("Пурва-Бхадрапада", "Юпитер"),
+    ("Уттара-Бхадрапада", "Сатурн"),
+])
+def test_lords_of_purva_and_uttara(name, lord):
+    index = NAKSHATRA_NAMES.index(name)
+    assert resolve_nakshatra(index * NAKSHATRA_SPAN + 1).lord == lord
+
+
+@pytest.mark.parametrize("longitude, name, pada", [
+    (0, "Ашвини", 1),
+    (359.9999, "Ревати", 4),
+    (360, "Ашвини", 1),
+    (-0.5, "Ревати", 4),
+    (NAKSHATRA_SPAN, "Бхарани", 1),
+])
+def test_wraps_and_boundaries(longitude, name, pada):
+    nakshatra = resolve_nakshatra(longitude)
+    assert (nakshatra.name, nakshatra.pada) == (name, pada)
+    assert 0 <= nakshatra.degree < NAKSHATRA_SPAN
+    indices, padas, degrees = resolve_nakshatras(np.array([[longitude]]))
+    assert (NAKSHATRA_NAMES[indices[0, 0]], padas[0, 0]) == (name, pada)
+    assert degrees[0, 0] == nakshatra.degree
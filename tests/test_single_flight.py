@@ -0,0 +1,107 @@
+import asyncio
+import gc
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_calls_share_one_result():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flights.run("key", call) for _ in range(5)))
+        return results, calls, flights
+
+    results, calls, flights = run(scenario())
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert (flights.leaders, flights.joined) == (1, 4)
+
+
+def test_error_reaches_waiters():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ValueError("geocoder")
+
+        return await asyncio.gather(*(flights.run("key", call) for _ in range(3)), return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_error_without_waiters_is_not_left_unretrieved():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        unhandled = []
+        loop.set_exception_handler(lambda _, context: unhandled.append(context))
+
+        async def call():
+            raise ValueError("geocoder")
+
+        with pytest.raises(ValueError):
+            await SingleFlight().run("key", call)
+        gc.collect()
+        await asyncio.sleep(0)
+        return unhandled
+
+    assert run(scenario()) == []
+
+
+def test_cancelled_leader_does_not_hang_waiters():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        leader = asyncio.create_task(flights.run("key", call))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flights.run("key", call)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*waiters), 1)
+        return leader, results, calls
+
+    leader, results, calls = run(scenario())
+    assert leader.cancelled()
+    assert results == [2, 2, 2]
+    assert calls == 2
+
+
+def test_cancelled_waiter_does_not_cancel_leader():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.02)
+            return "value"
+
+        leader = asyncio.create_task(flights.run("key", call))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.run("key", call))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await leader, waiter
+
+    value, waiter = run(scenario())
+    assert value == "value"
+    assert waiter.cancelled()
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.workers import WorkerPool, WorkerPoolFull
+
+
+def test_timed_out_task_keeps_its_slot_until_the_process_finishes():
+    async def scenario():
+        pool = WorkerPool("test", workers=1, queue_depth=1, max_waiting=0, timeout=0.2)
+        await pool.warm_up()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.run(time.sleep, 1)
+            # процесс ещё считает: место занято, следующая задача не принимается
+            busy = pool.stats()
+            with pytest.raises(WorkerPoolFull):
+                await pool.run(time.sleep, 0)
+            await asyncio.sleep(1.5)
+            idle = pool.stats()
+            await pool.run(time.sleep, 0)
+            return busy, idle, pool.stats()
+        finally:
+            pool.shutdown()
+
+    busy, idle, after = asyncio.run(scenario())
+    assert (busy["in_flight"], busy["waiting"], busy["timed_out"]) == (1, 0, 1)
+    assert idle["in_flight"] == 0
+    assert (after["completed"], after["rejected"]) == (1, 1)
+
+
+def test_waiting_tasks_are_counted_and_limited():
+    async def scenario():
+        pool = WorkerPool("test", workers=1, queue_depth=1, max_waiting=1, timeout=5)
+        await pool.warm_up()
+        try:
+            first = asyncio.create_task(pool.run(time.sleep, 0.5))
+            second = asyncio.create_task(pool.run(time.sleep, 0))
+            await asyncio.sleep(0.1)
+            busy = pool.stats()
+            with pytest.raises(WorkerPoolFull):
+                await pool.run(time.sleep, 0)
+            await asyncio.gather(first, second)
+            return busy, pool.stats()
+        finally:
+            pool.shutdown()
+
+    busy, after = asyncio.run(scenario())
+    assert (busy["in_flight"], busy["waiting"]) == (1, 1)
+    assert (after["in_flight"], after["waiting"], after["completed"]) == (0, 0, 2)